@@ -1,9 +1,13 @@
 from argparse import ArgumentParser
 import asyncio
+import multiprocessing
 
 import app
 
 if __name__ == "__main__":
+    # PyInstallerでビルドした実行ファイルからプロセスを起動するために必要
+    multiprocessing.freeze_support()
+
     parser = ArgumentParser()
     parser.add_argument(
         "-r",
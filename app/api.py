@@ -1,14 +1,16 @@
 import asyncio
 import datetime
+import sys
 from dataclasses import dataclass
 from os import path
-from typing import List, Optional, cast
+from typing import Callable, List, Optional, cast
 
 from .async_queue import HttpRequestQueue, HttpRequestQueueResponse
 from .logger import CustomLogger
 from .model import Project, WorkItem
 from .setting import Settings
-from .util import get_value_or_none, safe_json_dumps, safe_json_loads
+from .token_cache import TokenCache
+from .util import JsonArrayStreamDecoder, get_value_or_none, safe_json_dumps
 
 @dataclass
 class TimeTrackerTask:
@@ -26,6 +28,35 @@ class TimeTrackerTask:
             raise ValueError("end_time is not multiple of 30 minutes")
 
 
+@dataclass
+class TimeTrackerEntry:
+    id: Optional[str]
+    work_item_id: str
+    start_time: datetime
+    end_time: datetime
+
+
+class _WorkItemTreeParser:
+    """
+    作業項目の一覧の応答を受信した分から解析するパーサー。
+    最上位の作業項目毎に作業項目へ変換し、解析済みのJSONは保持しません。
+    """
+
+    def __init__(self, parse_work_item: Callable[[dict], WorkItem]):
+        self._decoder = JsonArrayStreamDecoder()
+        self._parse_work_item = parse_work_item
+        self._work_items: List[WorkItem] = []
+
+    def feed(self, text: str):
+        for work_item_dict in self._decoder.feed(text):
+            self._work_items.append(self._parse_work_item(work_item_dict))
+
+    def close(self) -> List[WorkItem]:
+        for work_item_dict in self._decoder.close():
+            self._work_items.append(self._parse_work_item(work_item_dict))
+        return self._work_items
+
+
 class TimeTracker:
     def __init__(self, base_url: str, user_name: str, project_id: str):
         """
@@ -39,15 +70,29 @@ class TimeTracker:
 
         self._token = None
         self._user_id = None
+        self._password = None
         self._user_name = user_name
         self._base_url = base_url
         self._project_id = project_id
-        self._queue = HttpRequestQueue(100)
+        self._queue = HttpRequestQueue(500, retry_count=4)
+        # 送信したリクエストのリトライ回数の合計
+        self.retry_count = 0
+        self._token_cache = TokenCache(base_url, user_name)
+        # 再認証は同時に1回だけ行う
+        self._auth_lock = asyncio.Lock()
         self._logger = CustomLogger(name="TimeTracker")
 
+    async def close_async(self):
+        """
+        通信に使用している接続を閉じます。
+        """
+
+        await self._queue.close()
+
     async def connect_async(self, password: str):
         """
         認証処理を行います。
+        保存されている有効期限内のトークンがある場合は、認証処理を行わずに使用します。
 
         Args:
             password (str): ユーザーのパスワード
@@ -58,33 +103,80 @@ class TimeTracker:
         if self._token:
             self._logger.info("Already connected")
             self._token = None
+            self._user_id = None
+
+        # トークンの期限切れ時に再認証するためにパスワードを保持する
+        self._password = password
 
+        cached = self._token_cache.load()
+        if cached:
+            self._logger.debug("Use cached token.")
+            self._token = cached.token
+            self._user_id = cached.user_id
+            return
+
+        await self._login_async()
+
+    async def _login_async(self):
+        # 再認証中も他のリクエストが使用できるように、成功するまで現在のトークンは変更しない
         response = await self._request_async(
             uri="/auth/token",
             add_auth_header=False,
-            json_data={"loginname": self._user_name, "password": password},
+            json_data={"loginname": self._user_name, "password": self._password},
         )
 
+        token = None
+        expires_at = None
         if response.status == 200:
-            self._token = get_value_or_none(response.body, "token")
+            response_dict = response.json()
+            if isinstance(response_dict, dict):
+                token = response_dict.get("token")
+                expires_at = self._parse_expires_at(response_dict.get("expiresAt"))
 
-        if self._token is None:
+        if token is None:
             self._throw_error(
                 f"TimeTrackerへの認証処理でエラー応答が返却されました。: {self._get_error_message(response)}"
             )
 
         response = await self._request_async(
-            uri="/system/users/me", headers=self._get_auth_header()
+            uri="/system/users/me",
+            add_auth_header=False,
+            headers={"Authorization": f"Bearer {token}"},
         )
 
+        user_id = None
         if response.status == 200:
-            response_login_name = get_value_or_none(response.body, "loginName")
+            response_login_name = get_value_or_none(response.json(), "loginName")
             if response_login_name == self._user_name:
-                self._user_id = get_value_or_none(response.body, "id")
+                user_id = get_value_or_none(response.json(), "id")
 
-        if self._user_id is None:
+        if user_id is None:
             self._throw_error("TimeTrackerへの認証処理で失敗しました。")
 
+        self._token = token
+        self._user_id = user_id
+        self._token_cache.save(token, user_id, expires_at)
+
+    async def _reauthenticate_async(self, expired_token: str):
+        async with self._auth_lock:
+            # 他のリクエストで再認証済みの場合はそのトークンを使用する
+            if self._token != expired_token:
+                return
+
+            self._logger.info("Token expired. Reauthenticate.")
+            self._token_cache.clear()
+            await self._login_async()
+
+    def _parse_expires_at(self, value: Optional[str]) -> Optional[datetime.datetime]:
+        if not value:
+            return None
+        try:
+            expires_at = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            self._logger.warn(f"Unknow expiresAt: {value}")
+            return None
+        return expires_at if expires_at.tzinfo else expires_at.astimezone()
+
     async def get_projects_async(self) -> Project:
         """
         プロジェクト情報を取得します。
@@ -102,7 +194,7 @@ class TimeTracker:
 
         if response.status == 200:
             if isinstance(response.body, str):
-                project_dict = get_value_or_none(response.body, "[0][fields]")
+                project_dict = get_value_or_none(response.json(), "[0][fields]")
                 if project_dict:
                     return Project(
                         id=project_dict["Id"],
@@ -126,17 +218,16 @@ class TimeTracker:
 
         self._logger.debug("Start get_work_items_async")
 
+        # 作業項目が多い場合に応答全体を保持しないよう、受信しながら解析する
         response = await self._request_async(
             uri=f"/workitem/workItems/{self._project_id}/subItems?fields=FolderName,Name&assignedUsers={self._user_name}&includeDeleted=false",
             headers=self._get_auth_header(),
+            parser=lambda: _WorkItemTreeParser(self._parse_work_item),
         )
 
         if response.status == 200:
-            response_dict = safe_json_loads(response.body)
-            if response_dict and isinstance(response_dict, list):
-                work_items = [
-                    self._parse_work_item(work_item) for work_item in response_dict
-                ]
+            work_items = response.parsed
+            if work_items:
                 work_items.sort(key=lambda x: x.folder_path)
                 return work_items
 
@@ -175,6 +266,54 @@ class TimeTracker:
             f"TimeTrackerへのタスクの登録処理でエラー応答が返却されました。: {self._get_error_message(response)}"
         )
 
+    async def get_time_entries_async(
+        self, start_date: datetime.date, end_date: datetime.date
+    ) -> List[TimeTrackerEntry]:
+        """
+        登録済みのタスクを取得します。
+        期間を1週間毎に分割して並列に取得します。
+
+        Args:
+            start_date (datetime.date): 取得する期間の開始日
+            end_date (datetime.date): 取得する期間の終了日 (この日を含む)
+
+        Returns:
+            List[TimeTrackerEntry]: 登録済みのタスクのリスト (開始時間順)
+        """
+
+        self._logger.debug("Start get_time_entries_async")
+
+        weeks = []
+        week_start = start_date
+        while week_start <= end_date:
+            week_end = min(week_start + datetime.timedelta(days=6), end_date)
+            weeks.append((week_start, week_end))
+            week_start = week_end + datetime.timedelta(days=1)
+
+        results = await asyncio.gather(
+            *[self._get_time_entries_week_async(start, end) for start, end in weeks]
+        )
+        entries = [entry for result in results for entry in result]
+        entries.sort(key=lambda x: x.start_time)
+        return entries
+
+    async def _get_time_entries_week_async(
+        self, start_date: datetime.date, end_date: datetime.date
+    ) -> List[TimeTrackerEntry]:
+        response = await self._request_async(
+            uri=f"/system/users/{self._user_id}/timeEntries?startDate={start_date.isoformat()}&finishDate={end_date.isoformat()}",
+            headers=self._get_auth_header(),
+        )
+
+        if response.status == 200:
+            response_list = response.json()
+            if isinstance(response_list, list):
+                return [self._parse_time_entry(entry) for entry in response_list]
+
+        self._throw_error(
+            f"TimeTrackerへの登録済みタスクの取得処理でエラー応答が返却されました。: {self._get_error_message(response)}"
+        )
+
     def _get_error_message(self, response: HttpRequestQueueResponse) -> str:
         if response is None:
             return "Response is None"
@@ -183,7 +322,7 @@ class TimeTracker:
         if response.body:
             msg += ", Message: "
             msg += (
-                get_value_or_none(response.body, "[0][message]")
+                get_value_or_none(response.json(), "[0][message]")
                 or f"Unknow response {response.body}"
             )
         return msg
@@ -191,25 +330,53 @@ class TimeTracker:
     def _parse_work_item(
         self, work_item_dict: dict, parent_folder_path: str = None
     ) -> WorkItem:
-        fields = get_value_or_none(work_item_dict, "fields")
-        if fields is None:
-            self._throw_error(f"Unknow response: {work_item_dict}")
-
-        folder_path = (
-            parent_folder_path + "/" + fields["FolderName"]
-            if parent_folder_path
-            else fields["FolderName"]
-        )
-        return WorkItem(
-            id=fields["Id"],
-            name=fields["Name"],
-            folder_name=fields["FolderName"],
-            folder_path=folder_path,
-            sub_items=[
-                self._parse_work_item(sub_item, folder_path)
-                for sub_item in fields.get("SubItems", [])
-            ],
-        )
+        # 階層が深い場合に再帰の上限を超えないよう、スタックで親から順に作成する
+        intern = sys.intern
+        root = None
+        stack = [(work_item_dict, parent_folder_path, None)]
+        while stack:
+            item_dict, parent_path, parent = stack.pop()
+            try:
+                fields = item_dict["fields"]
+                folder_name = fields["FolderName"]
+                # 同じフォルダのパスは同じ文字列を共有する
+                folder_path = intern(
+                    parent_path + "/" + folder_name if parent_path else folder_name
+                )
+                work_item = WorkItem(
+                    fields["Id"], fields["Name"], folder_name, folder_path, []
+                )
+                sub_items = fields.get("SubItems")
+            except (KeyError, TypeError):
+                self._throw_error(f"Unknow response: {item_dict}")
+
+            if parent is None:
+                root = work_item
+            else:
+                parent.sub_items.append(work_item)
+
+            # 子は元の順番で追加されるよう、逆順に積む
+            if sub_items:
+                for sub_item in reversed(sub_items):
+                    stack.append((sub_item, folder_path, work_item))
+        return root
+
+    def _parse_time_entry(self, time_entry_dict: dict) -> TimeTrackerEntry:
+        try:
+            fields = time_entry_dict.get("fields", time_entry_dict)
+            return TimeTrackerEntry(
+                id=fields.get("id"),
+                work_item_id=str(fields["workItemId"]),
+                start_time=self._parse_time(fields["startTime"]),
+                end_time=self._parse_time(fields["finishTime"]),
+            )
+        except (AttributeError, KeyError, TypeError, ValueError):
+            self._throw_error(f"Unknow response: {time_entry_dict}")
+
+    def _parse_time(self, value: str) -> datetime.datetime:
+        # タイムゾーンの無い時間は登録時と同じくローカル時間として扱う
+        time = datetime.datetime.fromisoformat(value)
+        return time if time.tzinfo else time.astimezone()
 
     async def _request_async(
         self,
@@ -217,18 +384,48 @@ class TimeTracker:
         add_auth_header: bool = True,
         json_data: dict = None,
         headers: dict = None,
+        parser: Callable[[], object] = None,
+    ) -> HttpRequestQueueResponse:
+        if add_auth_header and self._auth_lock.locked():
+            # 再認証中は、期限切れのトークンで送信しないように再認証を待つ
+            async with self._auth_lock:
+                pass
+
+        token = self._token
+        response = await self._send_async(
+            uri, add_auth_header, json_data, headers, parser
+        )
+
+        # トークンの期限が切れた場合は再認証して同じリクエストを送り直す
+        if response.status == 401 and add_auth_header and self._password:
+            await self._reauthenticate_async(token)
+            response = await self._send_async(
+                uri, add_auth_header, json_data, headers, parser
+            )
+        return response
+
+    async def _send_async(
+        self,
+        uri: str,
+        add_auth_header: bool,
+        json_data: Optional[dict],
+        headers: Optional[dict],
+        parser: Optional[Callable[[], object]],
     ) -> HttpRequestQueueResponse:
         req_headers = {}
-        if add_auth_header:
-            req_headers.update(self._get_auth_header())
         if headers is not None:
             req_headers.update(headers)
+        if add_auth_header:
+            req_headers.update(self._get_auth_header())
 
         try:
-            row_response = await self._queue.enquere_async(
-                {"url": self._base_url + uri, "headers": req_headers, "json": json_data}
-            )
-            return cast(HttpRequestQueueResponse, row_response)
+            data = {"url": self._base_url + uri, "headers": req_headers, "json": json_data}
+            if parser is not None:
+                data["parser"] = parser
+            row_response = await self._queue.enquere_async(data)
+            response = cast(HttpRequestQueueResponse, row_response)
+            self.retry_count += response.retry_count
+            return response
         except Exception as e:
             self._throw_error(f"{uri}へのリクエスト処理に失敗しました。: {e}")
 
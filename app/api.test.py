@@ -0,0 +1,247 @@
+import asyncio
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from . import api, async_queue, token_cache
+from .stand_in_server import StandInServer, StandInServerConfig
+
+
+def _work_item_dict(id: str, folder_name: str, sub_items: list = None) -> dict:
+    fields = {"Id": id, "Name": f"作業{id}", "FolderName": folder_name}
+    if sub_items is not None:
+        fields["SubItems"] = sub_items
+    return {"fields": fields}
+
+
+@contextmanager
+def _token_cache():
+    original = dict(token_cache.config)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        token_cache.config["file_path"] = os.path.join(temp_dir, "token")
+        try:
+            yield token_cache.config["file_path"]
+        finally:
+            token_cache.config.update(original)
+
+
+def test_get_time_entries():
+    start = datetime(2025, 7, 1, 9)
+    entries = [
+        {
+            "id": str(i),
+            "workItemId": "100",
+            "startTime": (start + timedelta(days=i)).strftime("%Y-%m-%dT%H:%M:%S"),
+            "finishTime": (start + timedelta(days=i, hours=1)).strftime(
+                "%Y-%m-%dT%H:%M:%S"
+            ),
+        }
+        for i in range(20)
+    ]
+    server = StandInServer(entries=entries)
+
+    async def run():
+        base_url = await server.start()
+        tracker = api.TimeTracker(base_url, "user", "1")
+        try:
+            await tracker.connect_async("password")
+            return await tracker.get_time_entries_async(
+                date(2025, 7, 1), date(2025, 7, 16)
+            )
+        finally:
+            await tracker.close_async()
+            await server.close()
+
+    with _token_cache():
+        result = asyncio.run(run())
+
+    # 1週間毎に分割して取得する
+    weeks = sorted(server.entry_ranges)
+    expect_weeks = [
+        (date(2025, 7, 1), date(2025, 7, 7)),
+        (date(2025, 7, 8), date(2025, 7, 14)),
+        (date(2025, 7, 15), date(2025, 7, 16)),
+    ]
+    if weeks != expect_weeks:
+        raise Exception(f"取得期間が正しくありません。:{weeks}")
+
+    if [entry.id for entry in result] != [str(i) for i in range(16)]:
+        raise Exception(f"登録済みのタスクが正しくありません。:{result}")
+    entry = result[0]
+    if entry.start_time != start.astimezone() or entry.end_time != start.replace(
+        hour=10
+    ).astimezone():
+        raise Exception(f"時間が正しくありません。:{entry}")
+    if entry.work_item_id != "100":
+        raise Exception(f"作業IDが正しくありません。:{entry}")
+
+
+def test_token_cache():
+    server = StandInServer()
+
+    async def connect(base_url: str) -> api.TimeTracker:
+        tracker = api.TimeTracker(base_url, "user", "1")
+        await tracker.connect_async("password")
+        await tracker.get_time_entries_async(date(2025, 7, 1), date(2025, 7, 1))
+        await tracker.close_async()
+        return tracker
+
+    async def run():
+        base_url = await server.start()
+        try:
+            await connect(base_url)
+            # 2回目は保存したトークンを使用して認証しない
+            await connect(base_url)
+            # 有効期限が近いトークンは使用しない
+            token_cache.config["expiry_margin"] = 2 * 60 * 60
+            await connect(base_url)
+        finally:
+            await server.close()
+
+    with _token_cache() as file_path:
+        asyncio.run(run())
+        if os.name != "nt" and stat.S_IMODE(os.stat(file_path).st_mode) != 0o600:
+            raise Exception(f"トークンの権限が正しくありません。:{os.stat(file_path)}")
+
+    if server.stats.login_count != 2:
+        raise Exception(f"認証回数が正しくありません。:{server.stats.login_count}")
+
+
+def test_reauthenticate():
+    server = StandInServer()
+
+    async def run():
+        base_url = await server.start()
+        tracker = api.TimeTracker(base_url, "user", "1")
+        try:
+            await tracker.connect_async("password")
+            # 実行中にトークンが無効になった場合
+            server.tokens.clear()
+            results = await asyncio.gather(
+                *[
+                    tracker.get_time_entries_async(date(2025, 7, 1), date(2025, 7, 1))
+                    for _ in range(5)
+                ]
+            )
+            # 再認証したトークンは保存する
+            return results, token_cache.TokenCache(base_url, "user").load()
+        finally:
+            await tracker.close_async()
+            await server.close()
+
+    with _token_cache():
+        results, cached = asyncio.run(run())
+
+    if results != [[]] * 5:
+        raise Exception(f"再認証後のリクエスト結果が正しくありません。:{results}")
+    # 同時に失敗したリクエストの再認証は1回だけ行う
+    if server.stats.login_count != 2:
+        raise Exception(f"再認証の回数が正しくありません。:{server.stats.login_count}")
+    if cached is None or cached.token != "token-2":
+        raise Exception(f"再認証したトークンが保存されていません。:{cached}")
+
+
+def test_reauthenticate_register():
+    # 再認証中に開始したリクエストも、再認証後のトークンで送信する
+    server = StandInServer(StandInServerConfig(latency_ms=20))
+    start = datetime(2025, 7, 1, 9).astimezone()
+
+    async def register(tracker: api.TimeTracker, i: int) -> str:
+        await asyncio.sleep(i * 0.005)
+        task_start = start + timedelta(minutes=30 * i)
+        task_end = task_start + timedelta(minutes=30)
+        return await tracker.register_task_async(
+            api.TimeTrackerTask("100", task_start, task_end)
+        )
+
+    async def run():
+        base_url = await server.start()
+        tracker = api.TimeTracker(base_url, "user", "1")
+        try:
+            await tracker.connect_async("password")
+            server.tokens.clear()
+            return await asyncio.gather(
+                *[register(tracker, i) for i in range(20)], return_exceptions=True
+            )
+        finally:
+            await tracker.close_async()
+            await server.close()
+
+    requests_per_second = async_queue.config["requests_per_second"]
+    async_queue.config["requests_per_second"] = None
+    try:
+        with _token_cache():
+            results = asyncio.run(run())
+    finally:
+        async_queue.config["requests_per_second"] = requests_per_second
+
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        raise Exception(f"再認証中のリクエストが失敗しました。:{errors}")
+    if server.stats.registered != 20:
+        raise Exception(f"登録数が正しくありません。:{server.stats.registered}")
+    if server.stats.login_count != 2:
+        raise Exception(f"再認証の回数が正しくありません。:{server.stats.login_count}")
+
+
+def test_get_work_items():
+    # 再帰の上限を超える深さの階層と、多数の作業項目を持つ階層
+    deep = _work_item_dict("deep-0", "深い階層")
+    parent = deep
+    for i in range(1, 3000):
+        child = _work_item_dict(f"deep-{i}", "階層")
+        parent["fields"]["SubItems"] = [child]
+        parent = child
+    wide = _work_item_dict(
+        "wide", "広い階層", [_work_item_dict(f"wide-{i}", "作業") for i in range(5000)]
+    )
+    server = StandInServer(work_items=[wide, deep])
+
+    async def run():
+        base_url = await server.start()
+        tracker = api.TimeTracker(base_url, "user", "1")
+        try:
+            await tracker.connect_async("password")
+            return await tracker.get_work_items_async()
+        finally:
+            await tracker.close_async()
+            await server.close()
+
+    chunk_size = async_queue.config["stream_chunk_size"]
+    # 複数バイトの文字の途中で分割されるように小さくする
+    async_queue.config["stream_chunk_size"] = 1001
+    try:
+        with _token_cache():
+            work_items = asyncio.run(run())
+    finally:
+        async_queue.config["stream_chunk_size"] = chunk_size
+
+    # フォルダのパス順に並べる
+    if [item.id for item in work_items] != ["wide", "deep-0"]:
+        raise Exception(f"作業項目が正しくありません。:{[i.id for i in work_items]}")
+
+    deep_children = work_items[1].get_most_nest_children()
+    if [item.id for item in deep_children] != ["deep-2999"]:
+        raise Exception(f"深い階層の作業項目が正しくありません。:{deep_children}")
+    if deep_children[0].folder_path != "深い階層" + "/階層" * 2999:
+        raise Exception("深い階層のフォルダのパスが正しくありません。")
+
+    wide_children = work_items[0].get_most_nest_children()
+    if [item.id for item in wide_children] != [f"wide-{i}" for i in range(5000)]:
+        raise Exception("広い階層の作業項目の順番が正しくありません。")
+    if wide_children[0].name != "作業wide-0" or wide_children[0].sub_items != []:
+        raise Exception(f"作業項目の内容が正しくありません。:{wide_children[0]}")
+    # 同じフォルダのパスは文字列を共有する
+    if wide_children[0].folder_path is not wide_children[1].folder_path:
+        raise Exception("フォルダのパスが共有されていません。")
+
+
+if __name__ == "__main__":
+    test_get_time_entries()
+    test_token_cache()
+    test_reauthenticate()
+    test_reauthenticate_register()
+    test_get_work_items()
+    print("全てのテストが正常に完了しました。")
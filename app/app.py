@@ -1,9 +1,10 @@
 import asyncio
 
 import os
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, time
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from . import html
 from . import input_ics
@@ -13,6 +14,7 @@ from .algorithm import EventInputInfo, ScheduleInputInfo, TimeTrackerAlgorithm
 from .api import TimeTracker, TimeTrackerTask
 from .history import TimeTrackerHistory
 from .ignore import Ignore
+from .journal import RegistrationJournal
 from .logger import CustomLogger
 from .message_handler_factory import MessageContext, MessageHandlerFactory
 from .model import (
@@ -25,20 +27,29 @@ from .model import (
     WorkItem,
 )
 from .setting import Settings, get_desk_path
+from .sync import TimeEntries, get_register_diff
+from .util import strip_compressed_extension
 from .view import AppView
+from .work_item_cache import WorkItemCache
 
 logger = CustomLogger("app")
 
+# 氏名のないPDF (本人用) のスケジュールをまとめるキー
+unnamed_employee = "氏名なし"
+
 
 @dataclass
 class TimeTrackerInfo:
     project: Project
     work_items: List[WorkItem]
+    # キャッシュの作業項目を使用した場合の最新の作業項目の取得処理
+    refresh_task: Optional[asyncio.Task] = None
 
 
 def get_events(view: AppView) -> List[Event]:
     """
     .icsまたは.ics_longファイルからイベントを取得する関数です。
+    gzip・bz2・xzで圧縮されたファイルもそのまま読み込みます。
 
     Args:
         view (AppView): アプリケーションビュー
@@ -51,10 +62,12 @@ def get_events(view: AppView) -> List[Event]:
     """
 
     ics_directory = os.getcwd()
-    ics_files = [f for f in os.listdir(ics_directory) if f.lower().endswith(".ics")]
-    ics_long_files = [
-        f for f in os.listdir(ics_directory) if f.lower().endswith(".ics_long")
+    # 圧縮ファイル（.gz, .bz2, .xz）は展開せずに対象とする
+    file_names = [
+        (f, strip_compressed_extension(f).lower()) for f in os.listdir(ics_directory)
     ]
+    ics_files = [f for f, name in file_names if name.endswith(".ics")]
+    ics_long_files = [f for f, name in file_names if name.endswith(".ics_long")]
 
     if len(ics_files) == 0 and len(ics_long_files) == 0:
         view.push(
@@ -71,73 +84,378 @@ def get_events(view: AppView) -> List[Event]:
         )
 
     if len(target_files) > 1:
-        view.push("対象のファイルが複数見つかりました。以下のファイルを使用します。")
-        view.push(target_files[0])
+        view.push("対象のファイルが複数見つかりました。以下のファイルを統合して使用します。")
+        for target_file in target_files:
+            view.push(target_file)
+
+    ics_file_paths = [
+        os.path.join(ics_directory, target_file) for target_file in target_files
+    ]
+
+    # 全ファイルで同じ取り込み対象期間を使用する
+    start_date, end_date = input_ics.get_default_window()
+
+    # 複数ファイルはプロセスを分けて並列に解析する
+    if len(ics_file_paths) == 1:
+        results = [read_ics_file(ics_file_paths[0], is_long, start_date, end_date)]
+    else:
+        count = len(ics_file_paths)
+        max_workers = min(count, os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(
+                executor.map(
+                    read_ics_file,
+                    ics_file_paths,
+                    [is_long] * count,
+                    [start_date] * count,
+                    [end_date] * count,
+                )
+            )
+
+    for result in results:
+        if result.error_message:
+            logger.error(result.error_message)
+            # raise Exception(result.error_message)
+
+    return input_ics.merge_events([result.events or [] for result in results])
+
+
+def read_ics_file(
+    ics_file_path: str, is_long: bool, start_date: datetime, end_date: datetime
+) -> input_ics.InputICSResult:
+    """
+    1つの.icsまたは.ics_longファイルを解析する関数です。
+
+    Args:
+        ics_file_path (str): ファイルのパス
+        is_long (bool): .ics_longファイルかどうか
+        start_date (datetime): 取り込み対象期間の開始日時
+        end_date (datetime): 取り込み対象期間の終了日時
+
+    Returns:
+        input_ics.InputICSResult: 解析結果
+    """
 
-    ics_file_path = os.path.join(ics_directory, target_files[0])
     if is_long:
         ics_file_path = input_ics.extract_recent_events(
-            ics_file_path, ics_file_path.replace(".ics_long", "_recent.ics")
+            ics_file_path,
+            strip_compressed_extension(ics_file_path).replace(
+                ".ics_long", "_recent.ics"
+            ),
+            start_date,
         )
 
-    result = input_ics.execute(ics_file_path)
-
-    if result.error_message:
-        logger.error(result.error_message)
-        # raise Exception(result.error_message)
-
-    return result.events or []
+    return input_ics.execute(ics_file_path, start_date, end_date)
 
 
-def get_schedule() -> List[Schedule]:
+def get_schedule() -> Dict[str, List[Schedule]]:
     """
-    PDFファイルからスケジュールを取得する関数です。
+    PDFファイルから社員毎のスケジュールを取得する関数です。
+    複数のPDFファイルは並列に解析し、氏名毎にまとめます。
 
     Raises:
         Exception: PDFファイルが見つからない場合に発生します。
 
     Returns:
-        List[Schedule]: スケジュールのリスト
+        Dict[str, List[Schedule]]: 氏名をキーとしたスケジュールのリスト。
+            氏名のないPDFは、全てのファイルをunnamed_employeeのキーにまとめます。
     """
 
     pdf_directory = os.getcwd()
-    pdf_files = [f for f in os.listdir(pdf_directory) if f.lower().endswith(".pdf")]
+    pdf_files = [
+        f
+        for f in os.listdir(pdf_directory)
+        if strip_compressed_extension(f).lower().endswith(".pdf")
+    ]
 
     if len(pdf_files) == 0:
         raise Exception("PDFファイルが見つかりません。")
 
     if len(pdf_files) > 1:
-        logger.warn("PDFファイルが複数見つかりました。以下のファイルを使用します。")
-        logger.warn(pdf_files[0])
+        logger.info("PDFファイルが複数見つかりました。以下のファイルを統合して使用します。")
+        for pdf_file in pdf_files:
+            logger.info(pdf_file)
+
+    pdf_file_paths = [os.path.join(pdf_directory, f) for f in pdf_files]
+
+    # キャッシュのあるファイルはプロセスを起動せずに読み込む
+    results = [input_pdf.load_cache(path) for path in pdf_file_paths]
+    miss_indexes = [i for i, result in enumerate(results) if result is None]
+
+    # キャッシュのない複数ファイルはプロセスを分けて並列に解析する（ファイル内のページは並列にしない）
+    if len(miss_indexes) == 1:
+        results[miss_indexes[0]] = input_pdf.execute(pdf_file_paths[miss_indexes[0]])
+    elif miss_indexes:
+        miss_paths = [pdf_file_paths[i] for i in miss_indexes]
+        count = len(miss_paths)
+        max_workers = min(count, os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for i, result in zip(
+                miss_indexes,
+                executor.map(input_pdf.execute, miss_paths, [False] * count),
+            ):
+                results[i] = result
+
+    schedules_by_employee: Dict[str, List[Schedule]] = {}
+    for result in results:
+        if result.error_message:
+            logger.error(result.error_message)
+            continue
+        for employee in result.employees:
+            # 同じ人の月毎のPDFは氏名がないため、1人分として統合する
+            name = employee.name or unnamed_employee
+            schedules_by_employee.setdefault(name, []).extend(employee.schedule)
+
+    return {
+        name: merge_schedules(schedules)
+        for name, schedules in schedules_by_employee.items()
+    }
+
+
+def merge_schedules(schedules: List[Schedule]) -> List[Schedule]:
+    """
+    複数のPDFから取得したスケジュールを日付順に並べ、同じ日付のスケジュールを1つにします。
+    同じ日付のスケジュールが複数ある場合は、エラーのないスケジュールを優先します。
+
+    Args:
+        schedules (List[Schedule]): スケジュールのリスト
 
-    pdf_file_path = os.path.join(pdf_directory, pdf_files[0])
+    Returns:
+        List[Schedule]: 日付順のスケジュールのリスト
+    """
+
+    merged = {}
+    for schedule in sorted(schedules, key=lambda s: s.start):
+        base_date = schedule.get_base_date()
+        current = merged.get(base_date)
+        if current is None or (current.error_message and not schedule.error_message):
+            merged[base_date] = schedule
+    return list(merged.values())
 
-    result = input_pdf.execute(pdf_file_path)
 
-    if result.error_message:
-        logger.error(result.error_message)
+def select_employee_schedule(
+    view: AppView, schedules_by_employee: Dict[str, List[Schedule]]
+) -> List[Schedule]:
+    """
+    社員毎のスケジュールから登録に使用するスケジュールを選択する関数です。
+    社員が1人の場合は選択せずにそのスケジュールを返します。
 
-    return [schedule for schedule in result.schedule]
+    Args:
+        view (AppView): アプリケーションビュー
+        schedules_by_employee (Dict[str, List[Schedule]]): 社員毎のスケジュール
 
+    Raises:
+        Exception: 選択がキャンセルされた場合に発生します。
 
-async def get_time_tracker_info(api: TimeTracker, password: str) -> TimeTrackerInfo:
+    Returns:
+        List[Schedule]: 選択した社員のスケジュールのリスト
+    """
+
+    names = list(schedules_by_employee.keys())
+    if len(names) == 0:
+        return []
+    if len(names) == 1:
+        return schedules_by_employee[names[0]]
+
+    view.push("複数人の勤務実績が見つかりました。登録する社員を選択してください。")
+    for i, name in enumerate(names, start=1):
+        view.push(f"{i}: {name}")
+
+    while True:
+        btn, value = view.get_input("番号を入力してください。")
+        if btn == "Cancel":
+            raise Exception("社員の選択がキャンセルされました。")
+        if value.isdigit() and 1 <= int(value) <= len(names):
+            name = names[int(value) - 1]
+            view.push(f"{name}の勤務実績を使用します。")
+            return schedules_by_employee[name]
+        view.push("入力された番号が見つかりません。")
+
+
+async def get_time_tracker_info(
+    api: TimeTracker,
+    connect_task: asyncio.Task,
+    work_item_cache: Optional[WorkItemCache] = None,
+) -> TimeTrackerInfo:
     """
     非同期でタイムトラッカー情報を取得する関数です。
+    認証が終わり次第、プロジェクトと作業項目を並列に取得します。
+    作業項目のキャッシュがある場合はキャッシュを返し、最新の作業項目はバックグラウンドで取得します。
 
     引数:
         api (TimeTracker): タイムトラッカーAPIオブジェクト
-        password (str): パスワード
+        connect_task (asyncio.Task): 認証処理のタスク
+        work_item_cache (Optional[WorkItemCache]): 作業項目のキャッシュ
 
     戻り値:
         TimeTrackerInfo: タイムトラッカー情報
     """
 
-    await api.connect_async(password)
-    project = await api.get_projects_async()
-    work_items = await api.get_work_items_async()
+    cached_work_items = work_item_cache.load() if work_item_cache else None
+    await connect_task
+
+    project_task = asyncio.create_task(api.get_projects_async())
+    work_items_task = asyncio.create_task(
+        refresh_work_items_async(api, work_item_cache)
+        if work_item_cache
+        else api.get_work_items_async()
+    )
+    if cached_work_items is not None:
+        # 最新の作業項目は取得を続け、取得できた時点で差し替える
+        try:
+            project = await project_task
+        except Exception:
+            work_items_task.cancel()
+            raise
+        return TimeTrackerInfo(project, cached_work_items, work_items_task)
+
+    project, work_items = await asyncio.gather(project_task, work_items_task)
     return TimeTrackerInfo(project, work_items)
 
 
+async def get_time_entries_async(
+    api: TimeTracker, connect_task: asyncio.Task, schedule_task: asyncio.Task
+) -> Optional[TimeEntries]:
+    """
+    勤務実績の期間の登録済みのタスクを取得する関数です。
+    認証と勤務実績の読み込みが終わり次第取得します。
+
+    引数:
+        api (TimeTracker): タイムトラッカーAPIオブジェクト
+        connect_task (asyncio.Task): 認証処理のタスク
+        schedule_task (asyncio.Task): 勤務実績の読み込み処理のタスク
+
+    戻り値:
+        Optional[TimeEntries]: 登録済みのタスク。勤務実績が無い場合はNone
+    """
+
+    schedules_by_employee = await schedule_task
+    dates = [
+        date
+        for schedules in schedules_by_employee.values()
+        for schedule in schedules
+        for date in (schedule.start, schedule.end)
+        if date
+    ]
+    if not dates:
+        return None
+
+    start_date = min(dates).date()
+    end_date = max(dates).date()
+    await connect_task
+    entries = await api.get_time_entries_async(start_date, end_date)
+    return TimeEntries(start_date, end_date, entries)
+
+
+async def refresh_work_items_async(
+    api: TimeTracker, work_item_cache: WorkItemCache
+) -> Optional[List[WorkItem]]:
+    """
+    最新の作業項目を取得してキャッシュを更新する関数です。
+
+    引数:
+        api (TimeTracker): タイムトラッカーAPIオブジェクト
+        work_item_cache (WorkItemCache): 作業項目のキャッシュ
+
+    戻り値:
+        Optional[List[WorkItem]]: キャッシュと内容が異なる場合は最新の作業項目、同じ場合はNone
+    """
+
+    work_items = await api.get_work_items_async()
+    return work_items if work_item_cache.save(work_items) else None
+
+
+def update_work_items(
+    view: AppView,
+    settings: Settings,
+    history: TimeTrackerHistory,
+    work_items: List[WorkItem],
+) -> List[WorkItem]:
+    """
+    作業項目で設定・履歴データとWorkItemの一覧を更新する関数です。
+
+    引数:
+        view (AppView): アプリケーションのビューオブジェクト
+        settings (Settings): 設定
+        history (TimeTrackerHistory): 履歴
+        work_items (List[WorkItem]): 作業項目のリスト
+
+    戻り値:
+        List[WorkItem]: 末端の作業項目のリスト
+    """
+
+    work_item_children = [
+        child for item in work_items for child in item.get_most_nest_children()
+    ]
+    view.push("設定・履歴データを更新中...")
+    settings.check_setting_work_item(work_item_children)
+    history.check_work_item_id(work_item_children)
+    history.dump()
+    view.push("設定・履歴データを更新中...完了")
+    view.space()
+
+    view.push("WorkItemの一覧を作成中...")
+    html.flush_work_item_tree(work_items)
+    view.push("WorkItemの一覧を作成中...完了")
+    view.space()
+    return work_item_children
+
+
+async def wait_refresh_work_items_async(
+    view: AppView,
+    settings: Settings,
+    history: TimeTrackerHistory,
+    time_tracker_info: TimeTrackerInfo,
+    work_item_children: List[WorkItem],
+    event_work_item_pairs: List[EventWorkItemPair],
+) -> tuple[List[WorkItem], List[EventWorkItemPair]]:
+    """
+    バックグラウンドで取得した最新の作業項目を待ち、変更があった場合は差し替える関数です。
+    最新の作業項目に存在しない作業項目とリンクしたイベントは登録対象から除きます。
+
+    引数:
+        view (AppView): アプリケーションのビューオブジェクト
+        settings (Settings): 設定
+        history (TimeTrackerHistory): 履歴
+        time_tracker_info (TimeTrackerInfo): タイムトラッカー情報
+        work_item_children (List[WorkItem]): 末端の作業項目のリスト
+        event_work_item_pairs (List[EventWorkItemPair]): イベントと作業項目のペアのリスト
+
+    戻り値:
+        tuple[List[WorkItem], List[EventWorkItemPair]]: 末端の作業項目のリストとイベントと作業項目のペアのリスト
+    """
+
+    if time_tracker_info.refresh_task is None:
+        return work_item_children, event_work_item_pairs
+
+    try:
+        work_items = await time_tracker_info.refresh_task
+    except Exception as e:
+        view.push(f"最新のWorkItemの取得に失敗したため、キャッシュを使用します。: {e}", True)
+        return work_item_children, event_work_item_pairs
+    finally:
+        time_tracker_info.refresh_task = None
+
+    if work_items is None:
+        return work_item_children, event_work_item_pairs
+
+    view.push("WorkItemが更新されたため、最新のWorkItemを使用します。")
+    time_tracker_info.work_items = work_items
+    work_item_children = update_work_items(view, settings, history, work_items)
+
+    work_item_ids = {item.id for item in work_item_children}
+    enable_pairs = []
+    for pair in event_work_item_pairs:
+        if pair.work_item.id in work_item_ids:
+            enable_pairs.append(pair)
+        else:
+            view.push(
+                f"WorkItemが見つからないため登録しません。{pair.work_item.id} {pair.event.name}",
+                True,
+            )
+    return work_item_children, enable_pairs
+
+
 def get_enable_schedule(ignore: Ignore, schedules: List[Schedule]) -> List[Schedule]:
     """
     有効なスケジュールを取得する関数です。
@@ -500,15 +818,91 @@ def get_day_task(
     return time_tracker_day_tasks
 
 
+async def get_register_day_tasks_async(
+    view: AppView,
+    api: TimeTracker,
+    day_tasks: List[TimeTrackerDayTask],
+    entries_task: Optional[asyncio.Task] = None,
+    journal: Optional[RegistrationJournal] = None,
+) -> List[TimeTrackerDayTask]:
+    """登録済みのタスクと比較し、登録が必要なタスクのみを返す関数。
+    同じ作業IDと時間で登録済みのタスクと、登録済みのタスクと時間が重複するタスクは登録しません。
+    登録済みのタスクを取得できない場合は全てのタスクを返します。
+    登録済みのタスクを取得できた場合、TimeTrackerにない登録予定のタスクはジャーナルから削除します。
+
+    Args:
+        view (AppView): アプリケーションのビューオブジェクト。
+        api (TimeTracker): タイムトラッカーのAPIオブジェクト。
+        day_tasks (List[TimeTrackerDayTask]): タイムトラッカーの日別タスクのリスト。
+        entries_task (Optional[asyncio.Task]): 先に取得を始めた登録済みのタスクの取得処理。
+        journal (Optional[RegistrationJournal]): 登録済みのタスクを記録するジャーナル。
+
+    Returns:
+        List[TimeTrackerDayTask]: 登録が必要なタスクのみの日別タスクのリスト。
+    """
+
+    schedules = [
+        event_work_item.event.schedule
+        for day_task in day_tasks
+        for event_work_item in day_task.event_work_item_pair
+    ]
+    if not schedules:
+        return day_tasks
+
+    start_date = min(schedule.start for schedule in schedules).date()
+    end_date = max(schedule.end for schedule in schedules).date()
+    try:
+        time_entries = await entries_task if entries_task else None
+        if time_entries and time_entries.contains(start_date, end_date):
+            entries = time_entries.entries
+        else:
+            entries = await api.get_time_entries_async(start_date, end_date)
+    except Exception as e:
+        view.push(f"登録済みのタスクを取得できないため、全てのタスクを登録します。: {e}", True)
+        return day_tasks
+
+    diff = get_register_diff(day_tasks, entries)
+    if journal:
+        # ユーザーが削除・修正したタスクは、ジャーナルの記録があっても登録し直す
+        for day_task in diff.day_tasks:
+            for event_work_item in day_task.event_work_item_pair:
+                schedule = event_work_item.event.schedule
+                journal.discard(
+                    event_work_item.work_item.id, schedule.start, schedule.end
+                )
+    for event_work_item in diff.skips:
+        schedule = event_work_item.event.schedule
+        view.push(f"イベント登録済み: {schedule.start} - {schedule.end}")
+    for conflict in diff.conflicts:
+        schedule = conflict.event_work_item.event.schedule
+        view.push(
+            f"イベント登録不可: {schedule.start} - {schedule.end} 登録済みのタスクと重複しています。({conflict.entry.start_time} - {conflict.entry.end_time})",
+            True,
+        )
+    view.push(
+        f"登録対象: 新規 {diff.get_insert_count()}件 / 登録済み {len(diff.skips)}件 / 重複 {len(diff.conflicts)}件"
+    )
+    return diff.day_tasks
+
+
 async def run_register_task_async(
-    view: AppView, api: TimeTracker, day_tasks: List[TimeTrackerDayTask]
+    view: AppView,
+    api: TimeTracker,
+    day_tasks: List[TimeTrackerDayTask],
+    max_concurrency: int = 8,
+    journal: Optional[RegistrationJournal] = None,
 ):
     """非同期でタスクを登録する関数。
+    全日分のタスクを同時に最大max_concurrency件まで登録し、結果は元の順番で表示します。
+    1件の登録に失敗しても他のタスクの登録は続けます。
+    ジャーナルを指定した場合は登録済みのタスクを読み飛ばし、登録できたタスクを記録します。
 
     Args:
         view (AppView): アプリケーションのビューオブジェクト。
         api (TimeTracker): タイムトラッカーのAPIオブジェクト。
         day_tasks (List[TimeTrackerDayTask]): タイムトラッカーの日別タスクのリスト。
+        max_concurrency (int): 同時に登録するタスクの最大数。
+        journal (Optional[RegistrationJournal]): 登録済みのタスクを記録するジャーナル。
     """
 
     # メッセージハンドラーを取得
@@ -516,33 +910,114 @@ async def run_register_task_async(
     factory.load()
     message_handler = factory.get_message_handler()
 
-    for day_task in day_tasks:
-        for event_work_item in day_task.event_work_item_pair:
-            try:
-                memo = (
-                    message_handler.get_message(
-                        event_work_item.event,
-                        event_work_item.work_item,
-                        MessageContext(),
-                    )
-                    if message_handler
-                    else None
+    event_work_items = [
+        event_work_item
+        for day_task in day_tasks
+        for event_work_item in day_task.event_work_item_pair
+    ]
+    total = len(event_work_items)
+    if total == 0:
+        return
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def register(event_work_item: EventWorkItemPair):
+        async with semaphore:
+            memo = (
+                message_handler.get_message(
+                    event_work_item.event,
+                    event_work_item.work_item,
+                    MessageContext(),
                 )
-                await api.register_task_async(
-                    TimeTrackerTask(
-                        work_item_id=event_work_item.work_item.id,
-                        start_time=event_work_item.event.schedule.start,
-                        end_time=event_work_item.event.schedule.end,
-                        memo=memo,
-                    )
+                if message_handler
+                else None
+            )
+            task = TimeTrackerTask(
+                work_item_id=event_work_item.work_item.id,
+                start_time=event_work_item.event.schedule.start,
+                end_time=event_work_item.event.schedule.end,
+                memo=memo,
+            )
+            registered_id = await api.register_task_async(task)
+            if journal:
+                journal.record(
+                    task.work_item_id, task.start_time, task.end_time, registered_id
                 )
+
+    def is_registered(event_work_item: EventWorkItemPair) -> bool:
+        return journal is not None and journal.is_registered(
+            event_work_item.work_item.id,
+            event_work_item.event.schedule.start,
+            event_work_item.event.schedule.end,
+        )
+
+    # 登録済みのタスクは登録処理を作らない
+    tasks = [
+        None if is_registered(item) else asyncio.create_task(register(item))
+        for item in event_work_items
+    ]
+
+    pending = [task for task in tasks if task is not None]
+
+    loop = asyncio.get_running_loop()
+    start_time = loop.time()
+    # 進捗は概ね1割毎に表示する
+    progress_step = max(5, len(pending) // 10)
+    done_count = 0
+    success_count = 0
+    skip_count = 0
+    next_index = 0
+
+    def push_results():
+        nonlocal success_count, skip_count, next_index
+        # 登録結果は元の順番で、前のタスクが終わったものから表示する
+        while next_index < total and (
+            tasks[next_index] is None or tasks[next_index].done()
+        ):
+            event_work_item = event_work_items[next_index]
+            schedule = event_work_item.event.schedule
+            if tasks[next_index] is None:
+                skip_count += 1
+                view.push(f"イベント登録済み: {schedule.start} - {schedule.end}")
+                next_index += 1
+                continue
+
+            error = tasks[next_index].exception()
+            if error is None:
+                success_count += 1
+                view.push(f"イベント登録完了: {schedule.start} - {schedule.end}")
+            else:
                 view.push(
-                    f"イベント登録完了: {event_work_item.event.schedule.start} - {event_work_item.event.schedule.end}"
+                    f"イベント登録失敗: {schedule.start} - {schedule.end} エラー: {error}"
                 )
-            except Exception as e:
+            next_index += 1
+
+    push_results()
+    try:
+        for completed in asyncio.as_completed(pending):
+            try:
+                await completed
+            except Exception:
+                pass
+            done_count += 1
+            push_results()
+
+            if done_count % progress_step == 0 and done_count < len(pending):
+                elapsed = loop.time() - start_time
+                throughput = done_count / elapsed if elapsed > 0 else 0
+                eta = (len(pending) - done_count) / throughput if throughput > 0 else 0
                 view.push(
-                    f"イベント登録失敗: {event_work_item.event.schedule.start} - {event_work_item.event.schedule.end} エラー: {e}"
+                    f"登録中... {done_count}/{len(pending)}件 ({throughput:.1f}件/秒, 残り約{eta:.0f}秒)"
                 )
+    finally:
+        if journal:
+            journal.flush()
+
+    elapsed = loop.time() - start_time
+    failure_count = total - success_count - skip_count
+    view.push(
+        f"登録結果: 成功 {success_count}件 / 失敗 {failure_count}件 / 登録済み {skip_count}件 ({elapsed:.1f}秒)"
+    )
 
 
 def detail_dump(view: AppView):
@@ -605,78 +1080,116 @@ async def execute(is_register: bool = False):
     user_name = settings.get_setting_value("user_name")
     project_id = settings.get_setting_value("base_project_id")
     api = TimeTracker(base_url, user_name, project_id)
-    events_task = asyncio.create_task(asyncio.to_thread(get_events, view))
-    schedule_task = asyncio.create_task(asyncio.to_thread(get_schedule))
-    # パスワードを取得
-    password = view.get_password()
-    if not password:
-        raise Exception("パスワードが入力されていません。")
+    time_tracker_info = None
+    entries_task = None
+    try:
+        events_task = asyncio.create_task(asyncio.to_thread(get_events, view))
+        schedule_task = asyncio.create_task(asyncio.to_thread(get_schedule))
+        # パスワードを取得
+        password = view.get_password()
+        if not password:
+            raise Exception("パスワードが入力されていません。")
     
-    timer_tracker_task = asyncio.create_task(get_time_tracker_info(api, password))
-    view.push("必要な情報を取得中...")
-    schedules = await schedule_task
-    events = await events_task
-    time_tracker_info = await timer_tracker_task
-    view.push("必要な情報を取得中...完了")
-    view.space()
+        # 認証後に必要な情報は、それぞれ必要な処理が終わり次第並列に取得する
+        connect_task = asyncio.create_task(api.connect_async(password))
+        work_item_cache = WorkItemCache(base_url, project_id, user_name)
+        timer_tracker_task = asyncio.create_task(
+            get_time_tracker_info(api, connect_task, work_item_cache)
+        )
+        if is_register:
+            entries_task = asyncio.create_task(
+                get_time_entries_async(api, connect_task, schedule_task)
+            )
+            # 使用せずに終了した場合も例外を取得済みにする
+            entries_task.add_done_callback(
+                lambda task: task.cancelled() or task.exception()
+            )
+        view.push("必要な情報を取得中...")
+        schedules_by_employee = await schedule_task
+        events = await events_task
+        time_tracker_info = await timer_tracker_task
+        view.push("必要な情報を取得中...完了")
+        view.space()
 
-    work_item_children = [
-        child
-        for item in time_tracker_info.work_items
-        for child in item.get_most_nest_children()
-    ]
-    view.push("設定・履歴データを更新中...")
-    settings.check_setting_work_item(work_item_children)
-    history.check_work_item_id(work_item_children)
-    history.dump()
-    view.push("設定・履歴データを更新中...完了")
-    view.space()
+        schedules = select_employee_schedule(view, schedules_by_employee)
 
-    view.push("WorkItemの一覧を作成中...")
-    html.flush_work_item_tree(time_tracker_info.work_items)
-    view.push("WorkItemの一覧を作成中...完了")
-    view.space()
-    view.line()
+        # キャッシュの作業項目がある場合は、最新の作業項目の取得を待たずに使用する
+        work_item_children = update_work_items(
+            view, settings, history, time_tracker_info.work_items
+        )
+        view.line()
 
-    view.push("以下の日程にスケジュールを登録します。")
-    enable_schedules = get_enable_schedule(ignore, schedules)
-    for schedule in enable_schedules:
-        view.push(schedule.get_text())
-    view.line()
-    view.space()
+        view.push("以下の日程にスケジュールを登録します。")
+        enable_schedules = get_enable_schedule(ignore, schedules)
+        for schedule in enable_schedules:
+            view.push(schedule.get_text())
+        view.line()
+        view.space()
 
-    view.push("作業IDの入力を開始...")
-    # 有効なイベントを取得
-    enable_events = get_enable_events(ignore, events)
-    event_work_item_pairs = linking_event_work_item(
-        view, settings, history, enable_events, work_item_children
-    )
-    view.push("作業IDの入力を開始...完了")
-    view.space()
+        view.push("作業IDの入力を開始...")
+        # 有効なイベントを取得
+        enable_events = get_enable_events(ignore, events)
+        # 入力のCtrl+Cを入力処理で受け取るため、メインスレッドで実行する
+        event_work_item_pairs = linking_event_work_item(
+            view, settings, history, enable_events, work_item_children
+        )
+        view.push("作業IDの入力を開始...完了")
+        view.space()
 
-    view.push("イベント時間調整を開始...")
-    # 有給休暇のスケジュールを取得
-    paid_leave_schedules = [
-        schedule for schedule in schedules if schedule.is_paid_leave
-    ]
-    # 有効なスケジュールを取得
-    time_tracker_day_tasks = get_day_task(
-        settings=settings,
-        project=time_tracker_info.project,
-        schedules=enable_schedules,
-        paid_leave_schedules=paid_leave_schedules,
-        event_work_item_pairs=event_work_item_pairs,
-        work_item_children=work_item_children,
-    )
-    view.push("イベント時間調整を開始...完了")
-    view.space()
+        # キャッシュの作業項目を使用した場合は最新の作業項目に差し替える
+        work_item_children, event_work_item_pairs = (
+            await wait_refresh_work_items_async(
+                view,
+                settings,
+                history,
+                time_tracker_info,
+                work_item_children,
+                event_work_item_pairs,
+            )
+        )
 
-    view.push("イベント登録処理を開始...")
-    html.flush_schedule(time_tracker_day_tasks)
-    if is_register:
-        await run_register_task_async(view, api, time_tracker_day_tasks)
-    view.push("イベント登録処理を開始...完了")
-    view.space()
+        view.push("イベント時間調整を開始...")
+        # 有給休暇のスケジュールを取得
+        paid_leave_schedules = [
+            schedule for schedule in schedules if schedule.is_paid_leave
+        ]
+        # 有効なスケジュールを取得
+        time_tracker_day_tasks = get_day_task(
+            settings=settings,
+            project=time_tracker_info.project,
+            schedules=enable_schedules,
+            paid_leave_schedules=paid_leave_schedules,
+            event_work_item_pairs=event_work_item_pairs,
+            work_item_children=work_item_children,
+        )
+        view.push("イベント時間調整を開始...完了")
+        view.space()
+
+        view.push("イベント登録処理を開始...")
+        html.flush_schedule(time_tracker_day_tasks)
+        if is_register:
+            # 前回の登録が途中で終了した場合に登録済みのタスクを再登録しない
+            journal = RegistrationJournal(user_name)
+            journal.load()
+            try:
+                register_day_tasks = await get_register_day_tasks_async(
+                    view, api, time_tracker_day_tasks, entries_task, journal
+                )
+                await run_register_task_async(
+                    view, api, register_day_tasks, journal=journal
+                )
+            finally:
+                journal.close()
+        view.push("イベント登録処理を開始...完了")
+        view.space()
+    finally:
+        # 最新の作業項目の取得が残っている場合は中断する
+        if time_tracker_info and time_tracker_info.refresh_task:
+            time_tracker_info.refresh_task.cancel()
+        if entries_task:
+            entries_task.cancel()
+        # 接続プールを閉じる
+        await api.close_async()
 
     view.push("後処理を開始...")
     detail_dump(view)
@@ -0,0 +1,339 @@
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import fitz
+
+from . import app, input_pdf, journal
+from .api import TimeTrackerEntry
+from .model import Event, EventWorkItemPair, Schedule, TimeTrackerDayTask, WorkItem
+
+pdf_text = """勤務実績入力（本人用）
+{month}/21
+月
+フレックス勤務
+1
+09:45 -- 18:46
+09時45分 ～ 18時46分
+{month}/22
+火
+フレックス勤務
+1
+09:02 --
+09時00分 ～ 17時30分
+"""
+
+summary_text = """合計
+所定労働時間
+"""
+
+
+def _write_pdf(file_path: str, pages):
+    pdf_document = fitz.open()
+    for text in pages:
+        page = pdf_document.new_page()
+        for i, line in enumerate(text.splitlines()):
+            page.insert_text((40, 40 + i * 12), line, fontname="japan", fontsize=9)
+    pdf_document.save(file_path)
+    pdf_document.close()
+
+
+@contextmanager
+def _pdf_directory():
+    cwd = os.getcwd()
+    cache_enabled = input_pdf.config["cache_enabled"]
+    # 設定の変更を解析処理に反映するため、プロセスではなくスレッドで並列に解析する
+    executor = app.ProcessPoolExecutor
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        input_pdf.config["cache_enabled"] = False
+        app.ProcessPoolExecutor = ThreadPoolExecutor
+        try:
+            yield temp_dir
+        finally:
+            app.ProcessPoolExecutor = executor
+            input_pdf.config["cache_enabled"] = cache_enabled
+            os.chdir(cwd)
+
+
+def test_get_schedule_unnamed():
+    # 氏名のない本人用のPDFは、月毎のファイルを1人分にまとめる
+    with _pdf_directory() as temp_dir:
+        for month in [7, 8]:
+            _write_pdf(
+                os.path.join(temp_dir, f"勤務実績{month}月.pdf"),
+                [pdf_text.format(month=month), summary_text],
+            )
+        schedules_by_employee = app.get_schedule()
+
+    if list(schedules_by_employee.keys()) != [app.unnamed_employee]:
+        raise Exception(f"社員が正しくありません。:{schedules_by_employee.keys()}")
+
+    schedules = schedules_by_employee[app.unnamed_employee]
+    dates = [(s.start.month, s.start.day) for s in schedules]
+    if dates != [(7, 21), (7, 22), (8, 21), (8, 22)]:
+        raise Exception(f"スケジュールが正しくありません。:{dates}")
+
+
+def test_get_schedule_cache():
+    # 全てキャッシュのあるファイルはプロセスを起動せずに読み込む
+    def executor(*args, **kwargs):
+        raise Exception("プロセスが起動されました。")
+
+    cache_dir = input_pdf.config["cache_dir"]
+    with _pdf_directory() as temp_dir:
+        input_pdf.config["cache_enabled"] = True
+        input_pdf.config["cache_dir"] = os.path.join(temp_dir, "cache")
+        try:
+            for month in [7, 8]:
+                _write_pdf(
+                    os.path.join(temp_dir, f"勤務実績{month}月.pdf"),
+                    [pdf_text.format(month=month), summary_text],
+                )
+            expect = app.get_schedule()
+            app.ProcessPoolExecutor = executor
+            schedules_by_employee = app.get_schedule()
+        finally:
+            input_pdf.config["cache_dir"] = cache_dir
+
+    if schedules_by_employee != expect:
+        raise Exception(f"キャッシュのスケジュールが違います。:{schedules_by_employee}")
+
+
+class _View:
+    def __init__(self):
+        self.messages = []
+
+    def push(self, message: str, warn: bool = False):
+        self.messages.append(message)
+
+
+class _TimeTracker:
+    """登録に掛かる時間が作業ID毎に異なり、失敗する作業もあるAPI"""
+
+    def __init__(self, delays: dict, fail_ids: set):
+        self.delays = delays
+        self.fail_ids = fail_ids
+        self.registered = []
+
+    async def register_task_async(self, task) -> str:
+        await asyncio.sleep(self.delays[task.work_item_id])
+        if task.work_item_id in self.fail_ids:
+            raise Exception("登録エラー")
+        self.registered.append(task.work_item_id)
+        return f"id-{task.work_item_id}"
+
+
+def _event_work_item(id: str, start: datetime) -> EventWorkItemPair:
+    schedule = Schedule(start=start, end=start + timedelta(minutes=30))
+    event = Event(
+        name=f"予定{id}",
+        organizer="",
+        is_private=False,
+        is_cancelled=False,
+        location="",
+        schedule=schedule,
+    )
+    work_item = WorkItem(id=id, name=f"作業{id}", folder_name="", folder_path="")
+    return EventWorkItemPair(event, work_item)
+
+
+def test_run_register_task():
+    # ジャーナルの保持期間内の日付にする
+    start = (
+        datetime.now()
+        .astimezone()
+        .replace(hour=9, minute=0, second=0, microsecond=0)
+    )
+    items = [
+        _event_work_item(str(i), start + timedelta(minutes=30 * i)) for i in range(5)
+    ]
+    day_tasks = [
+        TimeTrackerDayTask(start.date(), None, items[:3]),
+        TimeTrackerDayTask(start.date(), None, items[3:]),
+    ]
+    # 後のタスクほど早く終わり、2は登録済み、3は失敗する
+    api = _TimeTracker({"0": 0.05, "1": 0.03, "3": 0.01, "4": 0.0}, {"3"})
+    view = _View()
+
+    file_path = journal.config["file_path"]
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            journal.config["file_path"] = os.path.join(temp_dir, "journal")
+            registration_journal = journal.RegistrationJournal("user")
+            registration_journal.load()
+            schedule = items[2].event.schedule
+            registration_journal.record("2", schedule.start, schedule.end, "id-2")
+
+            asyncio.run(
+                app.run_register_task_async(
+                    view, api, day_tasks, journal=registration_journal
+                )
+            )
+            registration_journal.close()
+            registration_journal = journal.RegistrationJournal("user")
+            registration_journal.load()
+            recorded = [
+                item.work_item.id
+                for item in items
+                if registration_journal.is_registered(
+                    item.work_item.id,
+                    item.event.schedule.start,
+                    item.event.schedule.end,
+                )
+            ]
+            registration_journal.close()
+    finally:
+        journal.config["file_path"] = file_path
+
+    if api.registered != ["4", "1", "0"]:
+        raise Exception(f"登録処理が並列に実行されていません。:{api.registered}")
+
+    # 登録結果は完了順ではなく元の順番で表示する
+    messages = [m for m in view.messages if m.startswith("イベント登録")]
+    results = [message.split(":")[0] for message in messages]
+    expect = [
+        "イベント登録完了",
+        "イベント登録完了",
+        "イベント登録済み",
+        "イベント登録失敗",
+        "イベント登録完了",
+    ]
+    if results != expect:
+        raise Exception(f"登録結果の順番が正しくありません。:{view.messages}")
+    if not messages[3].endswith("エラー: 登録エラー"):
+        raise Exception(f"失敗したタスクのエラーが表示されていません。:{messages[3]}")
+
+    summary = view.messages[-1]
+    if not summary.startswith("登録結果: 成功 3件 / 失敗 1件 / 登録済み 1件"):
+        raise Exception(f"登録結果の件数が正しくありません。:{summary}")
+
+    # 登録できたタスクのみジャーナルに記録する
+    if recorded != ["0", "1", "2", "4"]:
+        raise Exception(f"ジャーナルの記録が正しくありません。:{recorded}")
+
+
+def test_get_register_day_tasks_journal():
+    start = (
+        datetime.now()
+        .astimezone()
+        .replace(hour=9, minute=0, second=0, microsecond=0)
+    )
+    items = [
+        _event_work_item(str(i), start + timedelta(minutes=30 * i)) for i in range(2)
+    ]
+    day_tasks = [TimeTrackerDayTask(start.date(), None, items)]
+    registered = items[1].event.schedule
+
+    class TimeEntriesApi:
+        def __init__(self, entries):
+            self.entries = entries
+
+        async def get_time_entries_async(self, start_date, end_date):
+            if self.entries is None:
+                raise Exception("取得エラー")
+            return self.entries
+
+    def run(api, registration_journal):
+        return asyncio.run(
+            app.get_register_day_tasks_async(
+                _View(), api, day_tasks, journal=registration_journal
+            )
+        )
+
+    file_path = journal.config["file_path"]
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            journal.config["file_path"] = os.path.join(temp_dir, "journal")
+            registration_journal = journal.RegistrationJournal("user")
+            registration_journal.load()
+            for item in items:
+                schedule = item.event.schedule
+                registration_journal.record(
+                    item.work_item.id, schedule.start, schedule.end, "id"
+                )
+
+            # 登録済みのタスクを取得できない場合はジャーナルの記録を残す
+            run(TimeEntriesApi(None), registration_journal)
+            schedule = items[0].event.schedule
+            if not registration_journal.is_registered("0", schedule.start, schedule.end):
+                raise Exception("取得できない場合にジャーナルの記録が削除されています。")
+
+            # TimeTrackerで削除されたタスクはジャーナルから削除して登録し直す
+            entry = TimeTrackerEntry("1", "1", registered.start, registered.end)
+            result = run(TimeEntriesApi([entry]), registration_journal)
+            registration_journal.close()
+            registration_journal = journal.RegistrationJournal("user")
+            registration_journal.load()
+            recorded = [
+                item.work_item.id
+                for item in items
+                if registration_journal.is_registered(
+                    item.work_item.id,
+                    item.event.schedule.start,
+                    item.event.schedule.end,
+                )
+            ]
+            registration_journal.close()
+    finally:
+        journal.config["file_path"] = file_path
+
+    inserts = [
+        pair.work_item.id for task in result for pair in task.event_work_item_pair
+    ]
+    if inserts != ["0"]:
+        raise Exception(f"登録するタスクが正しくありません。:{inserts}")
+    if recorded != ["1"]:
+        raise Exception(f"ジャーナルの記録が正しくありません。:{recorded}")
+
+
+def test_wait_refresh_work_items():
+    start = datetime(2025, 7, 1, 9).astimezone()
+    pairs = [_event_work_item(str(i), start + timedelta(hours=i)) for i in range(3)]
+    cached = [pair.work_item for pair in pairs]
+    # 最新の作業項目では作業1が削除されている
+    latest = [cached[0], cached[2]]
+
+    async def refresh(work_items):
+        return work_items
+
+    async def run(work_items):
+        info = app.TimeTrackerInfo(None, cached)
+        info.refresh_task = asyncio.create_task(refresh(work_items))
+        result = await app.wait_refresh_work_items_async(
+            view, None, None, info, cached, pairs
+        )
+        return info, result
+
+    update_work_items = app.update_work_items
+    # 設定・履歴データとWorkItemの一覧のファイルは更新しない
+    app.update_work_items = lambda view, settings, history, work_items: work_items
+    try:
+        view = _View()
+        info, (children, enable_pairs) = asyncio.run(run(latest))
+        if info.work_items != latest or children != latest:
+            raise Exception(f"最新の作業項目に差し替えられていません。:{children}")
+        if [pair.work_item.id for pair in enable_pairs] != ["0", "2"]:
+            raise Exception(f"削除された作業項目のイベントが残っています。:{enable_pairs}")
+        if info.refresh_task is not None:
+            raise Exception("最新の作業項目の取得処理が残っています。")
+
+        # 内容が変わっていない場合はキャッシュの作業項目をそのまま使用する
+        view = _View()
+        info, (children, enable_pairs) = asyncio.run(run(None))
+        if children != cached or enable_pairs != pairs or view.messages:
+            raise Exception(f"キャッシュの作業項目が使用されていません。:{view.messages}")
+    finally:
+        app.update_work_items = update_work_items
+
+
+if __name__ == "__main__":
+    test_get_schedule_unnamed()
+    test_get_schedule_cache()
+    test_run_register_task()
+    test_get_register_day_tasks_journal()
+    test_wait_refresh_work_items()
+    print("全てのテストが正常に完了しました。")
@@ -1,66 +1,411 @@
 import asyncio
+import codecs
+import random
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Any
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Mapping, Optional
 
 import aiohttp
 
 from .logger import CustomLogger
+from .util import safe_json_loads
+
+config = {
+    # 接続プールの最大接続数 (0は無制限)
+    "connector_limit": 10,
+    # 同じホストへの最大接続数 (0は無制限)
+    "connector_limit_per_host": 0,
+    # DNSの解決結果をキャッシュする秒数
+    "dns_cache_ttl": 300,
+    # 使用していない接続を維持する秒数
+    "keepalive_timeout": 30,
+    # 同時にリクエストを送信するワーカー数 (同時実行数を調整する場合は上限)
+    "worker_count": 8,
+    # サーバーの応答に合わせて同時実行数を調整するかどうかと、開始時の同時実行数
+    "adaptive_concurrency": True,
+    "initial_concurrency": 2,
+    # 1秒あたりの最大リクエスト数 (Noneは無制限) と、連続して送信できるリクエスト数
+    "requests_per_second": 10,
+    "burst": 5,
+    # 接続と、応答の受信が途切れた場合のタイムアウト秒数
+    # 作業項目の一覧のような大きな応答を受信できるよう、リクエスト全体の時間は制限しない
+    "connect_timeout": 30,
+    "read_timeout": 30,
+    # リトライの待機時間の上限秒数と、最初のリクエストからリトライを続ける上限秒数
+    "retry_max_delay": 10,
+    "retry_max_elapsed": 60,
+    # パーサーを指定した場合に応答の本文を読み込む単位 (バイト)
+    "stream_chunk_size": 64 * 1024,
+}
+
+
+class RateLimiter:
+    """
+    トークンバケットで処理の開始頻度を制御するクラス。
+    1秒あたりrequests_per_second個のトークンが貯まり、最大burst個まで連続して開始できます。
+    トークンがない場合は、次のトークンが貯まるまで待機します。
+    """
+
+    def __init__(self, requests_per_second: float, burst: int = 1):
+        if requests_per_second <= 0 or burst < 1:
+            raise ValueError("requests_per_second and burst must be positive")
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_time = None
+
+    async def acquire(self):
+        now = asyncio.get_running_loop().time()
+        if self._updated_time is not None:
+            elapsed = now - self._updated_time
+            self._tokens = min(
+                self.burst, self._tokens + elapsed * self.requests_per_second
+            )
+        self._updated_time = now
+
+        # 先にトークンを予約し、不足分が貯まるまで待機する
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.requests_per_second)
+
+
+class ConcurrencyController:
+    """
+    AIMD (加算増加・乗算減少) で同時実行数を調整するクラス。
+    応答が正常で遅延が最小遅延のlatency_tolerance倍以内であれば同時実行数を少しずつ増やし
+    (同時実行数分の応答で1増加)、タイムアウト・429・5xxの場合はdecrease_factor倍に減らします。
+    同時に失敗した複数のリクエストで何度も減らさないよう、減らすのは直近の遅延時間内に1回だけです。
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 2,
+        min_limit: int = 1,
+        max_limit: int = 8,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+    ):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("min_limit <= initial_limit <= max_limit is required")
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+        self._min_latency = None
+        self._last_decrease_time = None
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency: Optional[float], is_overloaded: bool = False):
+        """
+        処理の終了を通知します。
+
+        Args:
+            latency (Optional[float]): 処理にかかった秒数。Noneの場合は同時実行数を調整しません。
+            is_overloaded (bool): サーバーが過負荷と判断できる結果かどうか。
+        """
+
+        if latency is not None:
+            if is_overloaded:
+                self._decrease(latency)
+            else:
+                self._increase(latency)
+
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _increase(self, latency: float):
+        if self._min_latency is None or latency < self._min_latency:
+            self._min_latency = latency
+        if latency <= self._min_latency * self.latency_tolerance:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _decrease(self, latency: float):
+        now = asyncio.get_running_loop().time()
+        if self._last_decrease_time is not None:
+            if now - self._last_decrease_time < latency:
+                return
+        self._last_decrease_time = now
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+
+# ワーカーに終了を通知するための値
+_STOP = object()
 
 
 class AsyncQueue(ABC):
-    def __init__(self, wait_time_ms: int):
+    def __init__(
+        self, rate_limiter: Optional[RateLimiter] = None, worker_count: int = 1
+    ):
+        if worker_count < 1:
+            raise ValueError("worker_count must be positive")
         self.queue = asyncio.Queue()
-        self.wait_time = wait_time_ms / 1000.0  # Convert milliseconds to seconds
-        self._loop_task = asyncio.create_task(self._process_queue())
+        self.rate_limiter = rate_limiter
+        self._is_closed = False
         self._logger = CustomLogger(name=__name__)
+        self._worker_tasks = [
+            asyncio.create_task(self._process_queue()) for _ in range(worker_count)
+        ]
 
     async def enquere_async(self, data: Any) -> Any:
+        if self._is_closed:
+            raise Exception("Queue is closed.")
+
         self._logger.debug(f"Enquere: {data}")
-        result_future = asyncio.get_event_loop().create_future()
+        result_future = asyncio.get_running_loop().create_future()
         await self.queue.put((data, result_future))
         return await result_future
 
+    async def close(self, drain: bool = True):
+        """
+        キューを閉じます。
+
+        Args:
+            drain (bool): 処理待ちのデータを全て処理してから閉じるかどうか。
+                Falseの場合、処理待ちのデータはキャンセルします。
+        """
+
+        if self._is_closed:
+            return
+        self._is_closed = True
+
+        if drain:
+            for _ in self._worker_tasks:
+                await self.queue.put((_STOP, None))
+            await asyncio.gather(*self._worker_tasks)
+            return
+
+        for worker_task in self._worker_tasks:
+            worker_task.cancel()
+        while not self.queue.empty():
+            _, result_future = self.queue.get_nowait()
+            if result_future and not result_future.done():
+                result_future.cancel()
+
     async def _process_queue(self):
         while True:
-            await asyncio.sleep(self.wait_time)
-            if not self.queue.empty():
-                self._logger.debug(f"Start. Queue task: {self.queue.qsize()}")
-                data, result_future = await self.queue.get()
-                try:
-                    result = await self.execute(data)
+            data, result_future = await self.queue.get()
+            if data is _STOP:
+                return
+            if result_future.done():
+                # 呼び出し元でキャンセルされた
+                continue
+
+            self._logger.debug(f"Start. Queue task: {self.queue.qsize()}")
+            try:
+                if self.rate_limiter:
+                    await self.rate_limiter.acquire()
+                result = await self.execute(data)
+                if not result_future.done():
                     result_future.set_result(result)
-                except Exception as e:
-                    self._logger.error(f"Queue task error: {e}")
-                    self._logger.error(f"traceBack: {e.__traceback__}")
+            except asyncio.CancelledError:
+                result_future.cancel()
+                raise
+            except Exception as e:
+                self._logger.error(f"Queue task error: {e}")
+                self._logger.error(f"traceBack: {e.__traceback__}")
+                if not result_future.done():
                     result_future.set_exception(e)
-                finally:
-                    self._logger.debug("End Queue task.")
+            finally:
+                self._logger.debug("End Queue task.")
 
     @abstractmethod
     async def execute(self, data: Any) -> Any:
         pass
 
 
+# 応答の本文をまだデコードしていないことを表す値
+_NOT_DECODED = object()
+
+
 @dataclass
 class HttpRequestQueueResponse:
     status: int
     body: str = None
+    headers: Mapping[str, str] = None
+    # リトライした回数と、リトライで待機した合計秒数
+    retry_count: int = 0
+    backoff_time: float = 0.0
+    # パーサーを指定した場合の解析結果 (bodyはNone)。ログに全体を出力しない
+    parsed: Any = field(default=None, repr=False)
+    _json: Any = field(default=_NOT_DECODED, init=False, repr=False, compare=False)
+
+    def json(self) -> Any:
+        """
+        本文をJSONとしてデコードした値を返します。デコードは初回のみ行います。
+        本文が無い場合やJSONでない場合はNoneを返します。
+        """
+
+        if self._json is _NOT_DECODED:
+            self._json = safe_json_loads(self.body) if self.body else None
+        return self._json
+
+
+@dataclass
+class RetryPolicy:
+    """
+    リトライの方針を表すクラス。
+    待機時間は指数関数的に増やし、0からその値までの乱数 (Full Jitter) とします。
+    Retry-Afterヘッダーがある場合は、少なくともその時間は待機します。
+
+    POSTなど冪等でないリクエストは、サーバーで処理されていないことが明らかな
+    接続失敗と、retry_statuses_not_idempotentのステータスの場合のみリトライします。
+    503は処理後に返される場合もあり、リトライすると重複して登録されるため対象外です。
+
+    Attributes:
+        max_retries (int): 最大リトライ回数。
+        base_delay (float): 1回目のリトライの待機時間の上限秒数。
+        max_delay (float): 待機時間の上限秒数。
+        max_elapsed (float): 最初のリクエストからリトライを続ける上限秒数。
+        retry_statuses (tuple[int, ...]): 冪等なリクエストでリトライするステータス。
+        retry_statuses_not_idempotent (tuple[int, ...]): 冪等でないリクエストでリトライするステータス。
+    """
+
+    max_retries: int = 2
+    base_delay: float = 0.1
+    max_delay: float = 10.0
+    max_elapsed: float = 60.0
+    retry_statuses: tuple[int, ...] = (429, 502, 503, 504)
+    retry_statuses_not_idempotent: tuple[int, ...] = (429,)
+
+    def get_retry_delay(
+        self,
+        retry_count: int,
+        is_idempotent: bool,
+        response: Optional[HttpRequestQueueResponse] = None,
+        error: Optional[Exception] = None,
+    ) -> Optional[float]:
+        """
+        リトライまでの待機秒数を返します。リトライしない場合は None を返します。
+        """
+
+        if retry_count >= self.max_retries:
+            return None
+
+        if error is not None:
+            if not isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError)):
+                return None
+            if not is_idempotent and not isinstance(
+                error, aiohttp.ClientConnectorError
+            ):
+                return None
+        else:
+            statuses = (
+                self.retry_statuses
+                if is_idempotent
+                else self.retry_statuses_not_idempotent
+            )
+            if response is None or response.status not in statuses:
+                return None
+
+        backoff = min(self.max_delay, self.base_delay * 2**retry_count)
+        delay = random.uniform(0, backoff)
+        retry_after = self._get_retry_after(response)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _get_retry_after(
+        self, response: Optional[HttpRequestQueueResponse]
+    ) -> Optional[float]:
+        if response is None or not response.headers:
+            return None
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        try:
+            retry_time = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (retry_time - datetime.now(timezone.utc)).total_seconds())
 
 
 class HttpRequestQueue(AsyncQueue):
-    def __init__(self, wait_time_ms: int, retry_count: int = 2, headers: dict = None):
-        super().__init__(wait_time_ms)
+    def __init__(
+        self,
+        wait_time_ms: int,
+        retry_count: int = 2,
+        headers: dict = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        worker_count: Optional[int] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        concurrency_controller: Optional[ConcurrencyController] = None,
+    ):
+        if rate_limiter is None and config["requests_per_second"]:
+            rate_limiter = RateLimiter(config["requests_per_second"], config["burst"])
+        worker_count = worker_count or config["worker_count"]
+        super().__init__(rate_limiter, worker_count)
+        if concurrency_controller is None and config["adaptive_concurrency"]:
+            concurrency_controller = ConcurrencyController(
+                initial_limit=min(config["initial_concurrency"], worker_count),
+                max_limit=worker_count,
+            )
+        self.concurrency_controller = concurrency_controller
+        self.wait_time = wait_time_ms / 1000.0  # Convert milliseconds to seconds
         self.headers = headers
         self.retry_count = retry_count
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_retries=retry_count,
+            base_delay=self.wait_time,
+            max_delay=config["retry_max_delay"],
+            max_elapsed=config["retry_max_elapsed"],
+        )
+        self._session: aiohttp.ClientSession = None
+
+    async def close(self, drain: bool = True):
+        """キューを閉じた後、接続プールを含むセッションを閉じます。"""
+
+        await super().close(drain)
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # 接続を使い回すため、セッションはキュー毎に1つだけ作成する
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=config["connector_limit"],
+                limit_per_host=config["connector_limit_per_host"],
+                ttl_dns_cache=config["dns_cache_ttl"],
+                keepalive_timeout=config["keepalive_timeout"],
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=None,
+                    sock_connect=config["connect_timeout"],
+                    sock_read=config["read_timeout"],
+                ),
+            )
+        return self._session
 
     async def execute(self, data: Any) -> Any:
+        """
+        リクエストを送信します。jsonがある場合はPOST、ない場合はGETで送信します。
+        POSTのリクエストは、dataのidempotentにTrueを指定した場合のみ冪等として扱います。
+        dataのparserにパーサーを作成する関数を指定した場合は、成功した応答の本文を
+        少しずつパーサーのfeedに渡し、closeの戻り値を応答のparsedに設定します。
+        """
+
         if not data["url"]:
             raise ValueError("url is required")
 
         url = data["url"]
         headers = data.get("headers", {})
         json_data = data.get("json", None)
+        is_idempotent = data.get("idempotent", json_data is None)
+        parser = data.get("parser", None)
 
         if headers is None:
             headers = {}
@@ -71,36 +416,104 @@ class HttpRequestQueue(AsyncQueue):
         self._logger.debug(f"Headers: {headers}")
         self._logger.debug(f"json: {json_data}")
 
-        q_response = None
-        count = 0
-        while q_response is None:
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        retry_count = 0
+        backoff_time = 0.0
+        while True:
+            q_response = None
+            error = None
             try:
-                async with aiohttp.ClientSession() as session:
-                    if json_data is None:
-                        async with session.get(url, headers=headers) as response:
-                            self._logger.debug(f"Response: {response}")
-                            q_response = HttpRequestQueueResponse(
-                                response.status, await response.text()
-                            )
-                    else:
-                        headers["Content-Type"] = "application/json"
-                        async with session.post(
-                            url, json=json_data, headers=headers
-                        ) as response:
-                            self._logger.debug(f"Response: {response}")
-                            q_response = HttpRequestQueueResponse(
-                                response.status, await response.text()
-                            )
+                q_response = await self._send_async(url, headers, json_data, parser)
             except Exception as e:
                 self._logger.error(f"Request error: {e}")
                 self._logger.error(f"traceBack: {e.__traceback__}")
+                error = e
+
+            delay = self.retry_policy.get_retry_delay(
+                retry_count, is_idempotent, q_response, error
+            )
+            elapsed = loop.time() - start_time
+            if delay is None or elapsed + delay > self.retry_policy.max_elapsed:
+                break
 
-                if not count < self.retry_count:
-                    raise e
+            retry_count += 1
+            backoff_time += delay
+            reason = q_response.status if q_response else error
+            self._logger.info(
+                f"Retry count: {retry_count}... ({reason}, wait: {delay:.2f}s)"
+            )
+            await asyncio.sleep(delay)
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
 
-                count += 1
-                self._logger.info(f"Retry count: {count}...")
-                await asyncio.sleep(self.wait_time / 1000.0)
+        if error is not None:
+            raise error
 
+        q_response.retry_count = retry_count
+        q_response.backoff_time = backoff_time
         self._logger.debug(f"Response: {q_response}")
         return q_response
+
+    async def _send_async(
+        self,
+        url: str,
+        headers: dict,
+        json_data: Optional[dict],
+        parser: Optional[Callable[[], Any]] = None,
+    ) -> HttpRequestQueueResponse:
+        controller = self.concurrency_controller
+        if controller is None:
+            return await self._send_request_async(url, headers, json_data, parser)
+
+        await controller.acquire()
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        latency = None
+        is_overloaded = False
+        try:
+            response = await self._send_request_async(
+                url, headers, json_data, parser
+            )
+            is_overloaded = response.status == 429 or response.status >= 500
+            latency = loop.time() - start_time
+            return response
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            is_overloaded = True
+            latency = loop.time() - start_time
+            raise
+        finally:
+            await controller.release(latency, is_overloaded)
+
+    async def _send_request_async(
+        self,
+        url: str,
+        headers: dict,
+        json_data: Optional[dict],
+        parser: Optional[Callable[[], Any]] = None,
+    ) -> HttpRequestQueueResponse:
+        session = self._get_session()
+        if json_data is None:
+            request = session.get(url, headers=headers)
+        else:
+            headers["Content-Type"] = "application/json"
+            request = session.post(url, json=json_data, headers=headers)
+
+        async with request as response:
+            self._logger.debug(f"Response: {response}")
+            if parser is None or response.status != 200:
+                return HttpRequestQueueResponse(
+                    response.status, await response.text(), response.headers
+                )
+
+            # 本文全体を読み込まずに、受信した分から解析する
+            stream_parser = parser()
+            decoder = codecs.getincrementaldecoder(response.charset or "utf-8")()
+            async for chunk in response.content.iter_chunked(
+                config["stream_chunk_size"]
+            ):
+                stream_parser.feed(decoder.decode(chunk))
+            stream_parser.feed(decoder.decode(b"", final=True))
+            return HttpRequestQueueResponse(
+                response.status, headers=response.headers, parsed=stream_parser.close()
+            )
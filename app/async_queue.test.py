@@ -0,0 +1,409 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import aiohttp
+from aiohttp import web
+
+from . import async_queue
+
+
+class _EchoQueue(async_queue.AsyncQueue):
+    def __init__(self, rate_limiter=None, delay: float = 0, worker_count: int = 1):
+        super().__init__(rate_limiter, worker_count)
+        self.delay = delay
+        self.started = []
+
+    async def execute(self, data):
+        self.started.append(asyncio.get_running_loop().time())
+        await asyncio.sleep(self.delay)
+        if isinstance(data, Exception):
+            raise data
+        return data
+
+
+async def _start_server(handler) -> tuple[web.AppRunner, str]:
+    server_app = web.Application()
+    server_app.router.add_route("*", "/{tail:.*}", handler)
+    runner = web.AppRunner(server_app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def test_reuse_connection():
+    ports = []
+
+    async def handler(request: web.Request):
+        ports.append(request.transport.get_extra_info("peername")[1])
+        return web.json_response({"path": request.path})
+
+    async def run():
+        runner, base_url = await _start_server(handler)
+        queue = async_queue.HttpRequestQueue(0)
+        try:
+            for i in range(10):
+                response = await queue.enquere_async({"url": f"{base_url}/{i}"})
+                if response.status != 200:
+                    raise Exception(f"ステータスが正しくありません。:{response}")
+            response = await queue.enquere_async(
+                {"url": f"{base_url}/post", "json": {"id": 1}}
+            )
+            if response.status != 200:
+                raise Exception(f"ステータスが正しくありません。:{response}")
+
+            session = queue._session
+        finally:
+            await queue.close()
+            await runner.cleanup()
+
+        if not session.closed:
+            raise Exception("セッションが閉じられていません。")
+        return ports
+
+    asyncio.run(run())
+
+    if len(ports) != 11:
+        raise Exception(f"リクエスト数が正しくありません。:{ports}")
+    if len(set(ports)) != 1:
+        raise Exception(f"接続が使い回されていません。:{set(ports)}")
+
+
+def test_no_idle_wait():
+    async def run():
+        queue = _EchoQueue()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = [await queue.enquere_async(i) for i in range(20)]
+        elapsed = loop.time() - start
+        await queue.close()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(run())
+    if results != list(range(20)):
+        raise Exception(f"結果が正しくありません。:{results}")
+    # 1件毎に待機していた場合は2秒かかる
+    if elapsed > 0.5:
+        raise Exception(f"連続した処理に待機時間があります。:{elapsed}")
+
+
+def test_rate_limiter():
+    async def run():
+        # 2件までは連続して開始し、以降は1秒に20件 (50ms間隔) まで
+        queue = _EchoQueue(async_queue.RateLimiter(20, burst=2), worker_count=4)
+        await asyncio.gather(*[queue.enquere_async(i) for i in range(6)])
+        await queue.close()
+        return queue.started
+
+    started = asyncio.run(run())
+    elapsed = [time - started[0] for time in started]
+    if elapsed[1] > 0.02:
+        raise Exception(f"連続して開始されていません。:{elapsed}")
+    for i, time in enumerate(elapsed[2:], start=1):
+        if time < i * 0.05 - 0.005:
+            raise Exception(f"開始間隔が短すぎます。:{elapsed}")
+
+
+def test_worker_count():
+    async def run(worker_count: int):
+        queue = _EchoQueue(delay=0.1, worker_count=worker_count)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await asyncio.gather(*[queue.enquere_async(i) for i in range(8)])
+        elapsed = loop.time() - start
+        await queue.close()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(run(4))
+    if results != list(range(8)):
+        raise Exception(f"結果が正しくありません。:{results}")
+    # 4件ずつ並列に処理されるため、直列の0.8秒に対して0.2秒程度で終わる
+    if elapsed > 0.4:
+        raise Exception(f"並列に処理されていません。:{elapsed}")
+
+
+def test_close():
+    async def run():
+        queue = _EchoQueue(delay=0.01)
+        tasks = [asyncio.create_task(queue.enquere_async(i)) for i in range(5)]
+        error = asyncio.create_task(queue.enquere_async(ValueError("error")))
+        await asyncio.sleep(0)
+
+        # 処理待ちのデータを全て処理してから閉じる
+        await queue.close()
+        results = [task.result() for task in tasks]
+        if not isinstance(error.exception(), ValueError):
+            raise Exception(f"例外が伝播していません。:{error}")
+        if not all(task.done() for task in queue._worker_tasks):
+            raise Exception("ワーカーが終了していません。")
+
+        try:
+            await queue.enquere_async(0)
+            raise Exception("閉じたキューに追加できました。")
+        except Exception as e:
+            if str(e) != "Queue is closed.":
+                raise
+
+        # 処理待ちのデータをキャンセルして閉じる
+        queue = _EchoQueue(delay=1, worker_count=2)
+        tasks = [asyncio.create_task(queue.enquere_async(i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        await queue.close(drain=False)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if not all(task.cancelled() for task in tasks):
+            raise Exception(f"処理待ちのデータがキャンセルされていません。:{tasks}")
+        return results
+
+    results = asyncio.run(run())
+    if results != list(range(5)):
+        raise Exception(f"結果が正しくありません。:{results}")
+
+
+def test_read_timeout():
+    # 受信が続いている応答はタイムアウトせず、途切れた場合のみタイムアウトする
+    async def handler(request: web.Request):
+        if request.path == "/stall":
+            await asyncio.sleep(0.5)
+            return web.json_response({})
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for _ in range(5):
+            await asyncio.sleep(0.1)
+            await response.write(b" ")
+        await response.write_eof()
+        return response
+
+    async def run():
+        runner, base_url = await _start_server(handler)
+        policy = async_queue.RetryPolicy(max_retries=0)
+        queue = async_queue.HttpRequestQueue(0, retry_policy=policy)
+        try:
+            response = await queue.enquere_async({"url": f"{base_url}/stream"})
+            try:
+                await queue.enquere_async({"url": f"{base_url}/stall"})
+            except asyncio.TimeoutError:
+                return response, None
+            return response, "タイムアウトしていません。"
+        finally:
+            await queue.close()
+            await runner.cleanup()
+
+    read_timeout = async_queue.config["read_timeout"]
+    async_queue.config["read_timeout"] = 0.3
+    try:
+        response, error = asyncio.run(run())
+    finally:
+        async_queue.config["read_timeout"] = read_timeout
+
+    if response.status != 200 or len(response.body) != 5:
+        raise Exception(f"受信中の応答がタイムアウトしました。:{response}")
+    if error:
+        raise Exception(error)
+
+
+def test_retry():
+    statuses = {}
+
+    async def handler(request: web.Request):
+        # /{ステータス}/{失敗する回数}
+        _, status, fail_count = request.path.split("/")
+        key = (request.method, request.path)
+        statuses[key] = statuses.get(key, 0) + 1
+        if statuses[key] <= int(fail_count):
+            return web.Response(status=int(status), headers={"Retry-After": "0"})
+        return web.json_response({"count": statuses[key]})
+
+    async def run():
+        runner, base_url = await _start_server(handler)
+        policy = async_queue.RetryPolicy(max_retries=3, base_delay=0.01)
+        queue = async_queue.HttpRequestQueue(0, retry_policy=policy)
+
+        async def request(path: str, **data):
+            return await queue.enquere_async({"url": base_url + path, **data})
+
+        try:
+            return {
+                "get_503": await request("/503/2"),
+                "get_503_over": await request("/503/5"),
+                "post_500": await request("/500/1", json={}),
+                "post_502": await request("/502/1", json={}),
+                "post_503": await request("/503/1", json={}),
+                "post_502_idempotent": await request(
+                    "/502/2", json={}, idempotent=True
+                ),
+                "post_429": await request("/429/1", json={}),
+            }
+        finally:
+            await queue.close()
+            await runner.cleanup()
+
+    responses = asyncio.run(run())
+    expects = {
+        "get_503": (200, 2),
+        "get_503_over": (503, 3),
+        # 冪等でないリクエストはサーバーで処理された可能性がある場合にリトライしない
+        "post_500": (500, 0),
+        "post_502": (502, 0),
+        "post_503": (503, 0),
+        "post_502_idempotent": (200, 2),
+        "post_429": (200, 1),
+    }
+    for name, (status, retry_count) in expects.items():
+        response = responses[name]
+        if (response.status, response.retry_count) != (status, retry_count):
+            raise Exception(f"{name}のリトライ結果が正しくありません。:{response}")
+
+
+def test_retry_policy():
+    policy = async_queue.RetryPolicy(max_retries=5, base_delay=1, max_delay=4)
+    for retry_count in range(5):
+        delay = policy.get_retry_delay(retry_count, True, _response(503))
+        if not 0 <= delay <= min(4, 2**retry_count):
+            raise Exception(f"待機時間が範囲外です。:{retry_count} {delay}")
+
+    if policy.get_retry_delay(5, True, _response(503)) is not None:
+        raise Exception("最大リトライ回数を超えてリトライしています。")
+
+    delay = policy.get_retry_delay(0, True, _response(429, {"Retry-After": "3"}))
+    if delay < 3:
+        raise Exception(f"Retry-Afterの秒数を待機していません。:{delay}")
+
+    retry_time = datetime.now(timezone.utc) + timedelta(seconds=30)
+    headers = {"Retry-After": format_datetime(retry_time, usegmt=True)}
+    delay = policy.get_retry_delay(0, False, _response(429, headers))
+    if not 28 <= delay <= 30:
+        raise Exception(f"Retry-Afterの日時まで待機していません。:{delay}")
+
+    # 冪等でないリクエストは接続できなかった場合のみリトライする
+    if policy.get_retry_delay(0, False, error=aiohttp.ServerDisconnectedError()):
+        raise Exception("送信済みの可能性があるリクエストをリトライしています。")
+    error = aiohttp.ClientConnectorError(None, OSError(111, "refused"))
+    if policy.get_retry_delay(0, False, error=error) is None:
+        raise Exception("接続できなかったリクエストをリトライしていません。")
+
+
+def test_concurrency_controller():
+    async def run():
+        controller = async_queue.ConcurrencyController(
+            initial_limit=2, min_limit=1, max_limit=4
+        )
+
+        # 正常な応答が続く間は増やす (上限まで)
+        for _ in range(20):
+            await controller.acquire()
+            await controller.release(0.1)
+        if controller.limit != 4:
+            raise Exception(f"同時実行数が増えていません。:{controller.limit}")
+
+        # 遅延が大きい場合は増やさない
+        controller.limit = 3
+        await controller.acquire()
+        await controller.release(1.0)
+        if controller.limit != 3:
+            raise Exception(f"遅延が大きい場合に増えています。:{controller.limit}")
+
+        # 過負荷の場合は半分に減らす (同時に失敗した分は1回だけ)
+        controller.limit = 4
+        for _ in range(3):
+            await controller.acquire()
+        for _ in range(3):
+            await controller.release(0.1, is_overloaded=True)
+        if controller.limit != 2:
+            raise Exception(f"同時実行数が半分になっていません。:{controller.limit}")
+
+        await asyncio.sleep(0.11)
+        await controller.acquire()
+        await controller.release(0.1, is_overloaded=True)
+        await asyncio.sleep(0.11)
+        await controller.acquire()
+        await controller.release(0.1, is_overloaded=True)
+        if controller.limit != 1 or controller.in_flight != 0:
+            raise Exception(f"下限を超えて減っています。:{controller.limit}")
+
+    asyncio.run(run())
+
+
+def test_adaptive_concurrency():
+    capacity = 3
+    in_flight = 0
+    counts = {"ok": 0, "overloaded": 0}
+
+    async def handler(request: web.Request):
+        nonlocal in_flight
+        if in_flight >= capacity:
+            counts["overloaded"] += 1
+            return web.Response(status=429)
+        in_flight += 1
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            in_flight -= 1
+        counts["ok"] += 1
+        return web.json_response({})
+
+    async def run():
+        runner, base_url = await _start_server(handler)
+        controller = async_queue.ConcurrencyController(
+            initial_limit=1, max_limit=10
+        )
+        queue = async_queue.HttpRequestQueue(
+            0,
+            rate_limiter=async_queue.RateLimiter(1000, burst=1000),
+            worker_count=10,
+            retry_policy=async_queue.RetryPolicy(max_retries=10, base_delay=0.01),
+            concurrency_controller=controller,
+        )
+        try:
+            responses = await asyncio.gather(
+                *[queue.enquere_async({"url": f"{base_url}/{i}"}) for i in range(100)]
+            )
+        finally:
+            await queue.close()
+            await runner.cleanup()
+        return responses, controller
+
+    responses, controller = asyncio.run(run())
+    if any(response.status != 200 for response in responses):
+        raise Exception(f"失敗したリクエストがあります。:{counts}")
+    # 同時実行数はサーバーの処理能力付近に収まり、上限までは増えない
+    if not 1 <= controller.limit < 10 or controller.in_flight != 0:
+        raise Exception(f"同時実行数が調整されていません。:{controller.limit}")
+    if counts["overloaded"] > counts["ok"] / 2:
+        raise Exception(f"過負荷の応答が多すぎます。:{counts}")
+
+
+def test_response_json():
+    response = async_queue.HttpRequestQueueResponse(200, '{"id": 1, "items": []}')
+    value = response.json()
+    if value != {"id": 1, "items": []}:
+        raise Exception(f"デコード結果が正しくありません。:{value}")
+    # デコードは初回のみ行い、同じ値を返す
+    if response.json() is not value:
+        raise Exception("デコード結果が再利用されていません。")
+    if response != async_queue.HttpRequestQueueResponse(200, response.body):
+        raise Exception("デコード結果が比較に含まれています。")
+
+    for body in [None, "", "<html></html>"]:
+        if async_queue.HttpRequestQueueResponse(500, body).json() is not None:
+            raise Exception(f"JSONでない本文がデコードされました。:{body}")
+
+
+def _response(status: int, headers: dict = None):
+    return async_queue.HttpRequestQueueResponse(status, headers=headers)
+
+
+if __name__ == "__main__":
+    test_reuse_connection()
+    test_no_idle_wait()
+    test_rate_limiter()
+    test_worker_count()
+    test_close()
+    test_read_timeout()
+    test_retry()
+    test_retry_policy()
+    test_concurrency_controller()
+    test_adaptive_concurrency()
+    test_response_json()
+    print("全てのテストが正常に完了しました。")
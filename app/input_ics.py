@@ -1,20 +1,19 @@
+import heapq
+import itertools
 import re
-from dataclasses import dataclass
-from datetime import date, datetime, timedelta
-from typing import List, Optional
-
-from dateutil.rrule import rrulestr
-from icalendar import Calendar
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from typing import Iterable, List, Optional, Union
 
 from .date import now, strptime
 from .logger import CustomLogger
 from .model import Event, Schedule
-from .util import open_file
+from .util import open_text_stream
 
 logger = CustomLogger(name=__name__)
 
-now_date = now()
-start_date = now_date - timedelta(days=30)
+# 取り込み対象期間（日数）の既定値
+default_window_days = 30
 
 
 @dataclass
@@ -29,17 +28,228 @@ class InputICSResult:
         return self.events[-1].schedule.get_base_date() if self.events else None
 
 
-def _parse_recurrence(event) -> Optional[List[datetime]]:
+class _TimezoneCache:
+    """
+    1ファイル分のタイムゾーン解決結果を保持するキャッシュ。
+    TZIDはファイル内のVTIMEZONEから一度だけtzinfoに変換し、
+    UTCオフセットは1時間を通して変わらない場合のみ、1時間単位の変換表としてメモ化します。
+    """
+
+    def __init__(self):
+        self._tzinfos: dict[str, tzinfo] = {}
+        self._offsets: dict[tuple, Optional[timedelta]] = {}
+        self._local_tzinfos: dict[datetime, Optional[tzinfo]] = {}
+
+    def add(self, component):
+        """VTIMEZONEコンポーネントを登録します。"""
+
+        tzid = str(component.get("TZID") or "")
+        if not tzid or tzid in self._tzinfos:
+            return
+        try:
+            self._tzinfos[tzid] = component.to_tz()
+        except Exception as e:
+            logger.warn(f"VTIMEZONEの変換に失敗しました。: {tzid} {e}")
+
+    def resolve(self, prop) -> Union[date, datetime]:
+        """プロパティの日時をファイル内のVTIMEZONEで解決します。"""
+
+        return self.localize(prop.dt, prop.params.get("TZID"))
+
+    def localize(
+        self, value: Union[date, datetime], tzid: Optional[str]
+    ) -> Union[date, datetime]:
+        if not tzid or not isinstance(value, datetime) or value.tzinfo is None:
+            return value
+
+        tz = self._tzinfos.get(tzid)
+        if tz is None or tz is value.tzinfo:
+            return value
+        return value.replace(tzinfo=tz)
+
+    def to_local(self, value: datetime) -> datetime:
+        """datetime.astimezone()と同じ結果を変換表から求めます。"""
+
+        if value.tzinfo is None:
+            return value.astimezone()
+
+        wall_hour = value.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+        key = (value.tzinfo, wall_hour, value.fold)
+        if key not in self._offsets:
+            self._offsets[key] = _get_hour_offset(
+                value.replace(minute=0, second=0, microsecond=0)
+            )
+        offset = self._offsets[key]
+        if offset is None:
+            offset = value.utcoffset()
+
+        utc = (value.replace(tzinfo=None) - offset).replace(tzinfo=timezone.utc)
+        utc_hour = utc.replace(minute=0, second=0, microsecond=0)
+        if utc_hour not in self._local_tzinfos:
+            start = utc_hour.astimezone()
+            end = (utc_hour + _last_of_hour).astimezone()
+            # 1時間の途中でオフセットが切り替わる場合 (30分単位のタイムゾーン等) は変換表に載せない
+            self._local_tzinfos[utc_hour] = (
+                start.tzinfo if _is_same_offset(start, end) else None
+            )
+        local_tz = self._local_tzinfos[utc_hour]
+        if local_tz is None:
+            return utc.astimezone()
+        return utc.astimezone(local_tz)
+
+
+# 1時間の最後の時刻までの差
+_last_of_hour = timedelta(hours=1) - timedelta(microseconds=1)
+
+
+def _get_hour_offset(wall_hour: datetime) -> Optional[timedelta]:
+    """1時間を通して同じUTCオフセットの場合はそのオフセット、途中で切り替わる場合はNoneを返します。"""
+
+    end = wall_hour + _last_of_hour
+    return wall_hour.utcoffset() if _is_same_offset(wall_hour, end) else None
+
+
+def _is_same_offset(start: datetime, end: datetime) -> bool:
+    return start.utcoffset() == end.utcoffset() and start.tzname() == end.tzname()
+
+
+@dataclass
+class _RecurrenceExclusion:
+    """繰り返しイベントから除外する日時（EXDATE・RECURRENCE-ID）"""
+
+    datetimes: set[datetime] = field(default_factory=set)
+    dates: set[date] = field(default_factory=set)
+
+    def add(self, value: Union[date, datetime]):
+        if isinstance(value, datetime):
+            self.datetimes.add(value if value.tzinfo else value.astimezone())
+        else:
+            self.dates.add(value)
+
+    def contains(self, value: datetime) -> bool:
+        if value.tzinfo is None:
+            value = value.astimezone()
+        return value in self.datetimes or value.date() in self.dates
+
+
+class _RecurrenceIndex:
+    """
+    UIDをキーに繰り返しイベントと除外日時を管理するインデックス。
+    VEVENTの解析時に登録し、全件の解析後に除外日時を繰り返し日程へ反映します。
+    """
+
+    def __init__(self, timezones: _TimezoneCache):
+        self._masters: dict[str, List[Event]] = {}
+        self._exclusions: dict[str, _RecurrenceExclusion] = {}
+        self._timezones = timezones
+
+    def add(self, component, event: Optional[Event]):
+        uid = _get_uid(component)
+        if uid is None:
+            return
+
+        # 変更・キャンセルされた回はRECURRENCE-IDで元の開始日時を示す
+        recurrence_id = component.get("RECURRENCE-ID")
+        if recurrence_id is not None:
+            self._get_exclusion(uid).add(self._timezones.resolve(recurrence_id))
+            return
+
+        if event is None or event.recurrence is None:
+            return
+
+        self._masters.setdefault(uid, []).append(event)
+        for exdate in _iter_exdates(component, self._timezones):
+            self._get_exclusion(uid).add(exdate)
+
+    def apply(self) -> tuple[set[int], List[str]]:
+        """除外日時を繰り返し日程へ反映します。
+
+        Returns:
+            tuple[set[int], List[str]]: 削除するイベントのid()とエラーメッセージのリスト
+        """
+
+        removed = set()
+        error_messages = []
+        for uid, exclusion in self._exclusions.items():
+            for event in self._masters.get(uid, []):
+                recurrence = [
+                    rec for rec in event.recurrence if not exclusion.contains(rec)
+                ]
+                if len(recurrence) == len(event.recurrence):
+                    continue
+                event.recurrence = recurrence
+
+                if not exclusion.contains(event.schedule.start):
+                    continue
+
+                # 初回が除外された場合、残りの最初の回を基準日にする
+                if not recurrence:
+                    removed.add(id(event))
+                    error_messages.append(f"除外された繰り返しイベントです。：{event.name}")
+                    continue
+
+                # 繰り返し日程は元のタイムゾーンのため、ローカル時間に変換して置き換える
+                start = self._timezones.to_local(recurrence[0])
+                event.schedule = Schedule(
+                    start=start,
+                    end=start + (event.schedule.end - event.schedule.start),
+                )
+
+        return removed, error_messages
+
+    def _get_exclusion(self, uid: str) -> _RecurrenceExclusion:
+        if uid not in self._exclusions:
+            self._exclusions[uid] = _RecurrenceExclusion()
+        return self._exclusions[uid]
+
+
+def _get_uid(event) -> Optional[str]:
+    uid = event.get("UID")
+    return str(uid) if uid else None
+
+
+def _iter_exdates(event, timezones: _TimezoneCache):
+    exdates = event.get("EXDATE")
+    if exdates is None:
+        return
+    if not isinstance(exdates, list):
+        exdates = [exdates]
+    for exdate in exdates:
+        tzid = exdate.params.get("TZID")
+        for value in exdate.dts:
+            yield timezones.localize(value.dt, tzid)
+
+
+def get_default_window() -> tuple[datetime, datetime]:
+    """
+    現在日時を基準にした取り込み対象期間を返します。
+
+    Returns:
+        tuple[datetime, datetime]: 開始日時と終了日時
+    """
+
+    end_date = now()
+    return end_date - timedelta(days=default_window_days), end_date
+
+
+def _parse_recurrence(
+    event, timezones: _TimezoneCache, end_date: datetime
+) -> Optional[List[datetime]]:
     if event.get("RRULE") is None or event.get("DTSTART") is None:
         return None
+
+    from dateutil.rrule import rrulestr
+
     # print(event.get("SUMMARY"), ":", event.get("DTSTART"), ":", event.get("RRULE"))
     rrule = event.get("RRULE").to_ical().decode("utf-8")
-    dtstart = event.get("DTSTART")
-    recurrence = list(rrulestr(rrule, dtstart=dtstart.dt))
-    return [rec for rec in recurrence if rec <= now_date]
+    dtstart = timezones.resolve(event.get("DTSTART"))
+    recurrence = rrulestr(rrule, dtstart=dtstart)
+    return list(itertools.takewhile(lambda rec: rec <= end_date, recurrence))
 
 
-def _parse_event(event) -> tuple[List[Event], str]:
+def _parse_event(
+    event, timezones: _TimezoneCache, start_date: datetime, end_date: datetime
+) -> tuple[List[Event], str]:
     try:
         # イベントの名前、開始日時、終了日時を取得
         name = str(event.get("SUMMARY")) if event.get("SUMMARY") else None
@@ -47,12 +257,12 @@ def _parse_event(event) -> tuple[List[Event], str]:
         start = None
         dtstart = event.get("DTSTART")
         if dtstart and isinstance(dtstart.dt, datetime):
-            start = dtstart.dt.astimezone()
+            start = timezones.to_local(timezones.resolve(dtstart))
 
         end = None
         dtend = event.get("DTEND")
         if dtend and isinstance(dtend.dt, datetime):
-            end = dtend.dt.astimezone()
+            end = timezones.to_local(timezones.resolve(dtend))
 
         if not name or not start or not end:
             return None, f"不正な日付イベントです。：{event}"
@@ -61,7 +271,11 @@ def _parse_event(event) -> tuple[List[Event], str]:
             return None, f"終了日時が開始日時より前です。：{event}"
 
         # イベントの情報を取得
-        uuid = str(event.get("UID"))
+        uuid = _get_uid(event)
+        recurrence_id = event.get("RECURRENCE-ID")
+        if uuid and recurrence_id is not None:
+            # 繰り返しの変更回は親イベントと区別できるようにする
+            uuid = f"{uuid}_{timezones.resolve(recurrence_id).isoformat()}"
         organizer = str(event.get("ORGANIZER"))
         location = str(event.get("LOCATION"))
         is_private = str(event.get("CLASS")) == "PRIVATE"
@@ -71,8 +285,12 @@ def _parse_event(event) -> tuple[List[Event], str]:
             or name.startswith("キャンセル済み:")
         )
 
+        # キャンセルされた繰り返しの変更回は登録しない
+        if recurrence_id is not None and str(event.get("STATUS")) == "CANCELLED":
+            return None, f"キャンセルされた繰り返しイベントです。：{name}"
+
         # 繰り返しイベントの場合、繰り返しの日付を取得
-        recurrence = _parse_recurrence(event)
+        recurrence = _parse_recurrence(event, timezones, end_date)
 
         # イベントのスケジュールを作成
         event_schedule = Schedule(start=start, end=end)
@@ -109,7 +327,7 @@ def _parse_event_from_lines(event_lines):
     return event
 
 
-def _is_recent_event(event):
+def _is_recent_event(event, start_date: datetime):
     dtstart_match = re.match(r"DTSTART.*:(\d+)", event["DTSTART"])
     if not dtstart_match:
         return False
@@ -122,12 +340,17 @@ def _is_recent_event(event):
     return dtstart_date >= start_date
 
 
-def extract_recent_events(input_file, output_file) -> str:
+def extract_recent_events(
+    input_file, output_file, start_date: Optional[datetime] = None
+) -> str:
+    if start_date is None:
+        start_date, _ = get_default_window()
+
     recent_events = []
     current_event = []
     in_event = False
 
-    with open(input_file, "r", encoding="utf-8") as file:
+    with open_text_stream(input_file) as file:
         first_event_none = True
         for line in file:
             if not line.startswith(" "):
@@ -140,7 +363,7 @@ def extract_recent_events(input_file, output_file) -> str:
                 if in_event:
                     current_event.append(line)
                     event = _parse_event_from_lines(current_event)
-                    if _is_recent_event(event):
+                    if _is_recent_event(event, start_date):
                         recent_events.extend(current_event)
                 in_event = False
             elif in_event:
@@ -160,42 +383,140 @@ def extract_recent_events(input_file, output_file) -> str:
     return output_file
 
 
-def execute(file_path) -> InputICSResult:
+def _iter_components(lines: Iterable[str]):
+    """
+    VCALENDAR直下のコンポーネント（VTIMEZONE・VEVENTなど）を1つずつ解析して返します。
+    ファイル全体を保持せず、コンポーネント単位の行だけをバッファします。
+
+    Yields:
+        tuple[Optional[icalendar.Component], Optional[str]]: 解析したコンポーネントとエラーメッセージ
+    """
+
+    from icalendar import Component
+
+    block = []
+    depth = 0
+    found_calendar = False
+    for line in lines:
+        # 折り返し行は直前の行の続き
+        if line[:1] in (" ", "\t"):
+            if block:
+                block.append(line)
+            continue
+
+        name = line.strip().upper()
+        if name.startswith("BEGIN:"):
+            depth += 1
+            found_calendar = found_calendar or name == "BEGIN:VCALENDAR"
+        if depth >= 2:
+            block.append(line)
+        if name.startswith("END:"):
+            depth -= 1
+            if depth == 1 and block:
+                text = "".join(block)
+                block = []
+                try:
+                    yield Component.from_ical(text), None
+                except Exception as e:
+                    yield None, f"コンポーネントの解析に失敗しました。: {e}"
+
+    if not found_calendar:
+        raise ValueError("VCALENDARが見つかりません。")
+
+
+def _get_sort_key(event: Event):
+    return (event.schedule.start, (event.schedule.end - event.schedule.start))
+
+
+def merge_events(events_list: Iterable[List[Event]]) -> List[Event]:
+    """
+    ソート済みの複数ファイルのイベントを1つのイベントリストに統合します。
+    UIDと繰り返しの回（開始日時）が同じイベントは重複として除外します。
+
+    Args:
+        events_list (Iterable[List[Event]]): ファイル毎のソート済みイベントリスト
+
+    Returns:
+        List[Event]: 統合したソート済みイベントリスト
+    """
+
+    result = []
+    keys = set()
+    for event in heapq.merge(*events_list, key=_get_sort_key):
+        key = (event.uuid, event.schedule.start)
+        if key in keys:
+            continue
+        keys.add(key)
+        result.append(event)
+    return result
+
+
+def execute(
+    file_path,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> InputICSResult:
+    """
+    ICSファイルからイベントを取得します。
+
+    Args:
+        file_path (str): ICSファイルのパス
+        start_date (Optional[datetime]): 取り込み対象期間の開始日時。省略時は呼び出し時点から算出します。
+        end_date (Optional[datetime]): 取り込み対象期間の終了日時。省略時は呼び出し時点の日時です。
+
+    Returns:
+        InputICSResult: 解析結果
+    """
+
     result = InputICSResult()
     result.events = []
 
-    logger.debug(f"Start reading ICS file: {file_path}")
+    default_start_date, default_end_date = get_default_window()
+    start_date = start_date or default_start_date
+    end_date = end_date or default_end_date
 
-    # ファイルを開く
-    open_file_result = open_file(file_path)
-    if open_file_result.is_error():
-        result.error_message = (
-            f"{file_path}の読み取りに失敗しました。: {open_file_result.error_message}"
-        )
-        return result
+    logger.debug(f"Start reading ICS file: {file_path}")
 
-    # ICSファイルを読み込む
+    # ICSファイルを逐次読み込み、コンポーネント毎に解析
+    events = []
+    error_messages = []
+    timezones = _TimezoneCache()
+    recurrence_index = _RecurrenceIndex(timezones)
     try:
-        calendar = Calendar.from_ical(open_file_result.text)
+        with open_text_stream(file_path) as file:
+            for comp, error_message in _iter_components(file):
+                if comp is None:
+                    error_messages.append(f"【SKIP】 {error_message}")
+                elif comp.name == "VTIMEZONE":
+                    timezones.add(comp)
+                elif comp.name == "VEVENT":
+                    event, error_message = _parse_event(
+                        comp, timezones, start_date, end_date
+                    )
+                    recurrence_index.add(comp, event)
+                    if event:
+                        events.append(event)
+                    else:
+                        error_messages.append(f"【SKIP】 {error_message}")
+    except OSError as e:
+        result.error_message = f"{file_path}の読み取りに失敗しました。: {e}"
+        return result
     except Exception as e:
         result.error_message = (
             f"{file_path}の解析に失敗しました。:  {e}\nstacktrace: {e.__traceback__}"
         )
         return result
 
-    # ICSファイルのイベントを解析
-    events = []
-    error_messages = []
-    for comp in calendar.walk():
-        if comp.name == "VEVENT":
-            event, error_message = _parse_event(comp)
-            if event:
-                events.append(event)
-            else:
-                error_messages.append(f"【SKIP】 {error_message}")
+    # 繰り返しイベントの変更回・除外日を反映
+    removed, recurrence_error_messages = recurrence_index.apply()
+    if removed:
+        events = [event for event in events if id(event) not in removed]
+    error_messages.extend(
+        f"【SKIP】 {error_message}" for error_message in recurrence_error_messages
+    )
 
     # イベントをソート
-    events.sort(key=lambda x: (x.schedule.start, (x.schedule.end - x.schedule.start)))
+    events.sort(key=_get_sort_key)
 
     result.events = events
     result.error_message = "\n".join(error_messages)
@@ -0,0 +1,304 @@
+import bz2
+import gzip
+import lzma
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from . import input_ics
+
+now = datetime.now().astimezone().replace(hour=10, minute=0, second=0, microsecond=0)
+base = now - timedelta(days=7)
+
+ics_format = "%Y%m%dT%H%M%SZ"
+
+
+def _ics_date(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime(ics_format)
+
+
+def _execute(ics_text: str, **kwargs) -> input_ics.InputICSResult:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "test.ics")
+        with open(file_path, "w", encoding="utf-8") as file:
+            file.write(ics_text)
+        return input_ics.execute(file_path, **kwargs)
+
+
+def _vevent(uid: str, start: datetime, end: datetime, *lines: str) -> str:
+    return "\n".join(
+        [
+            "BEGIN:VEVENT",
+            f"UID:{uid}",
+            "SUMMARY:定例会議",
+            f"DTSTART:{_ics_date(start)}",
+            f"DTEND:{_ics_date(end)}",
+            *lines,
+            "END:VEVENT",
+        ]
+    )
+
+
+def _calendar(*vevents: str) -> str:
+    return "\n".join(["BEGIN:VCALENDAR", "VERSION:2.0", *vevents, "END:VCALENDAR"])
+
+
+@contextmanager
+def _local_timezone(name: str):
+    original = os.environ.get("TZ")
+    os.environ["TZ"] = name
+    time.tzset()
+    try:
+        yield
+    finally:
+        if original is None:
+            del os.environ["TZ"]
+        else:
+            os.environ["TZ"] = original
+        time.tzset()
+
+
+def test_recurrence_exdate():
+    exdate = base + timedelta(days=2)
+    result = _execute(
+        _calendar(
+            _vevent(
+                "recurrence-1",
+                base,
+                base + timedelta(hours=1),
+                "RRULE:FREQ=DAILY;COUNT=5",
+                f"EXDATE:{_ics_date(exdate)}",
+            )
+        )
+    )
+
+    if len(result.events) != 1:
+        raise Exception(f"イベント数が正しくありません。:{len(result.events)}")
+
+    recurrence_dates = [rec.date() for rec in result.events[0].recurrence]
+    if exdate.date() in recurrence_dates:
+        raise Exception(f"除外日が含まれています。:{recurrence_dates}")
+    if len(recurrence_dates) != 4:
+        raise Exception(f"繰り返し日程が正しくありません。:{recurrence_dates}")
+
+
+def test_recurrence_override():
+    moved = base + timedelta(days=1)
+    cancelled = base + timedelta(days=3)
+    result = _execute(
+        _calendar(
+            _vevent(
+                "recurrence-2",
+                base,
+                base + timedelta(hours=1),
+                "RRULE:FREQ=DAILY;COUNT=5",
+            ),
+            _vevent(
+                "recurrence-2",
+                moved + timedelta(hours=5),
+                moved + timedelta(hours=6),
+                f"RECURRENCE-ID:{_ics_date(moved)}",
+            ),
+            _vevent(
+                "recurrence-2",
+                cancelled,
+                cancelled + timedelta(hours=1),
+                f"RECURRENCE-ID:{_ics_date(cancelled)}",
+                "STATUS:CANCELLED",
+            ),
+        )
+    )
+
+    if len(result.events) != 2:
+        raise Exception(f"イベント数が正しくありません。:{len(result.events)}")
+
+    master, override = result.events
+    recurrence_dates = [rec.date() for rec in master.recurrence]
+    if moved.date() in recurrence_dates or cancelled.date() in recurrence_dates:
+        raise Exception(f"変更回が繰り返し日程に含まれています。:{recurrence_dates}")
+    if len(recurrence_dates) != 3:
+        raise Exception(f"繰り返し日程が正しくありません。:{recurrence_dates}")
+
+    if override.recurrence is not None:
+        raise Exception(f"変更回に繰り返し日程があります。:{override.recurrence}")
+    if override.schedule.start != moved + timedelta(hours=5):
+        raise Exception(f"変更回の開始時間が違います。:{override.schedule.start}")
+    if override.uuid == master.uuid:
+        raise Exception(f"変更回のUUIDが親イベントと同じです。:{override.uuid}")
+
+
+def test_recurrence_first_excluded():
+    result = _execute(
+        _calendar(
+            _vevent(
+                "recurrence-3",
+                base,
+                base + timedelta(hours=1),
+                "RRULE:FREQ=DAILY;COUNT=3",
+                f"EXDATE:{_ics_date(base)}",
+            )
+        )
+    )
+
+    if len(result.events) != 1:
+        raise Exception(f"イベント数が正しくありません。:{len(result.events)}")
+
+    event = result.events[0]
+    if event.schedule.get_base_date() != (base + timedelta(days=1)).date():
+        raise Exception(f"基準日が正しくありません。:{event.schedule.get_base_date()}")
+    if event.schedule.start.hour != base.hour:
+        raise Exception(f"開始時間が正しくありません。:{event.schedule.start}")
+
+
+def test_recurrence_first_excluded_other_date():
+    # UTCでは前日の回が、ローカル時間では翌日になる場合
+    if not hasattr(time, "tzset"):
+        return
+
+    start = datetime(2026, 10, 12, 23, tzinfo=timezone.utc)
+    with _local_timezone("Asia/Tokyo"):
+        result = _execute(
+            _calendar(
+                _vevent(
+                    "recurrence-4",
+                    start,
+                    start + timedelta(hours=1),
+                    "RRULE:FREQ=DAILY;COUNT=3",
+                    f"EXDATE:{_ics_date(start)}",
+                )
+            ),
+            start_date=start - timedelta(days=1),
+            end_date=start + timedelta(days=5),
+        )
+
+        if len(result.events) != 1:
+            raise Exception(f"イベント数が正しくありません。:{len(result.events)}")
+
+        schedule = result.events[0].schedule
+        expect = (start + timedelta(days=1)).astimezone()
+        if schedule.start != expect or schedule.start.hour != 8:
+            raise Exception(f"開始時間が正しくありません。:{schedule.start}")
+        if schedule.end != expect + timedelta(hours=1):
+            raise Exception(f"終了時間が正しくありません。:{schedule.end}")
+
+
+def test_merge_events():
+    shared = _vevent("shared", base, base + timedelta(hours=1))
+    result_1 = _execute(
+        _calendar(
+            shared,
+            _vevent("file-1", base + timedelta(hours=2), base + timedelta(hours=3)),
+        )
+    )
+    result_2 = _execute(
+        _calendar(_vevent("file-2", base - timedelta(hours=2), base), shared)
+    )
+
+    events = input_ics.merge_events([result_1.events, result_2.events])
+    uuids = [event.uuid for event in events]
+    if uuids != ["file-2", "shared", "file-1"]:
+        raise Exception(f"統合結果が正しくありません。:{uuids}")
+
+
+def test_custom_timezone():
+    vtimezone = "\n".join(
+        [
+            "BEGIN:VTIMEZONE",
+            "TZID:Custom Standard Time",
+            "BEGIN:STANDARD",
+            "DTSTART:16010101T000000",
+            "TZOFFSETFROM:+0530",
+            "TZOFFSETTO:+0530",
+            "END:STANDARD",
+            "END:VTIMEZONE",
+        ]
+    )
+    start = base.astimezone(timezone(timedelta(hours=5, minutes=30)))
+    wall_format = "%Y%m%dT%H%M%S"
+    result = _execute(
+        _calendar(
+            vtimezone,
+            "\n".join(
+                [
+                    "BEGIN:VEVENT",
+                    "UID:timezone-1",
+                    "SUMMARY:定例会議",
+                    f"DTSTART;TZID=Custom Standard Time:{start.strftime(wall_format)}",
+                    f"DTEND;TZID=Custom Standard Time:{(start + timedelta(hours=1)).strftime(wall_format)}",
+                    "END:VEVENT",
+                ]
+            ),
+        )
+    )
+
+    if len(result.events) != 1:
+        raise Exception(f"イベント数が正しくありません。:{len(result.events)}")
+
+    event = result.events[0]
+    if event.schedule.start != base or event.schedule.start.tzinfo != base.tzinfo:
+        raise Exception(f"開始時間が正しくありません。:{event.schedule.start}")
+    if event.schedule.end != base + timedelta(hours=1):
+        raise Exception(f"終了時間が正しくありません。:{event.schedule.end}")
+
+
+def test_to_local_half_hour_transition():
+    # 30分単位のタイムゾーンでは、毎正時以外にオフセットが切り替わる
+    if not hasattr(time, "tzset"):
+        return
+
+    from zoneinfo import ZoneInfo
+
+    start = datetime(2026, 10, 3, 15, tzinfo=timezone.utc)
+    values = [start + timedelta(minutes=i) for i in range(0, 180, 10)]
+    adelaide = ZoneInfo("Australia/Adelaide")
+    values += [value.astimezone(adelaide) for value in values]
+    with _local_timezone("Australia/Adelaide"):
+        timezones = input_ics._TimezoneCache()
+        for value in values:
+            result = timezones.to_local(value)
+            expect = value.astimezone()
+            if result != expect or result.utcoffset() != expect.utcoffset():
+                raise Exception(f"ローカル時間が正しくありません。:{value} {result} {expect}")
+
+
+def test_compressed_file():
+    ics_text = _calendar(_vevent("compressed-1", base, base + timedelta(hours=1)))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for opener, ext in [(gzip.open, ".gz"), (bz2.open, ".bz2"), (lzma.open, ".xz")]:
+            file_path = os.path.join(temp_dir, f"test.ics{ext}")
+            with opener(file_path, "wt", encoding="utf-8") as file:
+                file.write(ics_text)
+
+            result = input_ics.execute(file_path)
+            if result.error_message:
+                raise Exception(f"{ext}の読み込みに失敗しました。:{result.error_message}")
+            if [event.uuid for event in result.events] != ["compressed-1"]:
+                raise Exception(f"{ext}のイベントが正しくありません。:{result.events}")
+
+
+def test_window():
+    old = base - timedelta(days=60)
+    ics_text = _calendar(_vevent("window-1", old, old + timedelta(hours=1)))
+
+    result = _execute(ics_text)
+    if result.events:
+        raise Exception(f"期間外のイベントが含まれています。:{result.events}")
+
+    result = _execute(ics_text, start_date=old - timedelta(days=1), end_date=old)
+    if [event.uuid for event in result.events] != ["window-1"]:
+        raise Exception(f"指定期間のイベントが正しくありません。:{result.events}")
+
+
+if __name__ == "__main__":
+    test_recurrence_exdate()
+    test_recurrence_override()
+    test_recurrence_first_excluded()
+    test_recurrence_first_excluded_other_date()
+    test_merge_events()
+    test_custom_timezone()
+    test_to_local_half_hour_transition()
+    test_compressed_file()
+    test_window()
+    print("全てのテストが正常に完了しました。")
@@ -1,232 +1,804 @@
+import hashlib
+import json
+import os
 import re
+import time
 import traceback
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
 
-import fitz
-
-from .date import strptime
 from .logger import CustomLogger
 from .model import Schedule
+from .setting import get_data_path
+from .util import (
+    get_compression_opener,
+    open_file,
+    read_bytes,
+    safe_json_loads,
+    write_file,
+)
 
 logger = CustomLogger(name=__name__)
 
+# 解析結果が変わる変更をした場合は更新し、古いキャッシュを使用しないようにする
+parser_version = 2
+
+config = {
+    # このページ数以上のPDFはプロセスを分けてページ範囲毎に並列で読み込む (Noneは並列にしない)
+    # プロセスの起動 (Windowsはspawn) に数秒掛かり、1ページの読み込みは数ミリ秒のため既定は並列にしない
+    "parallel_page_threshold": None,
+    "parallel_max_workers": os.cpu_count() or 1,
+    # 並列で読み込む場合に1つのプロセスへ渡すページ数
+    "parallel_chunk_pages": 8,
+    # 単語の座標から表の行を組み立てて解析する (解析できない場合はテキストで解析する)
+    "layout_mode": False,
+    # 解析結果をPDFの内容のハッシュ毎に保存し、同じPDFの解析を省略する
+    "cache_enabled": True,
+    "cache_dir": os.path.join(get_data_path(), "pdf_cache"),
+    "cache_max_age_days": 90,
+    "cache_max_size": 10 * 1024 * 1024,
+}
+
+
+@dataclass
+class EmployeeSchedule:
+    """
+    社員毎のスケジュールを表すクラス。
+    Attributes:
+        name (Optional[str]): 氏名。PDFに氏名がない場合は None。
+        schedule (List[Schedule]): 勤務時間のスケジュール。
+        schedule_stamp (List[Schedule]): 打刻時間のスケジュール。
+    """
+
+    name: Optional[str] = None
+    schedule: List[Schedule] = field(default_factory=list)
+    schedule_stamp: List[Schedule] = field(default_factory=list)
+
 
 @dataclass
 class InputPDFResult:
     schedule: List[Schedule] = None
     schedule_stamp: List[Schedule] = None
     error_message: str = None
+    # 期間入力用のPDFなど、複数人の勤務実績を含む場合は社員毎に分かれる
+    employees: List[EmployeeSchedule] = None
 
 
-def _text_from_pdf(file_path):
-    pdf_document = fitz.open(file_path)
-    text = ""
-    for page_num in range(len(pdf_document)):
-        page = pdf_document.load_page(page_num)
-        text += page.get_text()
-    pdf_document.close()
-    return text
+def _open_pdf(file_path):
+    # キャッシュを使用する場合は読み込まないため、必要になるまでimportしない
+    import fitz
 
+    # PDFはランダムアクセスが必要なため、圧縮ファイルはメモリ上に展開して開く
+    if get_compression_opener(file_path):
+        return fitz.open(stream=read_bytes(file_path), filetype="pdf")
+    return fitz.open(file_path)
 
-def _get_around_lines(lines, row, around=2):
-    start = max(0, row - around)
-    end = min(len(lines), row + around + 1)
-    return lines[start:end]
 
+def _get_page_rows(words) -> List[List[str]]:
+    """
+    get_text("words")の単語を表の行毎にまとめます。
+    同じテキスト行の単語を1つのセルとし、縦位置が重なるセルを左から順に並べます。
+    """
 
-def _get_day_info(row, lines) -> Optional[tuple[int, str, bool, bool]]:
-    pattern_day1 = r"^\d+/\d+$"
-    pattern_day2 = r"^[月火水木金土日]$"
-    pattern_day3 = r"^所定休日$"
-    pattern_day4 = r"^＜休暇＞$"
+    cells = {}
+    for x0, y0, x1, y1, text, block_no, line_no, _ in words:
+        cell = cells.get((block_no, line_no))
+        if cell is None:
+            cells[(block_no, line_no)] = [x0, y0, x1, y1, [text]]
+        else:
+            cell[0] = min(cell[0], x0)
+            cell[1] = min(cell[1], y0)
+            cell[2] = max(cell[2], x1)
+            cell[3] = max(cell[3], y1)
+            cell[4].append(text)
+
+    rows = []
+    row_center = row_tolerance = None
+    for cell in sorted(cells.values(), key=lambda c: c[1] + c[3]):
+        center = (cell[1] + cell[3]) / 2
+        if rows and abs(center - row_center) <= row_tolerance:
+            rows[-1].append(cell)
+        else:
+            rows.append([cell])
+            row_center = center
+            row_tolerance = (cell[3] - cell[1]) / 2
 
-    day_str = None
+    return [
+        [" ".join(cell[4]) for cell in sorted(row, key=lambda c: c[0])]
+        for row in rows
+    ]
 
-    day_match = re.match(pattern_day1, lines[row].strip())
-    if not day_match or len(lines) <= row + 1:
-        return None
-    
-    day_str = day_match.group(0)
-    
-    row += 1
-    day_match = re.match(pattern_day2, lines[row].strip())
-    if not day_match:
-        return None
 
-    day_str = day_str + " " + day_match.group(0)
-    is_holiday = False
-    if day_str.endswith("土") or day_str.endswith("日"):
-        is_holiday = True
+def _get_page_content(page, layout: bool):
+    if layout:
+        return _get_page_rows(page.get_text("words"))
+    return page.get_text()
 
-    row += 1
-    day_match = re.match(pattern_day3, lines[row].strip())
-    if day_match:
-        is_holiday = True
 
-    day_match = re.match(pattern_day4, lines[row].strip())
-    is_paid_leave = False
-    if day_match:
-        is_paid_leave = True   
+def _iter_pdf_pages(pdf_document, layout: bool = False) -> Iterator:
+    for page_num in range(len(pdf_document)):
+        page = pdf_document.load_page(page_num)
+        yield _get_page_content(page, layout)
 
-    return (row, day_str, is_paid_leave, is_holiday)
 
+def _extract_page_range(file_path, start: int, end: int, layout: bool) -> list:
+    pdf_document = _open_pdf(file_path)
+    try:
+        return [
+            _get_page_content(pdf_document.load_page(i), layout)
+            for i in range(start, end)
+        ]
+    finally:
+        pdf_document.close()
+
+
+def _iter_pdf_pages_parallel(file_path, page_count: int, layout: bool) -> Iterator:
+    """
+    ページ範囲毎に別プロセスでページの内容を抽出し、ページ順に返します。
+    ページ範囲はワーカー数分だけ先に依頼し、1つ読み終える毎に次の範囲を依頼するため、
+    解析が途中で終了した場合は以降のページを読み込みません。
+    """
+
+    chunk_size = max(1, config["parallel_chunk_pages"])
+    ranges = deque(
+        (start, min(start + chunk_size, page_count))
+        for start in range(0, page_count, chunk_size)
+    )
+    max_workers = max(1, min(config["parallel_max_workers"], len(ranges)))
+    logger.debug(f"Extract PDF pages in parallel: {len(ranges)} ranges")
+
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        futures = deque()
 
-def _analze_pdf_text(text):
-    pattern_time = r".*(\d{2}時\d{2}分)\s+.\s+(\d{2}時\d{2}分)"
-    pattern_time_stamp = r".*(\d{2}:\d{2})?\s*--\s*(\d{2}:\d{2})?"
-
-    #print(text)
-
-    lines = text.splitlines()
-    schedule = []
-    schedule_stamp = []
-    row = 0
-
-    while row < len(lines):
-        info = _get_day_info(row, lines)
-        # print(info)
-        # print(lines[row])
-        if not info:
-            row += 1
-            continue
-
-        day_str = info[1]
-        is_paid_leave = info[2]
-        is_holiday = is_paid_leave or info[3]
-        if is_paid_leave or is_holiday:
-            # 7/21
-            # 月
-            # 所定休日        ←
-            # （打刻情報なし）
-            row = info[0] + 1
-        else:
-            # 7/22
-            # 火
-            # フレックス勤務   ←
-            # 1
-            # 09:45 -- 18:46
-            # 09時45分 ～ 18時46分
-            row = info[0] + 2
-
-        time_start = None
-        time_end = None
-        error_message = None
-
-        time_start_stamp = None
-        time_end_stamp = None
-        error_message_stamp = None
-
-        # 打刻時間
-        time_match_stamp = re.match(pattern_time_stamp, lines[row].strip())
-        if time_match_stamp:
-            time_start_stamp = time_match_stamp.group(1) or None
-            time_end_stamp = time_match_stamp.group(2) or None
+        def submit():
+            start, end = ranges.popleft()
+            futures.append(
+                executor.submit(_extract_page_range, file_path, start, end, layout)
+            )
+
+        while ranges and len(futures) < max_workers:
+            submit()
+        while futures:
+            pages = futures.popleft().result()
+            if ranges:
+                submit()
+            yield from pages
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _is_parallel(page_count: int, parallel: Optional[bool]) -> bool:
+    if parallel is not None:
+        return parallel
+    threshold = config["parallel_page_threshold"]
+    return (
+        threshold is not None
+        and config["parallel_max_workers"] > 1
+        and page_count >= threshold
+    )
+
+
+class _AttendanceParser:
+    """
+    勤務実績のテキストを1行ずつ読み、状態遷移で日毎のスケジュールを組み立てるクラス。
+    各行は1度だけ読み、行を遡って読み直すことはありません。
+    勤怠表が始まった後に日付行を含まないページを読み終えた場合、
+    勤怠表は終了したとみなして以降のページは読み込みません。
+    ただし氏名の行がある場合は複数人の勤務実績とみなし、氏名毎に分けて最後まで読み込みます。
+
+    氏名 佐藤 太郎    ← _SEEK_DAY (氏名が次の行の場合は _NAME)
+    7/22             ← _SEEK_DAY
+    火               ← _WEEKDAY
+    フレックス勤務    ← _KIND
+    1                ← _SKIP (休日・休暇の場合はなし)
+    09:45 -- 18:46   ← _STAMP
+    09時45分 ～ 18時46分 ← _TIME (打刻行に勤務時間がない場合)
+    """
+
+    _SEEK_DAY = 0
+    _WEEKDAY = 1
+    _KIND = 2
+    _SKIP = 3
+    _STAMP = 4
+    _TIME = 5
+    _NAME = 6
+
+    pattern_name = re.compile(r"^氏\s*名\s*[:：]?\s*(.*)$")
+    pattern_day = re.compile(r"^(\d+)/(\d+)$")
+    pattern_weekday = re.compile(r"^[月火水木金土日]$")
+    pattern_time = re.compile(r".*(\d{2})時(\d{2})分\s+.\s+(\d{2})時(\d{2})分")
+    # 従来の打刻パターンは開始時刻を取得できていなかったため、出力を変えないよう終了時刻のみ取得する
+    pattern_time_stamp = re.compile(r".*--\s*(?:(\d{2}):(\d{2}))?")
+
+    def __init__(self, around: int = 2):
+        self.year = datetime.now().year
+        self.employees = [EmployeeSchedule()]
+        self.schedule = self.employees[-1].schedule
+        self.schedule_stamp = self.employees[-1].schedule_stamp
+        self.is_multi_employee = False
+        self.page_count = 0
+        self.is_terminated = False
+        self._state = self._SEEK_DAY
+        self._is_table_started = False
+        self._recent_lines = deque(maxlen=around * 2 + 1)
+        # (月, 日, 時) -> タイムゾーン
+        self._timezones = {}
+
+        self._day = None
+        self._is_holiday = False
+        self._is_paid_leave = False
+        self._stamp = None
+
+    def feed(self, page: str) -> bool:
+        """1ページ分のテキストを解析し、続きのページが必要かどうかを返します。"""
+
+        if self.is_terminated:
+            return False
+
+        is_page_has_day = False
+        for line in page.splitlines():
+            self._recent_lines.append(line)
+            is_page_has_day = self._feed_line(line.strip()) or is_page_has_day
+        return self._end_page(is_page_has_day)
+
+    def _end_page(self, is_page_has_day: bool) -> bool:
+        self.page_count += 1
+
+        # 勤怠表の開始後、日付行のないページがあれば勤怠表は終了している
+        if self._is_table_started and not is_page_has_day:
+            if self.is_multi_employee:
+                # 次の社員の勤怠表があるかもしれないため読み続ける
+                self._is_table_started = False
+                return True
+            logger.debug(f"End of attendance table at page {self.page_count}.")
+            self.is_terminated = True
+        self._is_table_started = self._is_table_started or is_page_has_day
+        return not self.is_terminated
+
+    def close(self) -> tuple[List[Schedule], List[Schedule]]:
+        """解析を終了し、全社員分のスケジュールを返します。"""
+
+        if self._state == self._TIME:
+            self._append(None)
+        elif self._state in (self._KIND, self._SKIP, self._STAMP):
+            month, day = self._day
+            raise Exception(f"{month}/{day}の勤務実績が途中で終了しています。")
+        return self._close_employees()
+
+    def _close_employees(self) -> tuple[List[Schedule], List[Schedule]]:
+        # 勤務実績のない氏名は除く
+        employees = [e for e in self.employees if e.schedule or e.schedule_stamp]
+        self.employees = employees or self.employees[:1]
+        return (
+            [s for e in self.employees for s in e.schedule],
+            [s for e in self.employees for s in e.schedule_stamp],
+        )
+
+    def _set_employee(self, name: str):
+        name = " ".join(name.split())
+        self.is_multi_employee = True
+        current = self.employees[-1]
+        if current.name == name:
+            return
+        if current.name is None and not current.schedule and not current.schedule_stamp:
+            current.name = name
         else:
-            error_message_stamp = "打刻時間が見つかりません。"
+            logger.debug(f"Start attendance table of {name} at page {self.page_count}.")
+            self.employees.append(EmployeeSchedule(name=name))
+        self.schedule = self.employees[-1].schedule
+        self.schedule_stamp = self.employees[-1].schedule_stamp
+
+    def _feed_line(self, line: str) -> bool:
+        day_match = self.pattern_day.match(line)
+        state = self._state
+
+        if state == self._NAME:
+            if not line:
+                return False
+            self._set_employee(line)
+            state = self._SEEK_DAY
+        elif state == self._WEEKDAY:
+            if self.pattern_weekday.match(line):
+                self._is_holiday = line in ("土", "日")
+                self._state = self._KIND
+                return bool(day_match)
+            # 曜日が続かない場合はこの行から日付を探し直す
+            state = self._SEEK_DAY
+        elif state == self._KIND:
+            self._is_holiday = self._is_holiday or line == "所定休日"
+            self._is_paid_leave = line == "＜休暇＞"
+            if self._is_holiday or self._is_paid_leave:
+                self._is_holiday = True
+                self._state = self._STAMP
+            else:
+                self._state = self._SKIP
+            return bool(day_match)
+        elif state == self._SKIP:
+            self._state = self._STAMP
+            return bool(day_match)
+        elif state == self._STAMP:
+            self._stamp = self.pattern_time_stamp.match(line)
+            time_match = self.pattern_time.match(line)
+            if time_match:
+                self._append(time_match)
+                self._state = self._SEEK_DAY
+            else:
+                self._state = self._TIME
+            return bool(day_match)
+        elif state == self._TIME:
+            # 勤務時間の行も日付の候補として読み続ける
+            self._append(self.pattern_time.match(line))
+            state = self._SEEK_DAY
+
+        if day_match:
+            self._day = (int(day_match.group(1)), int(day_match.group(2)))
+            self._is_holiday = False
+            self._is_paid_leave = False
+            self._state = self._WEEKDAY
+            return True
+
+        name_match = self.pattern_name.match(line)
+        if name_match:
+            name = name_match.group(1)
+            if name.strip():
+                self._set_employee(name)
+            else:
+                state = self._NAME
+        self._state = state
+        return False
+
+    def _get_datetime(self, hour: int = 0, minute: int = 0) -> datetime:
+        month, day = self._day
+        key = (month, day, hour)
+        tz = self._timezones.get(key)
+        if tz is None:
+            tz = datetime(self.year, month, day, hour).astimezone().tzinfo
+            self._timezones[key] = tz
+        return datetime(self.year, month, day, hour, minute, tzinfo=tz)
+
+    def _append(self, time_match: Optional[re.Match]):
+        is_holiday = self._is_holiday
+        is_paid_leave = self._is_paid_leave
 
-        # 勤務時間
-        time_match = re.match(pattern_time, lines[row].strip())
         if time_match:
-            time_start = time_match.group(1)
-            time_end = time_match.group(2)
-        elif len(lines) > row + 1:
-            time_match = re.match(pattern_time, lines[row + 1].strip())
-            if time_match:
-                time_start = time_match.group(1)
-                time_end = time_match.group(2)
-
-        if not time_match:
-            error_message = "勤務時間が見つかりません。"
-
-        format_year_day = "%Y %m/%d"
-        format_date = f"{format_year_day} %H時%M分"
-        format_date_stamp = f"{format_year_day} %H:%M"
-        year_day_str = f"{datetime.now().year} {day_str.split(' ')[0]}"
-
-        #
-        if error_message:
-            err_line = _get_around_lines(lines, row)
-            logger.debug("Schedule format error at line.\n" + "\n".join(err_line))
-            schedule.append(
+            hour_start, minute_start, hour_end, minute_end = map(
+                int, time_match.groups()
+            )
+            self.schedule.append(
                 Schedule(
-                    start=strptime(year_day_str, format_year_day),
+                    start=self._get_datetime(hour_start, minute_start),
+                    end=self._get_datetime(hour_end, minute_end),
                     is_holiday=is_holiday,
-                    error_message=error_message,
                     is_paid_leave=is_paid_leave,
                 )
             )
         else:
-            schedule.append(
+            self._log_error_lines()
+            self.schedule.append(
                 Schedule(
-                    start=strptime(f"{year_day_str} {time_start}", format_date),
-                    end=strptime(f"{year_day_str} {time_end}", format_date),
+                    start=self._get_datetime(),
                     is_holiday=is_holiday,
+                    error_message="勤務時間が見つかりません。",
                     is_paid_leave=is_paid_leave,
                 )
             )
 
-        #
-        if error_message_stamp:
-            err_line = _get_around_lines(lines, row)
-            logger.debug("Schedule format error at line.\n" + "\n".join(err_line))
-            schedule_stamp.append(
+        if self._stamp:
+            end = None
+            if self._stamp.group(1):
+                hour_end, minute_end = map(int, self._stamp.groups())
+                end = self._get_datetime(hour_end, minute_end)
+            self.schedule_stamp.append(
                 Schedule(
-                    start=strptime(year_day_str, format_year_day),
+                    start=None,
+                    end=end,
                     is_holiday=is_holiday,
-                    error_message=error_message_stamp,
                     is_paid_leave=is_paid_leave,
                 )
             )
         else:
-            ds = (
-                strptime(f"{year_day_str} {time_start_stamp}", format_date_stamp)
-                if time_start_stamp
-                else None
-            )
-            de = (
-                strptime(f"{year_day_str} {time_end_stamp}", format_date_stamp)
-                if time_end_stamp
-                else None
-            )
-            schedule_stamp.append(
+            self._log_error_lines()
+            self.schedule_stamp.append(
                 Schedule(
-                    start=ds, end=de, is_holiday=is_holiday, is_paid_leave=is_paid_leave
+                    start=self._get_datetime(),
+                    is_holiday=is_holiday,
+                    error_message="打刻時間が見つかりません。",
+                    is_paid_leave=is_paid_leave,
                 )
             )
 
-        row += 1
-    return schedule, schedule_stamp
+    def _log_error_lines(self):
+        logger.debug("Schedule format error at line.\n" + "\n".join(self._recent_lines))
+
+
+class _LayoutAttendanceParser(_AttendanceParser):
+    """
+    表の行毎のセルから日毎のスケジュールを組み立てるクラス。
+    先頭のセルが日付の行から次の日付の行までを1日分として解析するため、
+    セルの並びが1行でも複数行に分かれていても同じように解析できます。
+    """
+
+    def __init__(self, around: int = 2):
+        super().__init__(around)
+        self._band: Optional[List[List[str]]] = None
+        self._is_name_pending = False
+
+    def feed(self, page: List[List[str]]) -> bool:
+        """1ページ分の行を解析し、続きのページが必要かどうかを返します。"""
+
+        if self.is_terminated:
+            return False
+
+        is_page_has_day = False
+        for cells in page:
+            if self._feed_name(cells):
+                continue
+            if cells and self.pattern_day.match(cells[0].strip()):
+                self._flush_band()
+                self._band = [cells]
+                is_page_has_day = True
+            elif self._band is not None:
+                self._band.append(cells)
+
+        if not self._end_page(is_page_has_day):
+            self._flush_band()
+            return False
+        return True
+
+    def close(self) -> tuple[List[Schedule], List[Schedule]]:
+        """解析を終了し、全社員分のスケジュールを返します。"""
+
+        self._flush_band()
+        return self._close_employees()
+
+    def _feed_name(self, cells: List[str]) -> bool:
+        """氏名の行であれば社員を切り替え、Trueを返します。"""
+
+        text = " ".join(cells).strip()
+        if self._is_name_pending:
+            if not text:
+                return True
+            self._is_name_pending = False
+            name = text
+        else:
+            name_match = self.pattern_name.match(text)
+            if not name_match:
+                return False
+            name = name_match.group(1).strip()
+            if not name:
+                self._is_name_pending = True
+                return True
+
+        # 前の社員の日付までを解析してから切り替える
+        if " ".join(name.split()) != self.employees[-1].name:
+            self._flush_band()
+        self._set_employee(name)
+        return True
+
+    def _flush_band(self):
+        band, self._band = self._band, None
+        if band is None:
+            return
+
+        cells = [cell.strip() for row in band for cell in row]
+        if len(cells) < 2 or not self.pattern_weekday.match(cells[1]):
+            return
+
+        kind = cells[2] if len(cells) > 2 else None
+        self._is_paid_leave = kind == "＜休暇＞"
+        self._is_holiday = (
+            cells[1] in ("土", "日") or kind == "所定休日" or self._is_paid_leave
+        )
+        day_match = self.pattern_day.match(cells[0])
+        self._day = (int(day_match.group(1)), int(day_match.group(2)))
+
+        lines = [" ".join(row).strip() for row in band]
+        self._recent_lines = lines
+        self._stamp = next(
+            filter(None, map(self.pattern_time_stamp.match, lines)), None
+        )
+        self._append(next(filter(None, map(self.pattern_time.match, lines)), None))
+
+
+def _analze_pdf_text(text):
+    return _analze_pdf_pages([text])
+
+
+def _analze_pdf_pages(pages: Iterable, layout: bool = False):
+    return _parse_pdf_pages(pages, layout).close()
+
+
+def _parse_pdf_pages(pages: Iterable, layout: bool = False) -> _AttendanceParser:
+    parser = _LayoutAttendanceParser() if layout else _AttendanceParser()
+    for page in pages:
+        if not parser.feed(page):
+            break
+    return parser
+
+
+def _analze_pdf_employees(pages: Iterable, layout: bool = False):
+    parser = _parse_pdf_pages(pages, layout)
+    parser.close()
+    return parser.employees
+
+
+def _get_cache_key(file_path, layout: bool) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    # 年は解析時の年を使用するため、年が変わった場合は解析し直す
+    sha256.update(f"{parser_version}:{layout}:{datetime.now().year}".encode())
+    return sha256.hexdigest()
+
+
+def _get_cache_path(key: str) -> str:
+    return os.path.join(config["cache_dir"], f"{key}.json")
+
+
+def _schedule_to_dict(schedule: Schedule) -> dict:
+    return {
+        "start": schedule.start.isoformat() if schedule.start else None,
+        "end": schedule.end.isoformat() if schedule.end else None,
+        "is_holiday": schedule.is_holiday,
+        "is_paid_leave": schedule.is_paid_leave,
+        "error_message": schedule.error_message,
+    }
+
+
+def _schedule_from_dict(value: dict) -> Schedule:
+    start = value["start"]
+    end = value["end"]
+    return Schedule(
+        start=datetime.fromisoformat(start) if start else None,
+        end=datetime.fromisoformat(end) if end else None,
+        is_holiday=value["is_holiday"],
+        is_paid_leave=value["is_paid_leave"],
+        error_message=value["error_message"],
+    )
 
 
-def execute(file_path) -> InputPDFResult:
+def _load_cache(key: str) -> Optional[List[EmployeeSchedule]]:
+    cache_path = _get_cache_path(key)
+    if not os.path.exists(cache_path):
+        return None
+
+    result = open_file(cache_path)
+    data = None if result.is_error() else safe_json_loads(result.text)
+    try:
+        employees = [
+            EmployeeSchedule(
+                name=employee["name"],
+                schedule=[_schedule_from_dict(v) for v in employee["schedule"]],
+                schedule_stamp=[
+                    _schedule_from_dict(v) for v in employee["schedule_stamp"]
+                ],
+            )
+            for employee in data["employees"]
+        ]
+    except Exception as e:
+        logger.warn(f"{cache_path}のキャッシュが不正なため削除します。：{e}")
+        _remove_cache(cache_path)
+        return None
+
+    # 最近使用したキャッシュを削除対象から外す
+    try:
+        os.utime(cache_path)
+    except OSError as e:
+        logger.warn(f"{cache_path}の更新に失敗しました：{e}")
+    return employees
+
+
+def _save_cache(key: str, employees: List[EmployeeSchedule]) -> None:
+    data = {
+        "parser_version": parser_version,
+        "employees": [
+            {
+                "name": employee.name,
+                "schedule": [_schedule_to_dict(s) for s in employee.schedule],
+                "schedule_stamp": [
+                    _schedule_to_dict(s) for s in employee.schedule_stamp
+                ],
+            }
+            for employee in employees
+        ],
+    }
+    cache_path = _get_cache_path(key)
+    success, error_message = write_file(
+        cache_path, json.dumps(data, ensure_ascii=False)
+    )
+    if not success:
+        logger.warn(f"{cache_path}の書き込みに失敗しました：{error_message}")
+        return
+    _evict_cache()
+
+
+def _remove_cache(cache_path: str) -> None:
+    try:
+        os.remove(cache_path)
+    except OSError as e:
+        logger.warn(f"{cache_path}の削除に失敗しました：{e}")
+
+
+def _evict_cache() -> None:
+    """期限切れのキャッシュと、上限サイズを超えた分の古いキャッシュを削除します。"""
+
+    cache_dir = config["cache_dir"]
+    expired = time.time() - config["cache_max_age_days"] * 24 * 60 * 60
+    entries = []
+    # 並列に実行した他のプロセスが同時にキャッシュを削除する場合がある
+    try:
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError as e:
+                    logger.debug(f"Skip PDF cache: {entry.name} {e}")
+                    continue
+                if stat.st_mtime < expired:
+                    logger.debug(f"Removing expired PDF cache: {entry.name}")
+                    _remove_cache(entry.path)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except OSError as e:
+        logger.warn(f"{cache_dir}のキャッシュの確認に失敗しました：{e}")
+        return
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, cache_path in sorted(entries):
+        if total_size <= config["cache_max_size"]:
+            break
+        logger.debug(f"Removing oldest PDF cache: {cache_path}")
+        _remove_cache(cache_path)
+        total_size -= size
+
+
+def _read_pdf(
+    file_path, pdf_document, parallel: Optional[bool], layout: bool
+) -> List[EmployeeSchedule]:
+    # ページ単位で読み込みながら解析する
+    page_count = len(pdf_document)
+    if _is_parallel(page_count, parallel):
+        pages = _iter_pdf_pages_parallel(file_path, page_count, layout)
+    else:
+        pages = _iter_pdf_pages(pdf_document, layout)
+
+    try:
+        return _analze_pdf_employees(pages, layout)
+    finally:
+        pages.close()
+
+
+def load_cache(file_path, layout: Optional[bool] = None) -> Optional[InputPDFResult]:
+    """
+    勤務実績のPDFファイルの解析結果をキャッシュから取得します。
+
+    Args:
+        file_path (str): PDFファイルのパス
+        layout (Optional[bool]): 単語の座標から表を組み立てて解析するかどうか。
+            省略時は設定 (layout_mode) に従います。
+
+    Returns:
+        Optional[InputPDFResult]: キャッシュの解析結果。キャッシュがない場合はNone
+    """
+
+    if not config["cache_enabled"]:
+        return None
+    if layout is None:
+        layout = config["layout_mode"]
+
+    try:
+        cache_key = _get_cache_key(file_path, layout)
+    except Exception:
+        return None
+
+    cached = _load_cache(cache_key)
+    if not cached:
+        return None
+
+    logger.debug(f"Use PDF cache: {cache_key}")
+    result = InputPDFResult()
+    result.schedule = []
+    result.schedule_stamp = []
+    result.employees = []
+    _set_employees(result, cached)
+    return result
+
+
+def execute(
+    file_path, parallel: Optional[bool] = None, layout: Optional[bool] = None
+) -> InputPDFResult:
+    """
+    勤務実績のPDFファイルからスケジュールを取得します。
+
+    Args:
+        file_path (str): PDFファイルのパス
+        parallel (Optional[bool]): ページを並列に読み込むかどうか。
+            省略時はページ数が閾値以上の場合に並列で読み込みます。
+        layout (Optional[bool]): 単語の座標から表を組み立てて解析するかどうか。
+            省略時は設定 (layout_mode) に従います。
+
+    Returns:
+        InputPDFResult: 解析結果。複数人の勤務実績を含む場合、
+            schedule・schedule_stampは全員分で、employeesに社員毎に分かれます。
+    """
+
     result = InputPDFResult()
     result.schedule = []
     result.schedule_stamp = []
+    result.employees = []
+
+    if layout is None:
+        layout = config["layout_mode"]
 
     logger.debug(f"Start reading PDF file: {file_path}")
 
+    cache_key = None
+    if config["cache_enabled"]:
+        try:
+            cache_key = _get_cache_key(file_path, layout)
+        except Exception as e:
+            result.error_message = f"{file_path}の読み取りに失敗しました。: {e}"
+            return result
+
+        cached = _load_cache(cache_key)
+        if cached:
+            logger.debug(f"Use PDF cache: {cache_key}")
+            _set_employees(result, cached)
+            return result
+
     try:
-        text = _text_from_pdf(file_path)
+        pdf_document = _open_pdf(file_path)
     except Exception as e:
         result.error_message = f"{file_path}の読み取りに失敗しました。: {e}"
         return result
 
+    def has_schedule(employees: List[EmployeeSchedule]) -> bool:
+        return any(employee.schedule for employee in employees)
+
     try:
-        schedule, schedule_stamp = _analze_pdf_text(text)
+        employees = []
+        if layout:
+            try:
+                employees = _read_pdf(file_path, pdf_document, parallel, layout=True)
+            except Exception:
+                logger.debug(traceback.format_exc())
+            if not has_schedule(employees):
+                logger.debug("No schedule found in layout mode, fallback to text.")
+        if not has_schedule(employees):
+            employees = _read_pdf(file_path, pdf_document, parallel, layout=False)
     except Exception as e:
         print(traceback.format_exc())
         result.error_message = f"{file_path}の解析に失敗しました。: {e}"
         return result
+    finally:
+        pdf_document.close()
 
     logger.debug(f"End reading PDF file: {file_path}")
 
-    result.schedule = schedule
-    result.schedule_stamp = schedule_stamp
+    if cache_key:
+        # キャッシュの保存に失敗しても解析結果は返す
+        try:
+            _save_cache(cache_key, employees)
+        except OSError as e:
+            logger.warn(f"PDFのキャッシュの保存に失敗しました：{e}")
+
+    _set_employees(result, employees)
     return result
 
 
+def _set_employees(result: InputPDFResult, employees: List[EmployeeSchedule]):
+    result.employees = employees
+    result.schedule = [s for e in employees for s in e.schedule]
+    result.schedule_stamp = [s for e in employees for s in e.schedule_stamp]
+
+
 if __name__ == "__main__":
     # result = execute("勤務実績入力（期間入力用）.pdf")
     # result = execute("勤務実績入力（期間入力用）佐藤.pdf_")
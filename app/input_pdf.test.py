@@ -0,0 +1,350 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+import fitz
+
+from . import input_pdf
+
+year = datetime.now().year
+
+pdf_text = """勤務実績入力（本人用）
+7/21
+月
+所定休日
+（打刻情報なし）
+7/22
+火
+フレックス勤務
+1
+09:45 -- 18:46
+09時45分 ～ 18時46分
+7/23
+水
+＜休暇＞
+（打刻情報なし）
+7/24
+木
+フレックス勤務
+1
+09:02 --
+09時00分 ～ 17時30分
+7/26
+土
+休日
+（打刻情報なし）
+"""
+
+summary_text = """合計
+所定労働時間
+"""
+
+# 1日分を表の1行に並べたレイアウト
+table_rows = [
+    ["勤務実績入力（本人用）"],
+    ["7/21", "月", "所定休日", "（打刻情報なし）"],
+    ["7/22", "火", "フレックス勤務", "1", "09:45 -- 18:46", "09時45分 ～ 18時46分"],
+    ["7/23", "水", "＜休暇＞", "（打刻情報なし）"],
+    ["7/24", "木", "フレックス勤務", "1", "09:02 --", "09時00分 ～ 17時30分"],
+    ["7/26", "土", "休日", "（打刻情報なし）"],
+]
+
+
+def _local(month, day, hour=0, minute=0) -> datetime:
+    return datetime(year, month, day, hour, minute).astimezone()
+
+
+expect_schedule = [
+    (_local(7, 21), None, True, False, "勤務時間が見つかりません。"),
+    (_local(7, 22, 9, 45), _local(7, 22, 18, 46), False, False, None),
+    (_local(7, 23), None, True, True, "勤務時間が見つかりません。"),
+    (_local(7, 24, 9, 0), _local(7, 24, 17, 30), False, False, None),
+    (_local(7, 26), None, True, False, "勤務時間が見つかりません。"),
+]
+
+expect_schedule_stamp = [
+    (_local(7, 21), None, True, False, "打刻時間が見つかりません。"),
+    (None, _local(7, 22, 18, 46), False, False, None),
+    (_local(7, 23), None, True, True, "打刻時間が見つかりません。"),
+    (None, None, False, False, None),
+    (_local(7, 26), None, True, False, "打刻時間が見つかりません。"),
+]
+
+
+def _to_tuples(schedules):
+    return [
+        (s.start, s.end, s.is_holiday, s.is_paid_leave, s.error_message)
+        for s in schedules
+    ]
+
+
+def _write_pdf(file_path: str, pages):
+    pdf_document = fitz.open()
+    for text in pages:
+        page = pdf_document.new_page()
+        for i, line in enumerate(text.splitlines()):
+            page.insert_text((40, 40 + i * 12), line, fontname="japan", fontsize=9)
+    pdf_document.save(file_path)
+    pdf_document.close()
+
+
+def _write_table_pdf(file_path: str, rows):
+    pdf_document = fitz.open()
+    page = pdf_document.new_page(width=1000)
+    # 列毎に書き込み、テキストの並び順と表の見た目の並び順を変える
+    for j in range(max(len(cells) for cells in rows)):
+        for i, cells in enumerate(rows):
+            if j < len(cells):
+                point = (20 + j * 150, 40 + i * 20)
+                page.insert_text(point, cells[j], fontname="japan", fontsize=9)
+    pdf_document.new_page().insert_text((40, 40), "合計", fontname="japan")
+    pdf_document.save(file_path)
+    pdf_document.close()
+
+
+@contextmanager
+def _config(**values):
+    original = {key: input_pdf.config[key] for key in values}
+    input_pdf.config.update(values)
+    try:
+        yield
+    finally:
+        input_pdf.config.update(original)
+
+
+def _assert_schedules(schedule, schedule_stamp):
+    if _to_tuples(schedule) != expect_schedule:
+        raise Exception(f"勤務時間が正しくありません。:{schedule}")
+    if _to_tuples(schedule_stamp) != expect_schedule_stamp:
+        raise Exception(f"打刻時間が正しくありません。:{schedule_stamp}")
+
+
+def test_analze_pdf_text():
+    _assert_schedules(*input_pdf._analze_pdf_text(pdf_text))
+
+
+def test_analze_pdf_pages_split():
+    # 1日分の行がページをまたぐ場合
+    lines = pdf_text.splitlines(keepends=True)
+    split = lines.index("フレックス勤務\n")
+    pages = ["".join(lines[:split]), "".join(lines[split:])]
+    _assert_schedules(*input_pdf._analze_pdf_pages(pages))
+
+
+def test_analze_pdf_text_rescan():
+    # 日付の形式の行の後に曜日が続かない場合、次の行から日付を探し直す
+    _assert_schedules(*input_pdf._analze_pdf_text("ページ\n1/2\n" + pdf_text))
+
+
+def test_analze_pdf_pages_early_termination():
+    read_pages = []
+
+    def pages():
+        for page in [pdf_text, summary_text, summary_text, pdf_text]:
+            if len(read_pages) >= 2:
+                raise Exception("勤怠表の終了後のページが読み込まれました。")
+            read_pages.append(page)
+            yield page
+
+    _assert_schedules(*input_pdf._analze_pdf_pages(pages()))
+
+
+def test_execute_parallel():
+    with tempfile.TemporaryDirectory() as temp_dir, _config(cache_enabled=False):
+        file_path = os.path.join(temp_dir, "test.pdf")
+        _write_pdf(file_path, [pdf_text] * 4 + [summary_text])
+
+        result = input_pdf.execute(file_path, parallel=False)
+        result_parallel = input_pdf.execute(file_path, parallel=True)
+
+    if result.error_message or result_parallel.error_message:
+        raise Exception(f"{result.error_message} {result_parallel.error_message}")
+    if _to_tuples(result.schedule) != expect_schedule * 4:
+        raise Exception(f"勤務時間が正しくありません。:{result.schedule}")
+    if _to_tuples(result_parallel.schedule) != _to_tuples(result.schedule):
+        raise Exception(f"並列読み込みの勤務時間が違います。:{result_parallel.schedule}")
+    if _to_tuples(result_parallel.schedule_stamp) != _to_tuples(result.schedule_stamp):
+        raise Exception(
+            f"並列読み込みの打刻時間が違います。:{result_parallel.schedule_stamp}"
+        )
+
+
+def test_iter_pdf_pages_parallel_lazy():
+    # ページ範囲は読み終えた分だけ依頼し、途中で終了した場合は以降のページを読み込まない
+    ranges = []
+    extract_page_range = input_pdf._extract_page_range
+    executor = input_pdf.ProcessPoolExecutor
+
+    def record(file_path, start, end, layout):
+        ranges.append((start, end))
+        return [f"{i}" for i in range(start, end)]
+
+    input_pdf._extract_page_range = record
+    input_pdf.ProcessPoolExecutor = ThreadPoolExecutor
+    try:
+        with _config(parallel_max_workers=2, parallel_chunk_pages=4):
+            pages = input_pdf._iter_pdf_pages_parallel("test.pdf", 100, False)
+            first = next(pages)
+            pages.close()
+    finally:
+        input_pdf.ProcessPoolExecutor = executor
+        input_pdf._extract_page_range = extract_page_range
+
+    if first != "0":
+        raise Exception(f"最初のページが正しくありません。:{first}")
+    if sorted(ranges) != [(0, 4), (4, 8), (8, 12)]:
+        raise Exception(f"不要なページ範囲が読み込まれています。:{ranges}")
+
+
+def test_is_parallel_default():
+    # 既定ではページ数に関わらず並列に読み込まない
+    if input_pdf._is_parallel(1000, None):
+        raise Exception("既定で並列に読み込む設定になっています。")
+    with _config(parallel_page_threshold=16, parallel_max_workers=2):
+        if not input_pdf._is_parallel(16, None) or input_pdf._is_parallel(15, None):
+            raise Exception("並列に読み込むページ数の閾値が正しくありません。")
+
+
+def test_execute_layout():
+    with tempfile.TemporaryDirectory() as temp_dir, _config(cache_enabled=False):
+        file_path = os.path.join(temp_dir, "test.pdf")
+        _write_pdf(file_path, [pdf_text, summary_text])
+        result = input_pdf.execute(file_path, parallel=False, layout=True)
+        if result.error_message:
+            raise Exception(result.error_message)
+        _assert_schedules(result.schedule, result.schedule_stamp)
+
+        # テキストの並び順が表の見た目と異なる場合も座標から行を組み立てて解析する
+        table_path = os.path.join(temp_dir, "table.pdf")
+        _write_table_pdf(table_path, table_rows)
+        result = input_pdf.execute(table_path, parallel=False, layout=True)
+        if result.error_message:
+            raise Exception(result.error_message)
+        _assert_schedules(result.schedule, result.schedule_stamp)
+
+
+def test_execute_cache():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_dir = os.path.join(temp_dir, "cache")
+        file_path = os.path.join(temp_dir, "test.pdf")
+        _write_pdf(file_path, [pdf_text, summary_text])
+
+        with _config(cache_enabled=True, cache_dir=cache_dir):
+            result = input_pdf.execute(file_path)
+            _assert_schedules(result.schedule, result.schedule_stamp)
+            if len(os.listdir(cache_dir)) != 1:
+                raise Exception(f"キャッシュが保存されていません。:{os.listdir(cache_dir)}")
+
+            # キャッシュがある場合はPDFを開かない
+            open_pdf = input_pdf._open_pdf
+            input_pdf._open_pdf = None
+            try:
+                result = input_pdf.execute(file_path)
+            finally:
+                input_pdf._open_pdf = open_pdf
+            if result.error_message:
+                raise Exception(result.error_message)
+            _assert_schedules(result.schedule, result.schedule_stamp)
+
+            # 上限サイズを超えた場合は古いキャッシュから削除する
+            other_path = os.path.join(temp_dir, "other.pdf")
+            _write_pdf(other_path, [pdf_text, pdf_text, summary_text])
+            old_cache = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+            os.utime(old_cache, (0, 0))
+            with _config(cache_max_age_days=365 * 100, cache_max_size=1):
+                input_pdf.execute(other_path)
+            if os.listdir(cache_dir):
+                raise Exception(f"キャッシュが削除されていません。:{os.listdir(cache_dir)}")
+
+            # 期限切れのキャッシュは削除する
+            input_pdf.execute(file_path)
+            cache_path = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+            os.utime(cache_path, (0, 0))
+            input_pdf.execute(other_path)
+            if os.path.exists(cache_path) or len(os.listdir(cache_dir)) != 1:
+                raise Exception(f"期限切れのキャッシュが残っています。:{os.listdir(cache_dir)}")
+
+
+def test_execute_cache_removed():
+    # 並列に実行した他のプロセスがキャッシュを削除しても解析結果を返す
+    class _RemovedEntry:
+        name = "removed.json"
+        path = "removed.json"
+
+        def stat(self):
+            raise FileNotFoundError(self.path)
+
+    class _ScandirIterator:
+        def __init__(self, entries):
+            self._entries = entries
+
+        def __enter__(self):
+            return iter(self._entries)
+
+        def __exit__(self, *args):
+            pass
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_dir = os.path.join(temp_dir, "cache")
+        file_path = os.path.join(temp_dir, "test.pdf")
+        _write_pdf(file_path, [pdf_text, summary_text])
+
+        scandir = input_pdf.os.scandir
+        input_pdf.os.scandir = lambda path: _ScandirIterator([_RemovedEntry()])
+        try:
+            with _config(cache_enabled=True, cache_dir=cache_dir):
+                result = input_pdf.execute(file_path)
+        finally:
+            input_pdf.os.scandir = scandir
+        if result.error_message:
+            raise Exception(result.error_message)
+        _assert_schedules(result.schedule, result.schedule_stamp)
+
+        # キャッシュのディレクトリが削除された場合
+        with _config(cache_dir=os.path.join(temp_dir, "removed")):
+            input_pdf._evict_cache()
+
+
+def test_execute_employees():
+    # 氏名毎に勤怠表が続く期間入力用のPDF (同じ氏名が続くページは同じ社員とする)
+    lines = pdf_text.splitlines(keepends=True)
+    split = lines.index("7/23\n")
+    pages = [
+        "氏名 佐藤 太郎\n" + "".join(lines[:split]),
+        "氏名 佐藤 太郎\n" + "".join(lines[split:]),
+        summary_text,
+        "氏名\n鈴木  花子\n" + pdf_text,
+        summary_text,
+    ]
+    with tempfile.TemporaryDirectory() as temp_dir, _config(cache_enabled=False):
+        file_path = os.path.join(temp_dir, "test.pdf")
+        _write_pdf(file_path, pages)
+        for layout in [False, True]:
+            result = input_pdf.execute(file_path, parallel=False, layout=layout)
+            if result.error_message:
+                raise Exception(result.error_message)
+
+            names = [employee.name for employee in result.employees]
+            if names != ["佐藤 太郎", "鈴木 花子"]:
+                raise Exception(f"氏名が正しくありません。:{names}")
+            for employee in result.employees:
+                _assert_schedules(employee.schedule, employee.schedule_stamp)
+            if len(result.schedule) != len(expect_schedule) * 2:
+                raise Exception(f"勤務時間の件数が正しくありません。:{result.schedule}")
+
+
+if __name__ == "__main__":
+    test_analze_pdf_text()
+    test_analze_pdf_pages_split()
+    test_analze_pdf_text_rescan()
+    test_analze_pdf_pages_early_termination()
+    test_execute_parallel()
+    test_iter_pdf_pages_parallel_lazy()
+    test_is_parallel_default()
+    test_execute_layout()
+    test_execute_cache()
+    test_execute_cache_removed()
+    test_execute_employees()
+    print("全てのテストが正常に完了しました。")
@@ -0,0 +1,162 @@
+import json
+import os
+from datetime import datetime, timedelta
+from os import path
+from typing import IO, Optional
+
+from .logger import CustomLogger
+from .setting import get_data_path
+
+config = {
+    "file_path": path.join(get_data_path(), "journal"),
+    # この件数を書き込む毎にディスクへ同期する
+    "sync_batch_size": 20,
+    # 開始日時がこの日数より前の記録は読み込み時に削除する
+    "keep_days": 90,
+}
+
+
+class RegistrationJournal:
+    """
+    TimeTrackerへ登録済みのタスクを記録する追記専用のジャーナル。
+    1行に1件の登録結果をJSONで追記し、同じタスクの再登録を防ぎます。
+    書き込みは一定件数毎にディスクへ同期するため、異常終了した場合は
+    最後の同期以降の記録が失われることがあります。
+    """
+
+    def __init__(self, user_name: str):
+        self._user_name = user_name
+        self._file_path = config["file_path"]
+        self._sync_batch_size = config["sync_batch_size"]
+        self._keep_days = config["keep_days"]
+        self._registered: dict[tuple[str, str, str, str], Optional[str]] = {}
+        self._file: Optional[IO[str]] = None
+        self._pending_count = 0
+        self._discarded = False
+        self._logger = CustomLogger(name="RegistrationJournal")
+
+    def load(self):
+        self._registered = {}
+        if not path.exists(self._file_path):
+            return
+
+        expired = (datetime.now() - timedelta(days=self._keep_days)).astimezone()
+        lines = []
+        has_expired = False
+        with open(self._file_path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                    start = datetime.fromisoformat(entry["start"])
+                    key = (
+                        entry["user"],
+                        entry["work_item_id"],
+                        entry["start"],
+                        entry["end"],
+                    )
+                except Exception as e:
+                    # 書き込み途中で終了した行は無視する
+                    self._logger.warn(f"不正な記録です。：{line.strip()} {e}")
+                    has_expired = True
+                    continue
+
+                if start < expired:
+                    has_expired = True
+                    continue
+                self._registered[key] = entry.get("id")
+                lines.append(line if line.endswith("\n") else line + "\n")
+
+        if has_expired:
+            self._compact(lines)
+
+    def is_registered(self, work_item_id: str, start: datetime, end: datetime) -> bool:
+        return self._get_key(work_item_id, start, end) in self._registered
+
+    def get_registered_id(
+        self, work_item_id: str, start: datetime, end: datetime
+    ) -> Optional[str]:
+        return self._registered.get(self._get_key(work_item_id, start, end))
+
+    def record(
+        self,
+        work_item_id: str,
+        start: datetime,
+        end: datetime,
+        registered_id: Optional[str],
+    ):
+        key = self._get_key(work_item_id, start, end)
+        self._registered[key] = registered_id
+
+        if self._file is None:
+            os.makedirs(path.dirname(self._file_path) or ".", exist_ok=True)
+            self._file = open(self._file_path, "a", encoding="utf-8")
+
+        self._file.write(self._to_line(key, registered_id))
+        self._pending_count += 1
+        if self._pending_count >= self._sync_batch_size:
+            self.flush()
+
+    def discard(self, work_item_id: str, start: datetime, end: datetime):
+        """
+        TimeTrackerで削除されたタスクの記録を削除します。
+        ファイルからはclose時に削除します。
+        """
+
+        key = self._get_key(work_item_id, start, end)
+        if key in self._registered:
+            del self._registered[key]
+            self._discarded = True
+
+    def flush(self):
+        if self._file is None or self._pending_count == 0:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending_count = 0
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._discarded:
+            self._compact(
+                [
+                    self._to_line(key, registered_id)
+                    for key, registered_id in self._registered.items()
+                ]
+            )
+            self._discarded = False
+
+    def _compact(self, lines: list[str]):
+        temp_path = self._file_path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                file.writelines(lines)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self._file_path)
+        except OSError as e:
+            self._logger.warn(f"{self._file_path}の整理に失敗しました。：{e}")
+
+    def _to_line(
+        self, key: tuple[str, str, str, str], registered_id: Optional[str]
+    ) -> str:
+        entry = {
+            "user": key[0],
+            "work_item_id": key[1],
+            "start": key[2],
+            "end": key[3],
+            "id": registered_id,
+        }
+        return json.dumps(entry, ensure_ascii=False) + "\n"
+
+    def _get_key(
+        self, work_item_id: str, start: datetime, end: datetime
+    ) -> tuple[str, str, str, str]:
+        return (
+            self._user_name,
+            str(work_item_id),
+            start.astimezone().isoformat(),
+            end.astimezone().isoformat(),
+        )
@@ -0,0 +1,129 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from . import journal
+
+now = datetime.now().astimezone().replace(second=0, microsecond=0)
+
+
+def _journal(temp_dir: str, user_name: str = "user") -> journal.RegistrationJournal:
+    journal.config["file_path"] = os.path.join(temp_dir, "data", "journal")
+    registration_journal = journal.RegistrationJournal(user_name)
+    registration_journal.load()
+    return registration_journal
+
+
+def test_record():
+    file_path = journal.config["file_path"]
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            start = now - timedelta(hours=1)
+            registration_journal = _journal(temp_dir)
+            if registration_journal.is_registered("1", start, now):
+                raise Exception("未登録のタスクが登録済みになっています。")
+            registration_journal.record("1", start, now, "100")
+            registration_journal.close()
+
+            # 読み込み直しても登録済みのタスクを判定できる
+            registration_journal = _journal(temp_dir)
+            if registration_journal.get_registered_id("1", start, now) != "100":
+                raise Exception("登録済みのタスクが記録されていません。")
+            if registration_journal.is_registered("2", start, now):
+                raise Exception("作業IDが異なるタスクが登録済みになっています。")
+            if registration_journal.is_registered("1", start, now + timedelta(1)):
+                raise Exception("時間が異なるタスクが登録済みになっています。")
+
+            # ユーザー毎に記録を分ける
+            if _journal(temp_dir, "other").is_registered("1", start, now):
+                raise Exception("他のユーザーのタスクが登録済みになっています。")
+    finally:
+        journal.config["file_path"] = file_path
+
+
+def test_sync_batch():
+    file_path = journal.config["file_path"]
+    sync_batch_size = journal.config["sync_batch_size"]
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            journal.config["sync_batch_size"] = 3
+            registration_journal = _journal(temp_dir)
+            for i in range(4):
+                registration_journal.record(str(i), now, now, str(i))
+
+            # 同期済みの3件のみ書き込まれている
+            with open(journal.config["file_path"], encoding="utf-8") as file:
+                lines = file.readlines()
+            if len(lines) != 3:
+                raise Exception(f"同期された件数が正しくありません。:{lines}")
+
+            registration_journal.close()
+            with open(journal.config["file_path"], encoding="utf-8") as file:
+                lines = file.readlines()
+            if len(lines) != 4:
+                raise Exception(f"閉じた時に同期されていません。:{lines}")
+    finally:
+        journal.config["file_path"] = file_path
+        journal.config["sync_batch_size"] = sync_batch_size
+
+
+def test_load_broken():
+    file_path = journal.config["file_path"]
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            old = now - timedelta(days=journal.config["keep_days"] + 1)
+            registration_journal = _journal(temp_dir)
+            registration_journal.record("1", now, now, "1")
+            registration_journal.record("2", old, old, "2")
+            registration_journal.close()
+            # 書き込み途中で終了した行
+            with open(journal.config["file_path"], "a", encoding="utf-8") as file:
+                file.write('{"user": "user", "work_item_id": "3"')
+
+            # 壊れた行と期限切れの記録は読み込み時に削除する
+            registration_journal = _journal(temp_dir)
+            if not registration_journal.is_registered("1", now, now):
+                raise Exception("登録済みのタスクが読み込まれていません。")
+            if registration_journal.is_registered("2", old, old):
+                raise Exception("期限切れの記録が読み込まれています。")
+            with open(journal.config["file_path"], encoding="utf-8") as file:
+                lines = file.readlines()
+            if len(lines) != 1:
+                raise Exception(f"記録が整理されていません。:{lines}")
+    finally:
+        journal.config["file_path"] = file_path
+
+
+def test_discard():
+    file_path = journal.config["file_path"]
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            start = now - timedelta(hours=1)
+            registration_journal = _journal(temp_dir)
+            registration_journal.record("1", start, now, "100")
+            registration_journal.record("2", start, now, "200")
+            registration_journal.close()
+            _journal(temp_dir, "other").close()
+
+            registration_journal = _journal(temp_dir)
+            registration_journal.discard("1", start, now)
+            if registration_journal.is_registered("1", start, now):
+                raise Exception("削除した記録が登録済みになっています。")
+            registration_journal.close()
+
+            # 読み込み直しても削除した記録は残らない
+            registration_journal = _journal(temp_dir)
+            if registration_journal.is_registered("1", start, now):
+                raise Exception("削除した記録がファイルに残っています。")
+            if registration_journal.get_registered_id("2", start, now) != "200":
+                raise Exception("削除していない記録が失われています。")
+    finally:
+        journal.config["file_path"] = file_path
+
+
+if __name__ == "__main__":
+    test_record()
+    test_sync_batch()
+    test_load_broken()
+    test_discard()
+    print("全てのテストが正常に完了しました。")
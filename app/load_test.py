@@ -0,0 +1,247 @@
+import asyncio
+import math
+import os
+import tempfile
+from argparse import ArgumentParser
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from . import async_queue, token_cache
+from .api import TimeTracker, TimeTrackerTask
+from .stand_in_server import StandInServer, StandInServerConfig, StandInServerStats
+
+register_endpoint = "POST /system/users/{id}/timeEntries"
+
+
+@dataclass
+class LoadTestResult:
+    """
+    負荷試験の結果を表すクラス。
+    Attributes:
+        task_count (int): 登録を要求したタスク数。
+        elapsed (float): タスクの登録に掛かった秒数。
+        latencies (List[float]): タスク毎の登録に掛かった秒数 (リトライの待機を含む)。
+        errors (List[str]): 登録に失敗したタスクのエラーメッセージのリスト。
+        retry_count (int): 登録のリトライ回数 (再認証による送り直しは含まない)。
+        server_stats (StandInServerStats): サーバーが受け付けたリクエストの集計。
+    """
+
+    task_count: int
+    elapsed: float
+    latencies: List[float] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    retry_count: int = 0
+    server_stats: StandInServerStats = field(default_factory=StandInServerStats)
+
+    def get_requests_per_second(self) -> float:
+        requests = self.server_stats.endpoints[register_endpoint]
+        return requests / self.elapsed if self.elapsed > 0 else 0.0
+
+    def get_percentile(self, percent: float) -> float:
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        index = max(0, math.ceil(len(latencies) * percent / 100) - 1)
+        return latencies[index]
+
+    def to_text(self) -> str:
+        statuses = ", ".join(
+            f"{status}: {count}"
+            for status, count in sorted(self.server_stats.statuses.items())
+        )
+        return "\n".join(
+            [
+                f"登録タスク数: {self.task_count} (成功: {self.task_count - len(self.errors)}, 失敗: {len(self.errors)})",
+                f"経過時間: {self.elapsed:.2f}秒",
+                f"リクエスト/秒: {self.get_requests_per_second():.1f}",
+                f"レイテンシ p50: {self.get_percentile(50) * 1000:.1f}ms, p99: {self.get_percentile(99) * 1000:.1f}ms",
+                f"リトライ回数: {self.retry_count}",
+                f"重複した登録: {self.server_stats.duplicates}",
+                f"サーバーの最大同時処理数: {self.server_stats.max_in_flight}",
+                f"ステータス: {statuses}",
+            ]
+        )
+
+
+def create_work_items(count: int) -> list:
+    """サーバーが返す作業項目の一覧を作成します。"""
+
+    sub_items = [
+        {"fields": {"Id": str(100 + i), "Name": f"作業{i}", "FolderName": "作業"}}
+        for i in range(count)
+    ]
+    return [
+        {
+            "fields": {
+                "Id": "10",
+                "Name": "負荷試験",
+                "FolderName": "負荷試験",
+                "SubItems": sub_items,
+            }
+        }
+    ]
+
+
+def create_tasks(count: int, work_item_ids: List[str]) -> List[TimeTrackerTask]:
+    """重複しないように30分ずつずらしたタスクを作成します。"""
+
+    base_time = datetime(2025, 1, 1, 0, 0).astimezone()
+    tasks = []
+    for i in range(count):
+        start_time = base_time + timedelta(minutes=30 * i)
+        tasks.append(
+            TimeTrackerTask(
+                work_item_id=work_item_ids[i % len(work_item_ids)],
+                start_time=start_time,
+                end_time=start_time + timedelta(minutes=30),
+                memo=f"負荷試験{i}",
+            )
+        )
+    return tasks
+
+
+async def run_load_test(
+    task_count: int,
+    concurrency: int,
+    server_config: StandInServerConfig = None,
+    client_config: Optional[Dict] = None,
+) -> LoadTestResult:
+    """
+    TimeTrackerの代わりのサーバーを起動し、TimeTrackerクラスでタスクを登録します。
+
+    Args:
+        task_count (int): 登録するタスク数
+        concurrency (int): 同時に登録するタスク数
+        server_config (StandInServerConfig): サーバーの設定
+        client_config (Optional[Dict]): 試験中だけ変更するasync_queueの設定
+
+    Returns:
+        LoadTestResult: 負荷試験の結果
+    """
+
+    server_config = server_config or StandInServerConfig()
+    server = StandInServer(server_config, work_items=create_work_items(10))
+    original_queue_config = dict(async_queue.config)
+    original_token_config = dict(token_cache.config)
+    async_queue.config.update(client_config or {})
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # 負荷試験のトークンはユーザーのトークンと混ざらないように一時ディレクトリに保存する
+        token_cache.config["file_path"] = os.path.join(temp_dir, "token")
+        await server.start()
+        tracker = TimeTracker(server.base_url, server_config.user_name, "1")
+        try:
+            await tracker.connect_async("password")
+            work_items = await tracker.get_work_items_async()
+            work_item_ids = [
+                item.id for item in work_items[0].get_most_nest_children()
+            ]
+            # 登録のリトライ回数のみを集計する
+            retry_count = tracker.retry_count
+            result = await _register_tasks_async(
+                tracker, create_tasks(task_count, work_item_ids), concurrency
+            )
+            result.retry_count = tracker.retry_count - retry_count
+        finally:
+            await tracker.close_async()
+            await server.close()
+            async_queue.config.clear()
+            async_queue.config.update(original_queue_config)
+            token_cache.config.update(original_token_config)
+
+    result.server_stats = server.stats
+    return result
+
+
+async def _register_tasks_async(
+    tracker: TimeTracker, tasks: List[TimeTrackerTask], concurrency: int
+) -> LoadTestResult:
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    result = LoadTestResult(task_count=len(tasks), elapsed=0.0)
+
+    async def register(task: TimeTrackerTask):
+        async with semaphore:
+            start_time = loop.time()
+            try:
+                await tracker.register_task_async(task)
+            except Exception as e:
+                result.errors.append(str(e))
+            result.latencies.append(loop.time() - start_time)
+
+    start_time = loop.time()
+    await asyncio.gather(*[register(task) for task in tasks])
+    result.elapsed = loop.time() - start_time
+    return result
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        description="TimeTrackerの代わりのサーバーに対してタスクの登録の負荷試験を行います。"
+    )
+    parser.add_argument("--tasks", type=int, default=200, help="登録するタスク数")
+    parser.add_argument(
+        "--concurrency", type=int, default=50, help="同時に登録するタスク数"
+    )
+    parser.add_argument(
+        "--latency-distribution",
+        choices=["fixed", "uniform", "exponential", "lognormal"],
+        default="lognormal",
+        help="サーバーの応答の遅延の分布",
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=50, help="サーバーの応答の遅延 (ミリ秒)"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503を返す割合")
+    parser.add_argument(
+        "--lost-response-rate", type=float, default=0.0, help="登録後に503を返す割合"
+    )
+    parser.add_argument(
+        "--server-rps",
+        type=int,
+        default=None,
+        help="サーバーが1秒あたりに受け付けるリクエスト数",
+    )
+    parser.add_argument(
+        "--server-concurrency",
+        type=int,
+        default=None,
+        help="サーバーが同時に処理するリクエスト数",
+    )
+    parser.add_argument(
+        "--client-rps",
+        type=float,
+        default=async_queue.config["requests_per_second"],
+        help="クライアントの1秒あたりの最大リクエスト数 (0は無制限)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=async_queue.config["worker_count"],
+        help="クライアントの同時にリクエストを送信するワーカー数",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="乱数のシード")
+    args = parser.parse_args()
+
+    result = asyncio.run(
+        run_load_test(
+            args.tasks,
+            args.concurrency,
+            StandInServerConfig(
+                latency_distribution=args.latency_distribution,
+                latency_ms=args.latency_ms,
+                error_rate=args.error_rate,
+                lost_response_rate=args.lost_response_rate,
+                requests_per_second=args.server_rps,
+                max_concurrency=args.server_concurrency,
+                seed=args.seed,
+            ),
+            {
+                "requests_per_second": args.client_rps or None,
+                "worker_count": args.workers,
+                "connector_limit": args.workers,
+            },
+        )
+    )
+    print(result.to_text())
@@ -234,11 +234,15 @@ class WorkItem:
     sub_items: Optional[List["WorkItem"]] = None
 
     def get_most_nest_children(self) -> List["WorkItem"]:
-        if not self.sub_items:
-            return [self]
+        # 階層が深い場合に再帰の上限を超えないよう、スタックで順に辿る
         nested_items = []
-        for sub_item in self.sub_items:
-            nested_items.extend(sub_item.get_most_nest_children())
+        stack = [self]
+        while stack:
+            item = stack.pop()
+            if item.sub_items:
+                stack.extend(reversed(item.sub_items))
+            else:
+                nested_items.append(item)
         return nested_items
 
 
@@ -0,0 +1,298 @@
+import asyncio
+import json
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import List, Literal, Optional
+
+from aiohttp import web
+
+
+@dataclass
+class StandInServerConfig:
+    """
+    TimeTrackerの代わりに応答するサーバーの設定を表すクラス。
+    Attributes:
+        user_name (str): 認証できるユーザー名。
+        user_id (str): ユーザーID。
+        latency_distribution (str): 応答の遅延の分布。
+            fixed: latency_ms、uniform: latency_ms±latency_spread_ms、
+            exponential: 平均latency_ms、lognormal: 中央値latency_ms・標準偏差latency_spread (対数)
+        latency_ms (float): 応答の遅延 (ミリ秒)。
+        latency_spread_ms (float): uniformの場合の遅延の幅 (ミリ秒)。
+        latency_spread (float): lognormalの場合の遅延のばらつき。
+        error_rate (float): 処理せずに503を返す割合。
+        lost_response_rate (float): タスクを登録した後に503を返す割合。
+            処理された後に応答が失われる場合を再現します。
+        requests_per_second (Optional[int]): 1秒あたりに受け付けるリクエスト数。超えた場合は429を返す。
+        max_concurrency (Optional[int]): 同時に処理するリクエスト数。超えた場合は429を返す。
+        retry_after (int): 429の場合のRetry-Afterの秒数。
+        token_lifetime (int): トークンの有効期間 (秒)。
+        seed (Optional[int]): 遅延とエラーの乱数のシード。
+    """
+
+    user_name: str = "user"
+    user_id: str = "1"
+    latency_distribution: Literal["fixed", "uniform", "exponential", "lognormal"] = (
+        "fixed"
+    )
+    latency_ms: float = 0
+    latency_spread_ms: float = 0
+    latency_spread: float = 0.5
+    error_rate: float = 0
+    lost_response_rate: float = 0
+    requests_per_second: Optional[int] = None
+    max_concurrency: Optional[int] = None
+    retry_after: int = 1
+    token_lifetime: int = 60 * 60
+    seed: Optional[int] = None
+
+
+@dataclass
+class StandInServerStats:
+    """
+    サーバーが受け付けたリクエストの集計を表すクラス。
+    Attributes:
+        requests (int): 受け付けたリクエスト数。
+        statuses (Counter): ステータス毎の応答数。
+        endpoints (Counter): "メソッド パス" 毎のリクエスト数。
+        login_count (int): 認証した回数。
+        registered (int): 登録したタスク数。
+        duplicates (int): 登録済みと同じタスクの登録要求数。
+        max_in_flight (int): 同時に処理したリクエスト数の最大値。
+    """
+
+    requests: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    endpoints: Counter = field(default_factory=Counter)
+    login_count: int = 0
+    registered: int = 0
+    duplicates: int = 0
+    max_in_flight: int = 0
+
+
+class StandInServer:
+    """
+    TimeTrackerのAPIの代わりに応答するローカルのサーバー。
+    認証・ユーザー・作業項目・タスクの取得と登録に応答し、設定に従って
+    遅延・エラー・429による流量制限を発生させます。同じタスクの登録は409を返します。
+    """
+
+    def __init__(
+        self,
+        config: StandInServerConfig = None,
+        work_items: list = None,
+        entries: list = None,
+        project: dict = None,
+    ):
+        self.config = config or StandInServerConfig()
+        self.work_items = work_items or []
+        self.entries = entries or []
+        self.project = project or {
+            "Id": "1",
+            "Name": "プロジェクト",
+            "ProjectId": "1",
+            "ProjectName": "プロジェクト",
+            "ProjectCode": "P1",
+        }
+        self.tokens = set()
+        self.stats = StandInServerStats()
+        # タスクの取得で指定された期間
+        self.entry_ranges: List[tuple[date, date]] = []
+        self.base_url: Optional[str] = None
+        self._entry_keys = {
+            (entry["workItemId"], entry["startTime"], entry["finishTime"])
+            for entry in self.entries
+        }
+        self._random = random.Random(self.config.seed)
+        self._in_flight = 0
+        self._window = (0, 0)
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        サーバーを起動し、ベースURLを返します。portが0の場合は空いているポートを使用します。
+        """
+
+        server_app = web.Application(middlewares=[self._middleware])
+        server_app.router.add_post("/auth/token", self._token)
+        server_app.router.add_get("/system/users/me", self._me)
+        server_app.router.add_get("/workitem/workItems/{id}", self._project)
+        server_app.router.add_get("/workitem/workItems/{id}/subItems", self._sub_items)
+        server_app.router.add_get(
+            "/system/users/{id}/timeEntries", self._get_time_entries
+        )
+        server_app.router.add_post(
+            "/system/users/{id}/timeEntries", self._post_time_entry
+        )
+        self._runner = web.AppRunner(server_app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "StandInServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        self.stats.requests += 1
+        self.stats.endpoints[
+            f"{request.method} {request.match_info.route.resource.canonical}"
+        ] += 1
+        response = await self._handle(request, handler)
+        self.stats.statuses[response.status] += 1
+        return response
+
+    async def _handle(self, request: web.Request, handler) -> web.StreamResponse:
+        if self._is_throttled():
+            return self._error(429, "Too Many Requests", self.config.retry_after)
+
+        max_concurrency = self.config.max_concurrency
+        if max_concurrency is not None and self._in_flight >= max_concurrency:
+            return self._error(429, "Too Many Requests", self.config.retry_after)
+
+        self._in_flight += 1
+        self.stats.max_in_flight = max(self.stats.max_in_flight, self._in_flight)
+        try:
+            await asyncio.sleep(self._get_latency())
+            if self._random.random() < self.config.error_rate:
+                return self._error(503, "Service Unavailable")
+            return await handler(request)
+        finally:
+            self._in_flight -= 1
+
+    def _is_throttled(self) -> bool:
+        limit = self.config.requests_per_second
+        if limit is None:
+            return False
+        second = int(asyncio.get_running_loop().time())
+        window, count = self._window
+        if window != second:
+            window, count = second, 0
+        self._window = (window, count + 1)
+        return count >= limit
+
+    def _get_latency(self) -> float:
+        config = self.config
+        distribution = config.latency_distribution
+        if distribution == "uniform":
+            latency = self._random.uniform(
+                config.latency_ms - config.latency_spread_ms,
+                config.latency_ms + config.latency_spread_ms,
+            )
+        elif distribution == "exponential":
+            latency = (
+                self._random.expovariate(1 / config.latency_ms)
+                if config.latency_ms > 0
+                else 0
+            )
+        elif distribution == "lognormal":
+            latency = (
+                config.latency_ms
+                * self._random.lognormvariate(0, config.latency_spread)
+                if config.latency_ms > 0
+                else 0
+            )
+        else:
+            latency = config.latency_ms
+        return max(0.0, latency) / 1000
+
+    def _error(
+        self, status: int, message: str, retry_after: Optional[int] = None
+    ) -> web.Response:
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+        return web.json_response(
+            [{"message": message}], status=status, headers=headers, dumps=_dumps
+        )
+
+    def _is_authorized(self, request: web.Request) -> bool:
+        authorization = request.headers.get("Authorization", "")
+        return authorization.removeprefix("Bearer ") in self.tokens
+
+    async def _token(self, request: web.Request):
+        data = await request.json()
+        if data.get("loginname") != self.config.user_name:
+            return self._error(400, "Invalid login name or password")
+
+        self.stats.login_count += 1
+        token = f"token-{self.stats.login_count}"
+        self.tokens.add(token)
+        expires_at = datetime.now().astimezone() + timedelta(
+            seconds=self.config.token_lifetime
+        )
+        return web.json_response(
+            {"token": token, "expiresAt": expires_at.isoformat()}, dumps=_dumps
+        )
+
+    async def _me(self, request: web.Request):
+        if not self._is_authorized(request):
+            return self._error(401, "Unauthorized")
+        return web.json_response(
+            {"id": self.config.user_id, "loginName": self.config.user_name},
+            dumps=_dumps,
+        )
+
+    async def _project(self, request: web.Request):
+        if not self._is_authorized(request):
+            return self._error(401, "Unauthorized")
+        return web.json_response([{"fields": self.project}], dumps=_dumps)
+
+    async def _sub_items(self, request: web.Request):
+        if not self._is_authorized(request):
+            return self._error(401, "Unauthorized")
+        return web.json_response(self.work_items, dumps=_dumps)
+
+    async def _get_time_entries(self, request: web.Request):
+        if not self._is_authorized(request):
+            return self._error(401, "Unauthorized")
+        start = date.fromisoformat(request.query["startDate"])
+        end = date.fromisoformat(request.query["finishDate"])
+        self.entry_ranges.append((start, end))
+        return web.json_response(
+            [
+                entry
+                for entry in self.entries
+                if start <= datetime.fromisoformat(entry["startTime"]).date() <= end
+            ],
+            dumps=_dumps,
+        )
+
+    async def _post_time_entry(self, request: web.Request):
+        if not self._is_authorized(request):
+            return self._error(401, "Unauthorized")
+        data = await request.json()
+        key = (data["workItemId"], data["startTime"], data["finishTime"])
+        if key in self._entry_keys:
+            self.stats.duplicates += 1
+            return self._error(409, "The time entry is already registered")
+
+        entry = {
+            "id": str(len(self.entries) + 1),
+            "workItemId": data["workItemId"],
+            "startTime": data["startTime"],
+            "finishTime": data["finishTime"],
+            "memo": data.get("memo"),
+        }
+        self.entries.append(entry)
+        self._entry_keys.add(key)
+        self.stats.registered += 1
+        if self._random.random() < self.config.lost_response_rate:
+            return self._error(503, "Service Unavailable")
+        return web.json_response({"id": entry["id"]}, dumps=_dumps)
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False)
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from . import api, load_test, token_cache
+from .stand_in_server import StandInServer, StandInServerConfig
+
+
+def test_register_lost_response():
+    # 登録後に503が返った場合はリトライせず、重複して登録しない
+    config = StandInServerConfig(lost_response_rate=1.0, retry_after=0)
+    result = asyncio.run(
+        load_test.run_load_test(3, 3, config, {"requests_per_second": None})
+    )
+
+    if result.server_stats.registered != 3 or len(result.errors) != 3:
+        raise Exception(f"登録数が正しくありません。:{result.server_stats}")
+    if result.server_stats.duplicates != 0 or result.retry_count != 0:
+        raise Exception(f"登録がリトライされています。:{result.server_stats}")
+
+
+def test_register_duplicate():
+    # 同じ作業IDと時間のタスクの登録は409を返す
+    server = StandInServer()
+    start = datetime(2025, 7, 1, 9).astimezone()
+    task = api.TimeTrackerTask("100", start, start + timedelta(minutes=30))
+
+    async def run():
+        base_url = await server.start()
+        tracker = api.TimeTracker(base_url, "user", "1")
+        try:
+            await tracker.connect_async("password")
+            await tracker.register_task_async(task)
+            try:
+                await tracker.register_task_async(task)
+            except Exception as e:
+                return str(e)
+            return None
+        finally:
+            await tracker.close_async()
+            await server.close()
+
+    file_path = token_cache.config["file_path"]
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            token_cache.config["file_path"] = os.path.join(temp_dir, "token")
+            error = asyncio.run(run())
+    finally:
+        token_cache.config["file_path"] = file_path
+
+    if error is None or "409" not in error:
+        raise Exception(f"重複した登録がエラーになっていません。:{error}")
+    if server.stats.registered != 1 or server.stats.duplicates != 1:
+        raise Exception(f"登録数が正しくありません。:{server.stats}")
+
+
+def test_register_throttled():
+    # 同時に処理できる数を超えたリクエストは429でリトライして全て登録する
+    config = StandInServerConfig(
+        latency_ms=20, max_concurrency=1, retry_after=0, seed=1
+    )
+    result = asyncio.run(
+        load_test.run_load_test(
+            10, 10, config, {"requests_per_second": None, "adaptive_concurrency": False}
+        )
+    )
+
+    stats = result.server_stats
+    if result.errors or stats.registered != 10:
+        raise Exception(f"登録に失敗しました。:{result.errors}")
+    if stats.statuses[429] == 0 or result.retry_count != stats.statuses[429]:
+        raise Exception(f"429のリトライが正しくありません。:{stats}")
+    if stats.max_in_flight != 1:
+        raise Exception(f"同時処理数が正しくありません。:{stats.max_in_flight}")
+    if len(result.latencies) != 10 or result.get_percentile(99) < result.get_percentile(50):
+        raise Exception(f"レイテンシが正しくありません。:{result.latencies}")
+
+
+if __name__ == "__main__":
+    test_register_lost_response()
+    test_register_duplicate()
+    test_register_throttled()
+    print("全てのテストが正常に完了しました。")
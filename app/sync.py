@@ -0,0 +1,128 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from .api import TimeTrackerEntry
+from .model import EventWorkItemPair, TimeTrackerDayTask
+
+
+@dataclass
+class RegisterConflict:
+    event_work_item: EventWorkItemPair
+    entry: TimeTrackerEntry
+
+
+@dataclass
+class RegisterDiff:
+    """
+    登録予定のタスクと登録済みのタスクの差分を表すクラス。
+    Attributes:
+        day_tasks (List[TimeTrackerDayTask]): 登録が必要なタスクのみの日別タスクのリスト。
+        skips (List[EventWorkItemPair]): 同じ作業IDと時間で登録済みのタスクのリスト。
+        conflicts (List[RegisterConflict]): 登録済みのタスクと時間が重複するタスクのリスト。
+    """
+
+    day_tasks: List[TimeTrackerDayTask] = field(default_factory=list)
+    skips: List[EventWorkItemPair] = field(default_factory=list)
+    conflicts: List[RegisterConflict] = field(default_factory=list)
+
+    def get_insert_count(self) -> int:
+        return sum(len(day_task.event_work_item_pair) for day_task in self.day_tasks)
+
+
+@dataclass
+class TimeEntries:
+    """
+    期間を指定して取得した登録済みのタスクを表すクラス。
+    Attributes:
+        start_date (date): 取得した期間の開始日。
+        end_date (date): 取得した期間の終了日 (この日を含む)。
+        entries (List[TimeTrackerEntry]): 登録済みのタスクのリスト。
+    """
+
+    start_date: date
+    end_date: date
+    entries: List[TimeTrackerEntry]
+
+    def contains(self, start_date: date, end_date: date) -> bool:
+        return self.start_date <= start_date and end_date <= self.end_date
+
+
+class TimeEntryIndex:
+    """
+    登録済みのタスクを日付と時間で検索するための索引。
+    """
+
+    def __init__(self, entries: List[TimeTrackerEntry]):
+        self._entries: Dict[Tuple[str, datetime, datetime], TimeTrackerEntry] = {}
+        # 日付毎に開始時間順に並べる
+        self._days: Dict[date, List[TimeTrackerEntry]] = {}
+        self._day_starts: Dict[date, List[datetime]] = {}
+
+        for entry in sorted(entries, key=lambda x: x.start_time):
+            start, end = entry.start_time.astimezone(), entry.end_time.astimezone()
+            self._entries[(str(entry.work_item_id), start, end)] = entry
+            self._days.setdefault(start.date(), []).append(entry)
+
+        for day, day_entries in self._days.items():
+            self._day_starts[day] = [entry.start_time for entry in day_entries]
+
+    def find(
+        self, work_item_id: str, start: datetime, end: datetime
+    ) -> Optional[TimeTrackerEntry]:
+        """同じ作業IDと時間で登録済みのタスクを返します。"""
+
+        return self._entries.get(
+            (str(work_item_id), start.astimezone(), end.astimezone())
+        )
+
+    def find_overlap(self, start: datetime, end: datetime) -> Optional[TimeTrackerEntry]:
+        """時間が重複する登録済みのタスクを返します。"""
+
+        start, end = start.astimezone(), end.astimezone()
+        day_entries = self._days.get(start.date(), [])
+        # 終了時間より前に始まるタスクのうち、開始時間より後に終わるものを探す
+        index = bisect_left(self._day_starts.get(start.date(), []), end)
+        for entry in reversed(day_entries[:index]):
+            if entry.end_time > start:
+                return entry
+        return None
+
+
+def get_register_diff(
+    day_tasks: List[TimeTrackerDayTask], entries: List[TimeTrackerEntry]
+) -> RegisterDiff:
+    """
+    登録予定のタスクと登録済みのタスクを比較し、登録が必要なタスクを求めます。
+
+    Args:
+        day_tasks (List[TimeTrackerDayTask]): 登録予定の日別タスクのリスト
+        entries (List[TimeTrackerEntry]): 登録済みのタスクのリスト
+
+    Returns:
+        RegisterDiff: 登録が必要なタスク、登録済みのタスク、重複するタスク
+    """
+
+    index = TimeEntryIndex(entries)
+    diff = RegisterDiff()
+    for day_task in day_tasks:
+        inserts = []
+        for event_work_item in day_task.event_work_item_pair:
+            schedule = event_work_item.event.schedule
+            if index.find(event_work_item.work_item.id, schedule.start, schedule.end):
+                diff.skips.append(event_work_item)
+                continue
+
+            entry = index.find_overlap(schedule.start, schedule.end)
+            if entry:
+                diff.conflicts.append(RegisterConflict(event_work_item, entry))
+                continue
+
+            inserts.append(event_work_item)
+
+        if inserts:
+            diff.day_tasks.append(
+                TimeTrackerDayTask(day_task.base_date, day_task.project, inserts)
+            )
+    return diff
@@ -0,0 +1,90 @@
+from datetime import date, datetime, timedelta
+
+from . import sync
+from .api import TimeTrackerEntry
+from .model import Event, EventWorkItemPair, Schedule, TimeTrackerDayTask, WorkItem
+
+base = datetime(2025, 7, 22, 9).astimezone()
+
+
+def _pair(work_item_id: str, start: datetime, hours: float = 1) -> EventWorkItemPair:
+    return EventWorkItemPair(
+        Event(
+            name="定例会議",
+            organizer="",
+            is_private=False,
+            is_cancelled=False,
+            location="",
+            schedule=Schedule(start=start, end=start + timedelta(hours=hours)),
+        ),
+        WorkItem(id=work_item_id, name="作業", folder_name="", folder_path=""),
+    )
+
+
+def _entry(work_item_id: str, start: datetime, hours: float = 1) -> TimeTrackerEntry:
+    return TimeTrackerEntry(
+        id=None,
+        work_item_id=work_item_id,
+        start_time=start,
+        end_time=start + timedelta(hours=hours),
+    )
+
+
+def test_register_diff():
+    next_day = base + timedelta(days=1)
+    skip = _pair("1", base)
+    conflict = _pair("2", base + timedelta(hours=1), 2)
+    insert = _pair("1", base + timedelta(hours=4))
+    day_tasks = [
+        TimeTrackerDayTask(base.date(), None, [skip, conflict, insert]),
+        TimeTrackerDayTask(next_day.date(), None, [_pair("1", next_day)]),
+    ]
+    entries = [
+        # 同じ作業IDと時間 (タイムゾーンが異なっても同じ時間として扱う)
+        _entry("1", base.astimezone(datetime.now().astimezone().tzinfo)),
+        _entry("3", base + timedelta(hours=2, minutes=30), 0.5),
+        _entry("3", base + timedelta(hours=5)),
+        _entry("1", next_day),
+    ]
+
+    diff = sync.get_register_diff(day_tasks, entries)
+    if diff.skips != [skip, day_tasks[1].event_work_item_pair[0]]:
+        raise Exception(f"登録済みのタスクが正しくありません。:{diff.skips}")
+    if [c.event_work_item for c in diff.conflicts] != [conflict]:
+        raise Exception(f"重複するタスクが正しくありません。:{diff.conflicts}")
+    if diff.conflicts[0].entry != entries[1]:
+        raise Exception(f"重複する登録済みのタスクが違います。:{diff.conflicts}")
+    if len(diff.day_tasks) != 1 or diff.day_tasks[0].event_work_item_pair != [insert]:
+        raise Exception(f"登録が必要なタスクが正しくありません。:{diff.day_tasks}")
+    if diff.get_insert_count() != 1:
+        raise Exception(f"登録が必要な件数が正しくありません。:{diff.get_insert_count()}")
+
+
+def test_find_overlap():
+    index = sync.TimeEntryIndex(
+        [
+            _entry("1", base, 3),
+            _entry("2", base + timedelta(hours=4)),
+            _entry("3", base + timedelta(days=1)),
+        ]
+    )
+    cases = [
+        (base - timedelta(hours=1), 1, None),
+        (base + timedelta(hours=2), 1, "1"),
+        (base + timedelta(hours=3), 1, None),
+        (base + timedelta(hours=3), 2, "2"),
+        (base + timedelta(hours=5), 1, None),
+    ]
+    for start, hours, expect in cases:
+        entry = index.find_overlap(start, start + timedelta(hours=hours))
+        if (entry.work_item_id if entry else None) != expect:
+            raise Exception(f"重複の判定が正しくありません。:{start} {hours} {entry}")
+
+    if index.find_overlap(datetime.combine(date(2025, 1, 1), base.timetz()), base):
+        raise Exception("別の日のタスクと重複しています。")
+
+
+if __name__ == "__main__":
+    test_register_diff()
+    test_find_overlap()
+    print("全てのテストが正常に完了しました。")
@@ -0,0 +1,180 @@
+import ctypes
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from os import path
+from typing import Optional
+
+from .app_info import is_win
+from .logger import CustomLogger
+from .setting import get_data_path
+
+config = {
+    "cache_enabled": True,
+    "file_path": path.join(get_data_path(), "token"),
+    # 有効期限がこの秒数以内のトークンは使用しない
+    "expiry_margin": 60,
+    # 有効期限が返却されない場合の有効期間 (秒)
+    "default_lifetime": 30 * 60,
+}
+
+
+@dataclass
+class CachedToken:
+    token: str
+    user_id: str
+    expires_at: datetime
+
+
+class TokenCache:
+    """
+    TimeTrackerの認証トークンとユーザーIDを接続先とユーザー毎に保存するキャッシュ。
+    ファイルは所有者のみ読み書きできる権限で保存します。
+    Windowsではファイルの権限で保護できないため、DPAPIでログオン中のユーザーのみ
+    復号できるように暗号化して保存します。
+    """
+
+    def __init__(self, base_url: str, user_name: str):
+        self._key = hashlib.sha256(f"{base_url}\n{user_name}".encode("utf-8")).hexdigest()
+        self._file_path = config["file_path"]
+        self._enabled = config["cache_enabled"]
+        self._logger = CustomLogger(name="TokenCache")
+
+    def load(self) -> Optional[CachedToken]:
+        """
+        有効期限内のトークンを読み込みます。
+
+        Returns:
+            Optional[CachedToken]: トークン。無い場合や有効期限が近い場合はNone
+        """
+
+        entry = self._read().get(self._key) if self._enabled else None
+        if not entry:
+            return None
+
+        try:
+            cached = CachedToken(
+                token=entry["token"],
+                user_id=entry["user_id"],
+                expires_at=datetime.fromisoformat(entry["expires_at"]),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            self._logger.warn(f"{self._file_path}のトークンが不正です。：{e}")
+            return None
+
+        margin = timedelta(seconds=config["expiry_margin"])
+        if cached.expires_at - margin <= datetime.now().astimezone():
+            return None
+        return cached
+
+    def save(self, token: str, user_id: str, expires_at: Optional[datetime] = None):
+        """
+        トークンを保存します。
+
+        Args:
+            token (str): 認証トークン
+            user_id (str): ユーザーID
+            expires_at (Optional[datetime]): 有効期限。Noneの場合は既定の有効期間
+        """
+
+        if not self._enabled:
+            return
+
+        if expires_at is None:
+            expires_at = datetime.now().astimezone() + timedelta(
+                seconds=config["default_lifetime"]
+            )
+        entries = self._read()
+        entries[self._key] = {
+            "token": token,
+            "user_id": user_id,
+            "expires_at": expires_at.astimezone().isoformat(),
+        }
+        self._write(entries)
+
+    def clear(self):
+        """
+        保存しているトークンを削除します。
+        """
+
+        if not self._enabled:
+            return
+
+        entries = self._read()
+        if entries.pop(self._key, None) is not None:
+            self._write(entries)
+
+    def _read(self) -> dict:
+        if not path.exists(self._file_path):
+            return {}
+        try:
+            with open(self._file_path, "rb") as file:
+                data = file.read()
+            if is_win():
+                data = _unprotect(data)
+            entries = json.loads(data.decode("utf-8"))
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError) as e:
+            self._logger.warn(f"{self._file_path}の読み込みに失敗しました。：{e}")
+            return {}
+
+    def _write(self, entries: dict):
+        temp_path = self._file_path + ".tmp"
+        try:
+            os.makedirs(path.dirname(self._file_path) or ".", exist_ok=True)
+            # 作成時から所有者のみ読み書きできる権限にする
+            data = json.dumps(entries).encode("utf-8")
+            if is_win():
+                data = _protect(data)
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.chmod(temp_path, 0o600)
+            os.replace(temp_path, self._file_path)
+        except OSError as e:
+            self._logger.warn(f"{self._file_path}の書き込みに失敗しました：{e}")
+
+
+class _DataBlob(ctypes.Structure):
+    _fields_ = [
+        ("cbData", ctypes.c_uint32),
+        ("pbData", ctypes.POINTER(ctypes.c_char)),
+    ]
+
+
+# 暗号化・復号時にダイアログを表示しない
+_crypt_protect_ui_forbidden = 0x1
+
+
+def _crypt(function, data: bytes) -> bytes:
+    buffer = ctypes.create_string_buffer(data, len(data))
+    data_in = _DataBlob(len(data), ctypes.cast(buffer, ctypes.POINTER(ctypes.c_char)))
+    data_out = _DataBlob()
+    if not function(
+        ctypes.byref(data_in),
+        None,
+        None,
+        None,
+        None,
+        _crypt_protect_ui_forbidden,
+        ctypes.byref(data_out),
+    ):
+        raise ctypes.WinError()
+    try:
+        return ctypes.string_at(data_out.pbData, data_out.cbData)
+    finally:
+        ctypes.windll.kernel32.LocalFree(ctypes.cast(data_out.pbData, ctypes.c_void_p))
+
+
+def _protect(data: bytes) -> bytes:
+    """DPAPIでログオン中のユーザーのみ復号できるように暗号化します。"""
+
+    return _crypt(ctypes.windll.crypt32.CryptProtectData, data)
+
+
+def _unprotect(data: bytes) -> bytes:
+    """DPAPIで暗号化したデータを復号します。"""
+
+    return _crypt(ctypes.windll.crypt32.CryptUnprotectData, data)
@@ -1,12 +1,24 @@
+import bz2
+import gzip
 import json
+import lzma
 import os
 from dataclasses import dataclass
-from typing import Any, Optional, Tuple, Union
+from functools import lru_cache
+from typing import IO, Any, Callable, Optional, Tuple, Union
 
 from .logger import CustomLogger
 
 logger = CustomLogger(name=__name__)
 
+# 圧縮形式の判定に使用するマジックバイトと展開処理
+compression_openers: dict[bytes, Callable[..., IO]] = {
+    b"\x1f\x8b": gzip.open,
+    b"BZh": bz2.open,
+    b"\xfd7zXZ\x00": lzma.open,
+}
+compressed_extensions = (".gz", ".bz2", ".xz")
+
 
 @dataclass
 class OpenFileResult:
@@ -33,6 +45,89 @@ def safe_json_loads(json_str: str) -> Optional[dict]:
         return None
 
 
+class JsonArrayStreamDecoder:
+    """
+    JSONの配列を少しずつ受け取り、完成した要素から順にデコードするクラス。
+    要素が途中までしか届いていない場合は、受け取った文字列が前回の2倍になるまで
+    デコードを試さないため、大きな要素でも全体の処理量は文字数に比例します。
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._chunks: list[str] = []
+        self._size = 0
+        self._retry_size = 0
+        self._started = False
+        self._finished = False
+
+    def feed(self, text: str) -> list:
+        """
+        文字列を追加し、デコードできた要素のリストを返します。
+        """
+
+        if text:
+            self._chunks.append(text)
+            self._size += len(text)
+        if self._size < self._retry_size:
+            return []
+        return self._decode(final=False)
+
+    def close(self) -> list:
+        """
+        残りの文字列をデコードし、要素のリストを返します。
+        配列が閉じられていない場合はValueErrorを発生させます。
+        """
+
+        values = self._decode(final=True)
+        if not self._finished:
+            raise ValueError("JSONの配列が閉じられていません。")
+        return values
+
+    def _decode(self, final: bool) -> list:
+        buffer = "".join(self._chunks)
+        values = []
+        pos = 0
+        is_incomplete = False
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer):
+                break
+
+            if self._finished:
+                raise ValueError(f"JSONの配列の後に文字列があります。: {pos}")
+            if not self._started:
+                if buffer[pos] != "[":
+                    raise ValueError(f"JSONの配列ではありません。: {buffer[pos]}")
+                self._started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                self._finished = True
+                pos += 1
+                continue
+
+            try:
+                value, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                is_incomplete = True
+                break
+            # 末尾の数値などは続きがある可能性がある
+            if end == len(buffer) and not final:
+                is_incomplete = True
+                break
+            values.append(value)
+            pos = end
+
+        remaining = buffer[pos:]
+        self._chunks = [remaining] if remaining else []
+        self._size = len(remaining)
+        self._retry_size = self._size * 2 if is_incomplete else 0
+        return values
+
+
 def open_file(file_path: str, encoding="utf-8") -> OpenFileResult:
     result = OpenFileResult()
     try:
@@ -46,6 +141,42 @@ def open_file(file_path: str, encoding="utf-8") -> OpenFileResult:
     return result
 
 
+def strip_compressed_extension(file_path: str) -> str:
+    for ext in compressed_extensions:
+        if file_path.lower().endswith(ext):
+            return file_path[: -len(ext)]
+    return file_path
+
+
+def get_compression_opener(file_path: str) -> Optional[Callable[..., IO]]:
+    with open(file_path, "rb") as file:
+        head = file.read(max(len(magic) for magic in compression_openers))
+    for magic, opener in compression_openers.items():
+        if head.startswith(magic):
+            return opener
+    return None
+
+
+def open_text_stream(file_path: str, encoding="utf-8") -> IO[str]:
+    """
+    ファイルをテキストストリームとして開きます。
+    gzip・bz2・xzで圧縮されている場合は、全体を展開せずに逐次展開しながら読み込みます。
+    """
+
+    opener = get_compression_opener(file_path)
+    if opener is None:
+        return open(file_path, "r", encoding=encoding)
+    return opener(file_path, "rt", encoding=encoding)
+
+
+def read_bytes(file_path: str) -> bytes:
+    """ファイルをバイト列で読み込みます。圧縮されている場合は展開します。"""
+
+    opener = get_compression_opener(file_path)
+    with (opener or open)(file_path, "rb") as file:
+        return file.read()
+
+
 def write_file(file_path: str, text: str, encoding="utf-8") -> Tuple[bool, str]:
     try:
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
@@ -57,6 +188,19 @@ def write_file(file_path: str, text: str, encoding="utf-8") -> Tuple[bool, str]:
     return True, ""
 
 
+@lru_cache(maxsize=256)
+def compile_json_path(path: str) -> Tuple[Union[str, int], ...]:
+    """
+    "[0][fields]" のようなパスを、キーとリストインデックスのタプルに変換します。
+    同じパスは変換結果を再利用します。
+    """
+
+    # 数字であればリストインデックスとして処理
+    return tuple(
+        int(key) if key.isdigit() else key for key in path.strip("][").split("][")
+    )
+
+
 def get_value_or_none(json_data: Union[str, dict, list], path: str) -> Any:
     try:
         if isinstance(json_data, str):
@@ -64,14 +208,8 @@ def get_value_or_none(json_data: Union[str, dict, list], path: str) -> Any:
         else:
             value = json_data
 
-        # パスを分割してリストに変換
-        keys = path.strip("][").split("][")
-        for key in keys:
-            # 数字であればリストインデックスとして処理
-            if key.isdigit():
-                value = value[int(key)]
-            else:
-                value = value[key]
+        for key in compile_json_path(path):
+            value = value[key]
         return value
     except (KeyError, IndexError, TypeError):
         logger.warn(f"KeyError or IndexError or TypeError: {path} to {json_data}")
@@ -0,0 +1,77 @@
+import json
+
+from . import util
+
+values = [
+    {"id": 1, "name": "作業", "items": [1, 2.5, None, True]},
+    [],
+    "文字列, ] [",
+    12345,
+    {"nested": {"list": [{"a": "b"}] * 3}},
+]
+
+
+def _decode(text: str, size: int) -> list:
+    decoder = util.JsonArrayStreamDecoder()
+    result = []
+    for i in range(0, len(text), size):
+        result.extend(decoder.feed(text[i : i + size]))
+    result.extend(decoder.close())
+    return result
+
+
+def test_json_array_stream_decoder():
+    text = json.dumps(values, ensure_ascii=False, indent=2)
+    # 要素や文字列の途中で分割されても同じ結果になる
+    for size in [1, 2, 7, 64, len(text)]:
+        result = _decode(text, size)
+        if result != values:
+            raise Exception(f"デコード結果が正しくありません。:{size} {result}")
+
+    if _decode(" [ ] ", 1) != []:
+        raise Exception("空の配列のデコード結果が正しくありません。")
+
+    # 完成した要素から順に返す
+    decoder = util.JsonArrayStreamDecoder()
+    result = decoder.feed('[{"a": 1}, {"b"')
+    if result != [{"a": 1}]:
+        raise Exception(f"完成した要素が返されていません。:{result}")
+
+
+def test_json_array_stream_decoder_error():
+    for text in ['{"a": 1}', '[{"a": 1}', '[{"a": }]', "[1] 2"]:
+        try:
+            _decode(text, 3)
+        except ValueError:
+            continue
+        raise Exception(f"不正なJSONがデコードされました。:{text}")
+
+
+def test_get_value_or_none():
+    data = [{"fields": {"Id": "1", "SubItems": [{"Name": "作業"}]}}]
+    cases = [
+        ("[0][fields][Id]", "1"),
+        ("[0][fields][SubItems][0][Name]", "作業"),
+        ("[0][fields][Name]", None),
+        ("[1][fields]", None),
+        ("[0][fields][Id][name]", None),
+    ]
+    for path, expect in cases:
+        for json_data in [data, json.dumps(data)]:
+            value = util.get_value_or_none(json_data, path)
+            if value != expect:
+                raise Exception(f"取得した値が正しくありません。:{path} {value}")
+
+    # 同じパスは変換結果を再利用する
+    keys = util.compile_json_path("[0][fields]")
+    if keys != (0, "fields"):
+        raise Exception(f"パスの変換結果が正しくありません。:{keys}")
+    if util.compile_json_path("[0][fields]") is not keys:
+        raise Exception("パスの変換結果が再利用されていません。")
+
+
+if __name__ == "__main__":
+    test_json_array_stream_decoder()
+    test_json_array_stream_decoder_error()
+    test_get_value_or_none()
+    print("全てのテストが正常に完了しました。")
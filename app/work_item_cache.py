@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import sys
+from typing import List, Optional
+
+from .logger import CustomLogger
+from .model import WorkItem
+from .setting import get_data_path
+from .util import open_file
+
+config = {
+    "cache_enabled": True,
+    "cache_dir": os.path.join(get_data_path(), "work_item_cache"),
+}
+
+# キャッシュの形式を変更した場合は更新する
+cache_version = 1
+
+
+class WorkItemCache:
+    """
+    TimeTrackerの作業項目の一覧をプロジェクトとユーザー毎に保存するキャッシュ。
+    作業項目は [ID, 名前, フォルダ名, [子の作業項目...]] の入れ子のリストで保存し、
+    フォルダのパスは読み込み時に親から組み立てます。
+    """
+
+    def __init__(self, base_url: str, project_id: str, user_name: str):
+        key = hashlib.sha256(
+            f"{base_url}\n{project_id}\n{user_name}".encode("utf-8")
+        ).hexdigest()
+        self._file_path = os.path.join(config["cache_dir"], f"{key}.json")
+        self._enabled = config["cache_enabled"]
+        self._content_hash: Optional[str] = None
+        self._logger = CustomLogger(name="WorkItemCache")
+
+    def load(self) -> Optional[List[WorkItem]]:
+        """
+        保存されている作業項目を読み込みます。
+
+        Returns:
+            Optional[List[WorkItem]]: 作業項目のリスト。キャッシュが無い場合はNone
+        """
+
+        if not self._enabled or not os.path.exists(self._file_path):
+            return None
+
+        result = open_file(self._file_path)
+        if result.is_error():
+            self._logger.warn(
+                f"{self._file_path}の読み込みに失敗しました。：{result.error_message}"
+            )
+            return None
+
+        try:
+            data = json.loads(result.text)
+            if data["version"] != cache_version:
+                return None
+            work_items = [_to_work_item(item) for item in data["items"]]
+        except Exception as e:
+            self._logger.warn(f"{self._file_path}のキャッシュが不正です。：{e}")
+            return None
+
+        self._content_hash = data["hash"]
+        return work_items
+
+    def save(self, work_items: List[WorkItem]) -> bool:
+        """
+        作業項目を保存します。
+        読み込んだキャッシュと内容が同じ場合は保存しません。
+
+        Args:
+            work_items (List[WorkItem]): 作業項目のリスト
+
+        Returns:
+            bool: 内容が変わった場合はTrue
+        """
+
+        items = [_to_list(item) for item in work_items]
+        text = json.dumps(items, ensure_ascii=False, separators=(",", ":"))
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if content_hash == self._content_hash:
+            return False
+
+        self._content_hash = content_hash
+        if not self._enabled:
+            return True
+
+        data = {"version": cache_version, "hash": content_hash, "items": items}
+        temp_path = self._file_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self._file_path), exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(data, file, ensure_ascii=False, separators=(",", ":"))
+            # 読み込み中のキャッシュが壊れないように置き換える
+            os.replace(temp_path, self._file_path)
+        except OSError as e:
+            self._logger.warn(f"{self._file_path}の書き込みに失敗しました：{e}")
+        return True
+
+
+def _to_list(work_item: WorkItem) -> list:
+    root = None
+    stack = [(work_item, None)]
+    while stack:
+        item, parent = stack.pop()
+        sub_items = []
+        item_list = [item.id, item.name, item.folder_name, sub_items]
+        if parent is None:
+            root = item_list
+        else:
+            parent.append(item_list)
+        for sub_item in reversed(item.sub_items or []):
+            stack.append((sub_item, sub_items))
+    return root
+
+
+def _to_work_item(item: list) -> WorkItem:
+    # 階層が深い場合に再帰の上限を超えないよう、スタックで親から順に作成する
+    root = None
+    stack = [(item, None)]
+    while stack:
+        (id, name, folder_name, sub_items), parent = stack.pop()
+        folder_path = (
+            parent.folder_path + "/" + folder_name if parent else folder_name
+        )
+        work_item = WorkItem(
+            id=id,
+            name=name,
+            folder_name=folder_name,
+            folder_path=sys.intern(folder_path),
+            sub_items=[],
+        )
+        if parent is None:
+            root = work_item
+        else:
+            parent.sub_items.append(work_item)
+        for sub_item in reversed(sub_items):
+            stack.append((sub_item, work_item))
+    return root
@@ -0,0 +1,94 @@
+import os
+import tempfile
+
+from . import work_item_cache
+from .model import WorkItem
+
+
+def _work_items(name: str = "作業") -> list[WorkItem]:
+    return [
+        WorkItem(
+            id="1",
+            name="プロジェクト",
+            folder_name="プロジェクト",
+            folder_path="プロジェクト",
+            sub_items=[
+                WorkItem(
+                    id="2",
+                    name=name,
+                    folder_name="開発",
+                    folder_path="プロジェクト/開発",
+                    sub_items=[],
+                ),
+                WorkItem(
+                    id="3",
+                    name="会議",
+                    folder_name="管理",
+                    folder_path="プロジェクト/管理",
+                    sub_items=[],
+                ),
+            ],
+        )
+    ]
+
+
+def _cache(temp_dir: str, user_name: str = "user") -> work_item_cache.WorkItemCache:
+    work_item_cache.config["cache_dir"] = temp_dir
+    return work_item_cache.WorkItemCache("http://localhost", "1", user_name)
+
+
+def test_save_load():
+    cache_dir = work_item_cache.config["cache_dir"]
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = _cache(temp_dir)
+            if cache.load() is not None:
+                raise Exception("保存前のキャッシュが読み込まれました。")
+            if not cache.save(_work_items()):
+                raise Exception("初回の保存で変更ありになっていません。")
+
+            work_items = _cache(temp_dir).load()
+            if work_items != _work_items():
+                raise Exception(f"読み込んだ作業項目が正しくありません。:{work_items}")
+
+            # プロジェクトとユーザー毎に分ける
+            if _cache(temp_dir, "other").load() is not None:
+                raise Exception("他のユーザーのキャッシュが読み込まれました。")
+    finally:
+        work_item_cache.config["cache_dir"] = cache_dir
+
+
+def test_content_hash():
+    cache_dir = work_item_cache.config["cache_dir"]
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _cache(temp_dir).save(_work_items())
+
+            # 内容が同じ場合は書き込まない
+            cache = _cache(temp_dir)
+            cache.load()
+            file_path = os.path.join(temp_dir, os.listdir(temp_dir)[0])
+            os.utime(file_path, (0, 0))
+            if cache.save(_work_items()):
+                raise Exception("内容が同じ場合に変更ありになっています。")
+            if os.path.getmtime(file_path) != 0:
+                raise Exception("内容が同じ場合に書き込まれています。")
+
+            if not cache.save(_work_items("設計")):
+                raise Exception("内容が異なる場合に変更なしになっています。")
+            if _cache(temp_dir).load() != _work_items("設計"):
+                raise Exception("変更した作業項目が保存されていません。")
+
+            # 不正なキャッシュは使用しない
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write('{"version": 1, "items": [')
+            if _cache(temp_dir).load() is not None:
+                raise Exception("不正なキャッシュが読み込まれました。")
+    finally:
+        work_item_cache.config["cache_dir"] = cache_dir
+
+
+if __name__ == "__main__":
+    test_save_load()
+    test_content_hash()
+    print("全てのテストが正常に完了しました。")